@@ -0,0 +1,180 @@
+from sqlalchemy.engine import Engine
+from sqlalchemy import func, select
+from create_classes_for_tables import BookedFlight, BookedLuggage, Flight_Details
+from pir_rollups import LATE_COMMIT_WINDOW
+from read_data_into_tables import post_load_hooks, register_post_load_hook
+from array import array
+from typing import Dict, Iterable, List, Optional
+import numpy as np
+import pandas as pd
+
+# Columns kept per bag, in the order they are selected from the database
+LOOKUP_COLUMNS = [
+    "luggage_id", "bag_tag", "passangerID", "BookedFlightID", "flight_number",
+    "flight_date", "airline_iata", "departure_iata", "arrival_iata",
+]
+
+class BagTagIndex:
+    """
+    In-memory hash index resolving bag tags to their BookedLuggage row, passenger and flight for claim intake.
+    Bag tags are not unique, so each tag points at its most recent bag and bags with the same tag are chained.
+    The index registers refresh as a BookedLuggage loader hook, so bags loaded through read_data_into_tables
+    are indexed as soon as the load finishes.
+    """
+
+    def __init__(self, engine: Engine, keep_fresh: bool = True) -> None:
+        """
+        Initializes the index and loads every bag currently in the database.
+        Args:
+            engine (Engine): SQLAlchemy engine connected to the target database.
+            keep_fresh (bool): Register refresh as a post-load hook of BookedLuggage, undone by close.
+        """
+        self.engine = engine
+        self.last_luggage_id = 0  # highest BookedLuggage.ID already indexed
+        self._window_row_count = 0  # bags in the LATE_COMMIT_WINDOW IDs up to last_luggage_id at the last refresh
+
+        self._head: Dict[str, int] = {}  # bag tag → position of its most recently loaded bag
+        self._next = array("i")  # position → previous position with the same tag, -1 ends the chain
+        self._columns: Dict[str, np.ndarray] = {}  # preallocated, only the first len(self) entries are bags
+        self._capacity = 0
+
+        self.refresh()
+
+        self.keep_fresh = keep_fresh
+        if keep_fresh:
+            register_post_load_hook(BookedLuggage, self.refresh)
+
+    def close(self) -> None:
+        """
+        Stops refreshing the index after loads, so it can be garbage collected.
+        """
+        if self.keep_fresh:
+            post_load_hooks[BookedLuggage.__tablename__].remove(self.refresh)
+            self.keep_fresh = False
+
+    def __len__(self) -> int:
+        return len(self._next)
+
+    def _window_row_count_in_db(self, connection, last_luggage_id: int) -> int:
+        """
+        Counts the bags in the database with an ID in the LATE_COMMIT_WINDOW IDs up to last_luggage_id.
+        """
+        return connection.execute(
+            select(func.count()).where(BookedLuggage.ID > last_luggage_id - LATE_COMMIT_WINDOW, BookedLuggage.ID <= last_luggage_id)
+        ).scalar()
+
+    def _append_columns(self, new_rows: pd.DataFrame) -> None:
+        """
+        Appends rows to the column arrays, doubling their capacity when full so a refresh costs O(new bags) amortized.
+        """
+        size, needed = len(self._next), len(self._next) + len(new_rows)
+
+        if needed > self._capacity:
+            self._capacity = max(needed, 2 * self._capacity, 1024)
+            for name in LOOKUP_COLUMNS:
+                old = self._columns.get(name)
+                grown = np.empty(self._capacity, dtype=old.dtype if old is not None else new_rows[name].to_numpy().dtype)
+                if old is not None:
+                    grown[:size] = old[:size]
+                self._columns[name] = grown
+
+        for name in LOOKUP_COLUMNS:
+            self._columns[name][size:needed] = new_rows[name].to_numpy()
+
+    def refresh(self, engine: Optional[Engine] = None) -> int:
+        """
+        Indexes the BookedLuggage rows committed since the last refresh, including rows that committed late with an ID
+        below last_luggage_id (within LATE_COMMIT_WINDOW, see pir_rollups).
+        Args:
+            engine (Optional[Engine]): Engine to read from, defaults to the one given at construction (accepted so this can be a loader hook).
+        Returns:
+            int: Number of bags added to the index.
+        """
+        with (engine or self.engine).connect() as connection:
+            max_id = connection.execute(select(func.max(BookedLuggage.ID))).scalar() or 0
+
+            # Counted before the rows are read, a bag committing in between is indexed now and skipped as known next time
+            new_window_row_count = self._window_row_count_in_db(connection, max_id)
+            late_rows = self._window_row_count_in_db(connection, self.last_luggage_id) > self._window_row_count
+            start_id = max(self.last_luggage_id - LATE_COMMIT_WINDOW, 0) if late_rows else self.last_luggage_id
+
+            stmt = (
+                select(
+                    BookedLuggage.ID, BookedLuggage.bag_tag, BookedLuggage.passangerID, BookedLuggage.BookedFlightID,
+                    BookedFlight.flight_number, BookedFlight.flight_date, Flight_Details.Airline_IATA,
+                    Flight_Details.Departure_IATA, Flight_Details.Arrival_IATA,
+                )
+                .join(BookedFlight, BookedLuggage.BookedFlightID == BookedFlight.ID)
+                .join(Flight_Details, BookedFlight.flight_number == Flight_Details.flight_number)
+                .where(BookedLuggage.ID > start_id, BookedLuggage.ID <= max_id)
+                .order_by(BookedLuggage.ID)
+            )
+            new_rows = pd.DataFrame(connection.execute(stmt).all(), columns=LOOKUP_COLUMNS)
+
+        if late_rows and len(self):
+            indexed_ids = self._columns["luggage_id"][:len(self)]
+            new_rows = new_rows[~new_rows["luggage_id"].isin(indexed_ids[indexed_ids > start_id])]  # bags of the window indexed before
+
+        self.last_luggage_id = max(self.last_luggage_id, max_id)
+        self._window_row_count = new_window_row_count
+
+        if new_rows.empty:
+            return 0
+
+        first_position = len(self._next)
+        self._append_columns(new_rows)
+
+        # Chain every new bag in front of the bags already carrying its tag
+        head = self._head
+        for position, tag in enumerate(new_rows["bag_tag"].tolist(), start=first_position):
+            self._next.append(head.get(tag, -1))
+            head[tag] = position
+
+        return len(new_rows)
+
+    def _positions(self, tags: Iterable[str]) -> List[List[int]]:
+        """
+        Walks the chain of every tag and returns the matching positions per tag.
+        """
+        head, next_position = self._head, self._next
+        matches = []
+
+        for tag in tags:
+            positions = []
+            position = head.get(tag, -1)
+            while position >= 0:
+                positions.append(position)
+                position = next_position[position]
+            matches.append(positions)
+
+        return matches
+
+    def lookup(self, bag_tag: str) -> List[dict]:
+        """
+        Resolves one bag tag.
+        Args:
+            bag_tag (str): The tag on the claimed bag.
+        Returns:
+            List[dict]: One dict per bag carrying the tag, most recently loaded first, empty if unknown.
+        """
+        return self.lookup_many([bag_tag]).drop(columns="query_position").to_dict(orient="records")
+
+    def lookup_many(self, bag_tags: Iterable[str]) -> pd.DataFrame:
+        """
+        Resolves a batch of bag tags in one call.
+        Args:
+            bag_tags (Iterable[str]): Tags to resolve, e.g. all claims received in the last minute.
+        Returns:
+            pd.DataFrame: query_position (index of the tag in bag_tags) plus LOOKUP_COLUMNS, one row per matching bag.
+                          Unknown tags have no rows.
+        """
+        matches = self._positions(bag_tags)
+
+        query_positions = np.repeat(np.arange(len(matches)), [len(positions) for positions in matches])
+        positions = np.fromiter((p for positions in matches for p in positions), dtype=np.int64, count=len(query_positions))
+
+        result = {"query_position": query_positions}
+        for name in LOOKUP_COLUMNS:
+            result[name] = self._columns[name][positions] if name in self._columns else np.empty(0)
+
+        return pd.DataFrame(result)
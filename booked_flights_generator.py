@@ -1,24 +1,44 @@
 from sqlalchemy.engine import Engine
 from sqlalchemy.orm import Session
 from create_classes_for_tables import Flight_Details, Passanger, BookedFlight
-from collections import defaultdict
+from columnar_snapshot import ColumnarSnapshot
+from booking_store import BookingStore, dates_to_day_numbers, day_numbers_to_dates, dictionary_encode
+from pipeline_metrics import current_stage, instrument_stage
+from typing import Optional
+import numpy as np
 import pandas as pd
 import yaml  
-import random
+
+# Columns of passanger_df, read from the database or from the snapshot
+PASSANGER_COLUMNS = ["passangerID", "family_name", "given_name", "gender", "date_of_birth", "email", "phone_number"]
 
 class BookFlightGenerator:
     """
     A class to generate synthetic booked flight data.
     """
-    def __init__(self, engine: Engine):
+    def __init__(self, engine: Engine, seed: Optional[int] = None, snapshot: Optional[ColumnarSnapshot] = None):
         """
         Initializes the BookFlightGenerator with a database engine.
         Args:
             engine (Engine): SQLAlchemy engine connected to the target database.
+            seed (Optional[int]): Random seed for reproducibility, None for a fresh random assignment each run.
+            snapshot (Optional[ColumnarSnapshot]): Memory mapped table cache to read from instead of querying the database.
         """
 
         self.engine = engine
+        self.snapshot = snapshot
+        self.seed = seed
+
+        # Random generator for all randomness in the class
+        self.rng = np.random.default_rng(seed)
 
+    def cache_params(self) -> dict:
+        """
+        Returns the generator parameters the bookings depend on, used to key them in the DatasetCache.
+        """
+        return {"seed": self.seed}
+
+    @instrument_stage("book_flights.load_flight_details")
     def load_flight_details_from_db(self, table_name: str) -> pd.DataFrame:
         """
         Loads flight details from the specified database table.
@@ -27,6 +47,13 @@ class BookFlightGenerator:
         Returns:
             pd.DataFrame: DataFrame containing flight details.
         """
+        if self.snapshot is not None:
+            self.flight_details_df = self.snapshot.load_frame(
+                Flight_Details, ["flight_number", "Departure_IATA", "Arrival_IATA", "Airline_IATA", "flight_date"]
+            ).rename(columns={"Departure_IATA": "departure_airport", "Arrival_IATA": "arrival_airport", "Airline_IATA": "airline"})
+            current_stage().rows_out = len(self.flight_details_df)
+            return
+
         with Session(self.engine) as session:
             flight_details = session.query(Flight_Details).all()
             
@@ -40,7 +67,9 @@ class BookFlightGenerator:
                 }
                 for fd in flight_details
             ])
+        current_stage().rows_out = len(self.flight_details_df)
 
+    @instrument_stage("book_flights.load_passengers")
     def load_passengers_from_db(self, table_name: str) -> pd.DataFrame:
         """
         Loads passenger details from the specified database table.
@@ -49,6 +78,11 @@ class BookFlightGenerator:
         Returns:
             pd.DataFrame: DataFrame containing passenger details.
         """
+        if self.snapshot is not None:
+            self.passanger_df = self.snapshot.load_frame(Passanger, PASSANGER_COLUMNS)  # same columns as the database path
+            current_stage().rows_out = len(self.passanger_df)
+            return
+
         with Session(self.engine) as session:
             passanger = session.query(Passanger).all()
 
@@ -63,9 +97,10 @@ class BookFlightGenerator:
                     "phone_number": p.phone_number
                 }
                 for p in passanger
-            ])
+            ], columns=PASSANGER_COLUMNS)
+        current_stage().rows_out = len(self.passanger_df)
 
-    def _assign_flights(self, max_capacity: int = 20) -> pd.DataFrame:
+    def _assign_flights(self, max_capacity: int = 20) -> BookingStore:
         """
         Assign passengers to flights with the following rules:
         - Every flight must have at least one passenger.
@@ -74,92 +109,68 @@ class BookFlightGenerator:
         - No flight exceeds max_capacity.
         """
 
-        # Extract flight info
-        flights_df = self.flight_details_df.copy()
-        passengers_df = self.passanger_df.copy()
-
-        # Convert to lists for easier handling
-        passengers = passengers_df["passangerID"].tolist()
-        random.shuffle(passengers)  # randomize passenger order
-
-        # Group flights by date → {date: [flight1, flight2, ...]}
-        flights_by_date = (
-            flights_df.groupby("flight_date")["flight_number"]
-            .apply(list)
-            .to_dict()
-        )
-
-        # Track which passengers are already booked on each date
-        # Example: booked_on_date["2025-01-01"] = {12, 44, 91}
-        booked_on_date = defaultdict(set)
-
-        # Store final assignments as list of tuples
-        assignments = []
-
-        # ---------------------------------------------------------
-        # STEP 1 — Guarantee each flight gets at least one passenger
-        # ---------------------------------------------------------
-        for date, flights in flights_by_date.items():
+        # Extract flight info as compact arrays
+        passengers = self.passanger_df["passangerID"].to_numpy(dtype=np.int32)
+        flight_codes, flight_numbers = dictionary_encode(self.flight_details_df["flight_number"])
+        flight_days = dates_to_day_numbers(self.flight_details_df["flight_date"])
 
-            for flight in flights:
+        # Group flights by date → contiguous runs of flight codes per day
+        order = np.argsort(flight_days, kind="stable")
+        flight_codes, flight_days = flight_codes[order], flight_days[order]
+        days, day_starts, flights_per_day = np.unique(flight_days, return_index=True, return_counts=True)
 
-                # Find the first passenger NOT booked on this date
-                assigned = False
-                for p in passengers:
-                    if p not in booked_on_date[date]:
-                        assignments.append((p, flight, date))
-                        booked_on_date[date].add(p)
-                        assigned = True
-                        break
+        booked_passengers = []
+        booked_flights = []
+        booked_days = []
 
-                if not assigned:
-                    raise ValueError(
-                        f"No available passengers for date {date}. "
-                        "Not enough unique passengers to guarantee one per flight."
-                    )
+        for day, day_start, flight_count in zip(days, day_starts, flights_per_day):
 
-        # ---------------------------------------------------------
-        # STEP 2 — Fill remaining seats up to max_capacity
-        # ---------------------------------------------------------
-        for date, flights in flights_by_date.items():
+            flights = flight_codes[day_start:day_start + flight_count]
 
-            for flight in flights:
+            if len(passengers) < flight_count:
+                raise ValueError(
+                    f"No available passengers for date {day_numbers_to_dates(day)}. "
+                    "Not enough unique passengers to guarantee one per flight."
+                )
 
-                # Count how many passengers already assigned to this flight
-                current_count = sum(1 for p, f, d in assignments if f == flight)
-                remaining_capacity = max_capacity - current_count
+            # Distinct passengers for the day, so nobody is on two flights on the same date
+            seats = min(len(passengers), flight_count * max_capacity)
+            day_passengers = passengers[self.rng.choice(len(passengers), size=seats, replace=False)]
 
-                if remaining_capacity <= 0:
-                    continue  # flight is full
+            # ---------------------------------------------------------
+            # STEP 1 — Guarantee each flight gets at least one passenger
+            # STEP 2 — Fill remaining seats flight by flight up to max_capacity
+            # ---------------------------------------------------------
+            seat_flights = np.concatenate([flights, np.repeat(flights, max_capacity - 1)])[:seats]
 
-                # Passengers who are NOT booked on this date
-                available_passengers = [
-                    p for p in passengers if p not in booked_on_date[date]
-                ]
-                random.shuffle(available_passengers)
+            booked_passengers.append(day_passengers)
+            booked_flights.append(seat_flights)
+            booked_days.append(np.full(seats, day, dtype=np.int32))
 
-                # Assign up to remaining capacity
-                for p in available_passengers[:remaining_capacity]:
-                    assignments.append((p, flight, date))
-                    booked_on_date[date].add(p)
+        if not booked_passengers:
+            return BookingStore(np.empty(0, np.int32), np.empty(0, np.int32), np.empty(0, np.int32), flight_numbers)
 
         # ---------------------------------------------------------
-        # STEP 3 — Convert assignments to DataFrame
+        # STEP 3 — Collect assignments into the columnar store
         # ---------------------------------------------------------
-        self.passanger_df = pd.DataFrame(
-            assignments,
-            columns=["passangerID", "flight_number", "flight_date"]
+        return BookingStore(
+            np.concatenate(booked_passengers),
+            np.concatenate(booked_flights),
+            np.concatenate(booked_days),
+            flight_numbers,
         )
 
+    @instrument_stage("book_flights.generate")
+    def generate_booked_flights(self, max_capacity: int = 20) -> pd.DataFrame:
+        """
+        Generates booked flights for the loaded passengers and flight details.
+        Args:
+            max_capacity (int): Maximum number of passengers per flight.
+        Returns:
+            pd.DataFrame: DataFrame with passangerID, flight_number and flight_date, ready to load into BookedFlight.
+        """
+        current_stage().rows_in = len(self.passanger_df)
 
+        self.bookings = self._assign_flights(max_capacity)
 
-    def generate_booked_flights(self):
-
-        self._assign_flights()
-
-        booked_flight_df = self.passanger_df[["passangerID", "flight_number", "flight_date"]]
-
-        return booked_flight_df
-
-
-
+        return self.bookings.to_frame()
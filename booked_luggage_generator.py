@@ -2,100 +2,119 @@ from sqlalchemy.engine import Engine
 from sqlalchemy.orm import Session
 from sqlalchemy import select
 from create_classes_for_tables import BookedFlight
+from booking_store import LuggageStore
+from columnar_snapshot import ColumnarSnapshot
+from pipeline_metrics import current_stage, instrument_stage
+from typing import Optional
+import numpy as np
 import pandas as pd
-import random
 import string
 
+BAG_TAG_LENGTH = 10
+
 class BookedLuggageGenerator:
-    def __init__(self, engine: Engine):
+    def __init__(self, engine: Engine, seed: Optional[int] = None, snapshot: Optional[ColumnarSnapshot] = None):
         """
         Initializes the BookedLuggageGenerator with a database engine.
         Args:
             engine (Engine): SQLAlchemy Engine instance for database connection.
+            seed (Optional[int]): Random seed for reproducibility, None for fresh random luggage each run.
+            snapshot (Optional[ColumnarSnapshot]): Memory mapped table cache to read booked flights from instead of querying the database.
+
+        """
+        self.engine = engine
+        self.snapshot = snapshot
+        self.seed = seed
 
-        """    
-        self.engine = engine 
-        
         self.bag_count_probabilities = {
             1: 0.70,
             2: 0.25,
             3: 0.05
         }  # Probabilities for number of bags
-        self.dimenstions = { 
+        self.dimenstions = {
             "55x40x20", "60x45x23", "50x38x22",
             "65x45x25", "70x50x28"
         } # Possible luggage dimensions
 
-    def _generate_bag_tag(self) -> str:
+        # Random generator for all randomness in the class
+        self.rng = np.random.default_rng(seed)
+
+    def cache_params(self) -> dict:
         """
-        Generates a random bag tag consisting of 10 uppercase letters and digits.
-        Returns:
-            str: A randomly generated bag tag.
-        """        
-        characters = string.ascii_uppercase + string.digits
-        bag_tag = ''.join(random.choices(characters, k=10))
-        return bag_tag
-    
-    def _random_bag_weight(self) -> int:
+        Returns every parameter the generated luggage depends on, used to key it in the DatasetCache.
         """
-        Generates a random bag weight between 10 and 32 kg.
-        Returns:
-            int: A randomly generated bag weight.
-        """        
-        return random.randint(10, 32)
-    def _random_bag_count(self) -> int:
+        return {
+            "seed": self.seed,
+            "bag_count_probabilities": self.bag_count_probabilities,
+            "dimensions": sorted(self.dimenstions),
+        }
+
+    def _generate_bag_tags(self, n: int) -> np.ndarray:
         """
-        Determines the number of bags based on predefined probabilities.
+        Generates random bag tags consisting of 10 uppercase letters and digits.
+        Args:
+            n (int): Number of bag tags to generate.
         Returns:
-            int: The number of bags (1, 2, or 3).
-        """        
-        
-        bag_count = random.choices(
-            population=list(self.bag_count_probabilities.keys()),
-            weights=list(self.bag_count_probabilities.values()),
-            k=1
-        )[0]  #pick a bag count based on defined probabilities and returns first and only element in the list
-
+            np.ndarray: Array of n fixed width (S10) bag tags.
+        """
+        characters = np.frombuffer((string.ascii_uppercase + string.digits).encode(), dtype="S1")
+        picks = characters[self.rng.integers(0, len(characters), size=(n, BAG_TAG_LENGTH))]  # one row of characters per tag
+        return np.ascontiguousarray(picks).view(f"S{BAG_TAG_LENGTH}").ravel()
 
-        return bag_count
+    def _random_bag_weights(self, n: int) -> np.ndarray:
+        """
+        Generates random bag weights between 10 and 32 kg.
+        Args:
+            n (int): Number of weights to generate.
+        Returns:
+            np.ndarray: int8 array of bag weights.
+        """
+        return self.rng.integers(10, 33, size=n, dtype=np.int8)
 
-    def generate_booked_luggage(self) -> None:
+    def _random_bag_counts(self, n: int) -> np.ndarray:
         """
-        Generates booked luggage data for a given booked flight.
+        Determines the number of bags per booking based on predefined probabilities.
         Args:
-            booked_flight (BookedFlight): The booked flight instance.
-        
+            n (int): Number of bookings.
+        Returns:
+            np.ndarray: Array with the number of bags (1, 2, or 3) per booking.
+        """
+        return self.rng.choice(
+            list(self.bag_count_probabilities.keys()),
+            size=n,
+            p=list(self.bag_count_probabilities.values()),
+        )  # pick a bag count for every booking based on defined probabilities
+
+    @instrument_stage("booked_luggage.generate")
+    def generate_booked_luggage(self) -> pd.DataFrame:
+        """
+        Generates booked luggage data for every booked flight in the database.
+        Returns:
+            pd.DataFrame: DataFrame ready to load into BookedLuggage.
         """
 
-        with Session(self.engine) as session:
-            rows = session.execute(select(BookedFlight.ID, BookedFlight.passangerID )).all()
-
-        data = []
-        
-        for booked_flight_id, passenger_id in rows:
-            
-            bag_count = self._random_bag_count()
-            
-            for _ in range(bag_count):
-                
-                bag_tag = self._generate_bag_tag()
-                weight = self._random_bag_weight()
-                dimensions = random.choice(list(self.dimenstions))
-                
-                data.append({  
-                        "bag_tag": bag_tag,
-                        "passangerID": passenger_id,
-                        "BookedFlightID": booked_flight_id,
-                        "weight_kg": weight,
-                        "dimensions_cm": dimensions
-                })
-        
-        return pd.DataFrame(data)
-                
-            
-            
+        if self.snapshot is not None:
+            booked_flights = self.snapshot.load(BookedFlight, ["ID", "passangerID"])
+            bookings = np.column_stack([booked_flights["ID"], booked_flights["passangerID"]]).astype(np.int32)
+        else:
+            with Session(self.engine) as session:
+                rows = session.execute(select(BookedFlight.ID, BookedFlight.passangerID )).all()
 
+            bookings = np.array(rows, dtype=np.int32).reshape(-1, 2)  # columns: booked flight ID, passanger ID
 
+        current_stage().rows_in = len(bookings)
+        bag_counts = self._random_bag_counts(len(bookings))
+        bag_total = int(bag_counts.sum())
 
+        dimensions = np.array(sorted(self.dimenstions))
 
+        self.luggage = LuggageStore(
+            booked_flight_ids=np.repeat(bookings[:, 0], bag_counts),
+            passenger_ids=np.repeat(bookings[:, 1], bag_counts),
+            bag_tags=self._generate_bag_tags(bag_total),
+            weights_kg=self._random_bag_weights(bag_total),
+            dimension_codes=self.rng.integers(0, len(dimensions), size=bag_total, dtype=np.int8),
+            dimensions=dimensions,
+        )
 
+        return self.luggage.to_frame()
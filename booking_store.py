@@ -0,0 +1,123 @@
+import numpy as np
+import pandas as pd
+from typing import Iterable, Tuple
+
+# Day numbers are counted from the unix epoch, the same unit numpy uses for datetime64[D]
+def dates_to_day_numbers(dates: Iterable) -> np.ndarray:
+    """
+    Converts dates (date objects, strings or datetime64 values) into int32 day numbers.
+    Args:
+        dates (Iterable): The dates to convert.
+    Returns:
+        np.ndarray: int32 array of days since 1970-01-01.
+    """
+    return pd.to_datetime(pd.Series(dates)).to_numpy(dtype="datetime64[D]").astype(np.int32)
+
+def day_numbers_to_dates(day_numbers: np.ndarray) -> np.ndarray:
+    """
+    Converts int32 day numbers back into datetime64[D] values.
+    """
+    return day_numbers.astype("datetime64[D]")
+
+def dictionary_encode(values: Iterable) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Dictionary encodes repeated values, e.g. flight numbers.
+    Args:
+        values (Iterable): The values to encode.
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: int32 codes and the dictionary array they index into.
+    """
+    codes, dictionary = pd.factorize(pd.Series(values))
+    return codes.astype(np.int32), np.asarray(dictionary)
+
+class BookingStore:
+    """
+    Struct-of-arrays store of booked flights.
+    One position across all arrays = one passenger booked on one flight.
+    """
+
+    def __init__(self, passenger_ids: np.ndarray, flight_codes: np.ndarray, flight_days: np.ndarray, flight_numbers: np.ndarray) -> None:
+        """
+        Initializes the store from its column arrays.
+        Args:
+            passenger_ids (np.ndarray): int32 passanger IDs.
+            flight_codes (np.ndarray): int32 positions into flight_numbers.
+            flight_days (np.ndarray): int32 flight dates as days since 1970-01-01.
+            flight_numbers (np.ndarray): Dictionary of the distinct flight numbers.
+        """
+        self.passenger_ids = np.asarray(passenger_ids, dtype=np.int32)
+        self.flight_codes = np.asarray(flight_codes, dtype=np.int32)
+        self.flight_days = np.asarray(flight_days, dtype=np.int32)
+        self.flight_numbers = np.asarray(flight_numbers)
+
+    def __len__(self) -> int:
+        return len(self.passenger_ids)
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Memory used by the column arrays and the flight number dictionary.
+        """
+        return self.passenger_ids.nbytes + self.flight_codes.nbytes + self.flight_days.nbytes + self.flight_numbers.nbytes
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        Materializes the bookings in the column layout of the BookedFlight table, only needed at the loader boundary.
+        Returns:
+            pd.DataFrame: Columns passangerID, flight_number, flight_date.
+        """
+        return pd.DataFrame({
+            "passangerID": self.passenger_ids,
+            "flight_number": self.flight_numbers[self.flight_codes],
+            "flight_date": day_numbers_to_dates(self.flight_days),
+        })
+
+class LuggageStore:
+    """
+    Struct-of-arrays store of booked luggage.
+    One position across all arrays = one bag.
+    """
+
+    def __init__(self, booked_flight_ids: np.ndarray, passenger_ids: np.ndarray, bag_tags: np.ndarray,
+                 weights_kg: np.ndarray, dimension_codes: np.ndarray, dimensions: np.ndarray) -> None:
+        """
+        Initializes the store from its column arrays.
+        Args:
+            booked_flight_ids (np.ndarray): int32 BookedFlight IDs.
+            passenger_ids (np.ndarray): int32 passanger IDs.
+            bag_tags (np.ndarray): Fixed width bytes bag tags, e.g. dtype S10.
+            weights_kg (np.ndarray): int8 bag weights in kilograms.
+            dimension_codes (np.ndarray): int8 positions into dimensions.
+            dimensions (np.ndarray): Dictionary of the distinct bag dimensions, e.g. "55x40x20".
+        """
+        self.booked_flight_ids = np.asarray(booked_flight_ids, dtype=np.int32)
+        self.passenger_ids = np.asarray(passenger_ids, dtype=np.int32)
+        self.bag_tags = np.asarray(bag_tags)
+        self.weights_kg = np.asarray(weights_kg, dtype=np.int8)
+        self.dimension_codes = np.asarray(dimension_codes, dtype=np.int8)
+        self.dimensions = np.asarray(dimensions)
+
+    def __len__(self) -> int:
+        return len(self.booked_flight_ids)
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Memory used by the column arrays and the dimension dictionary.
+        """
+        return (self.booked_flight_ids.nbytes + self.passenger_ids.nbytes + self.bag_tags.nbytes
+                + self.weights_kg.nbytes + self.dimension_codes.nbytes + self.dimensions.nbytes)
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        Materializes the bags in the column layout of the BookedLuggage table, only needed at the loader boundary.
+        Returns:
+            pd.DataFrame: Columns bag_tag, passangerID, BookedFlightID, weight_kg, dimensions_cm.
+        """
+        return pd.DataFrame({
+            "bag_tag": self.bag_tags.astype(str),
+            "passangerID": self.passenger_ids,
+            "BookedFlightID": self.booked_flight_ids,
+            "weight_kg": self.weights_kg,
+            "dimensions_cm": self.dimensions[self.dimension_codes],
+        })
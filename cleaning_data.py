@@ -1,10 +1,24 @@
 import pandas as pd
+from pipeline_metrics import instrument_stage
 
+def normalize_name(names: pd.Series) -> pd.Series:
+    """
+    Normalizes given or family names: surrounding whitespace removed and title cased.
+    """
+    return names.str.strip().str.title()
+
+def normalize_email(emails: pd.Series) -> pd.Series:
+    """
+    Normalizes email addresses: all spaces removed and lower cased.
+    """
+    return emails.str.replace(" ", "").str.lower()
+
+@instrument_stage("clean_passenger_df")
 def clean_passenger_df(df: pd.DataFrame) -> pd.DataFrame: 
     
-    df["family_name"] = df["family_name"].str.strip().str.title() 
-    df["given_name"] = df["given_name"].str.strip().str.title() 
-    df["email"] = df["email"].str.replace(" ", "").str.lower() 
+    df["family_name"] = normalize_name(df["family_name"]) 
+    df["given_name"] = normalize_name(df["given_name"]) 
+    df["email"] = normalize_email(df["email"]) 
     df['date_of_birth'] = pd.to_datetime(df['date_of_birth']) # Ensure date_of_birth is in datetime format otherwise will read as an object
 
     return df
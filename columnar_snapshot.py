@@ -0,0 +1,184 @@
+from sqlalchemy.engine import Engine
+from sqlalchemy import func, select, text
+from sqlalchemy.orm import DeclarativeMeta
+from create_classes_for_tables import TableVersion
+from datetime import date
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Type
+import hashlib
+import os
+import shutil
+import numpy as np
+import pandas as pd
+
+def column_to_array(series: pd.Series) -> np.ndarray:
+    """
+    Converts a DataFrame column into an array numpy can save and memory map.
+    Text becomes fixed width UTF-8 bytes and dates become datetime64[D], object arrays cannot be memory mapped.
+    Args:
+        series (pd.Series): The column to convert.
+    Returns:
+        np.ndarray: Array with a fixed size dtype.
+    """
+    if pd.api.types.is_bool_dtype(series) or pd.api.types.is_numeric_dtype(series):
+        return series.to_numpy()
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series.to_numpy(dtype="datetime64[D]")
+
+    non_null = series.dropna()
+    if len(non_null) and isinstance(non_null.iloc[0], date):  # date objects read from the database
+        return pd.to_datetime(series).to_numpy(dtype="datetime64[D]")
+
+    # Enum members are stored by name and missing values as empty text
+    encoded = [b"" if pd.isna(value) else str(getattr(value, "name", value)).encode("utf-8") for value in series.tolist()]
+    width = max(map(len, encoded), default=1) or 1
+    return np.array(encoded, dtype=f"S{width}")
+
+def array_to_column(array: np.ndarray) -> np.ndarray:
+    """
+    Reverses column_to_array for text columns, numeric and date arrays are returned unchanged (no copy).
+    """
+    if array.dtype.kind == "S":
+        return np.char.decode(array, "utf-8")
+    return array
+
+def write_columns(directory: Path, frame: pd.DataFrame) -> None:
+    """
+    Saves every column of a DataFrame as its own .npy file.
+    Each file is written to a temporary name first and renamed into place, so concurrent readers never see half a file.
+    Args:
+        directory (Path): Folder to write the column files into.
+        frame (pd.DataFrame): The data to save.
+    Returns:
+        None
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+
+    for column in frame.columns:
+        tmp_path = directory / f".{column}.{os.getpid()}.tmp.npy"
+        np.save(tmp_path, column_to_array(frame[column]))
+        os.replace(tmp_path, directory / f"{column}.npy")
+
+def read_columns(directory: Path, columns: Optional[Iterable[str]] = None, mmap: bool = True) -> Dict[str, np.ndarray]:
+    """
+    Opens column files written by write_columns.
+    Args:
+        directory (Path): Folder holding the column files.
+        columns (Optional[Iterable[str]]): Columns to open, None for all of them.
+        mmap (bool): Memory map the files read-only instead of reading them into memory.
+    Returns:
+        Dict[str, np.ndarray]: Column name → array.
+    """
+    if columns is None:
+        columns = sorted(path.stem for path in directory.glob("*.npy") if not path.name.startswith("."))
+
+    return {column: np.load(directory / f"{column}.npy", mmap_mode="r" if mmap else None) for column in columns}
+
+def columns_to_frame(columns: Dict[str, np.ndarray]) -> pd.DataFrame:
+    """
+    Builds a DataFrame from opened column arrays, decoding text columns back to str.
+    """
+    return pd.DataFrame({name: array_to_column(array) for name, array in columns.items()})
+
+class ColumnarSnapshot:
+    """
+    On-disk columnar copy of database tables, shared between processes through memory mapping.
+    Layout: <cache_dir>/<table name>/<content version>/<column>.npy
+    """
+
+    def __init__(self, engine: Engine, cache_dir: str = "Data/.snapshot_cache", keep_versions: int = 3) -> None:
+        """
+        Initializes the snapshot cache.
+        Args:
+            engine (Engine): SQLAlchemy engine connected to the source database.
+            cache_dir (str): Folder the snapshots are stored in.
+            keep_versions (int): Versions kept per table, so processes still reading a recent version are not disturbed.
+        """
+        self.engine = engine
+        self.cache_dir = Path(cache_dir)
+        self.keep_versions = keep_versions
+
+    def content_version(self, Table: Type[DeclarativeMeta]) -> str:
+        """
+        Cheap fingerprint of a table's content: its highest primary key and its TableVersion generation, which the
+        loader increments on every load and merge batch that writes rows. Both are index lookups, no table scan.
+        On PostgreSQL the planner's row estimate (pg_class.reltuples) is added, so writes made outside the loader
+        show up once the table is analyzed.
+        Args:
+            Table (Type[DeclarativeMeta]): The SQLAlchemy ORM class of the table.
+        Returns:
+            str: Short hex version string.
+        """
+        primary_key = Table.__table__.primary_key.columns[0]
+
+        with self.engine.connect() as connection:
+            max_key = connection.execute(select(func.max(primary_key))).scalar()
+            generation = connection.execute(
+                select(TableVersion.update_generation).where(TableVersion.table_name == Table.__tablename__)
+            ).scalar()
+            row_estimate = connection.execute(
+                text("SELECT reltuples FROM pg_class WHERE oid = to_regclass(:table)"), {"table": f'"{Table.__tablename__}"'}
+            ).scalar() if connection.dialect.name == "postgresql" else None
+
+        return hashlib.sha1(f"{max_key}:{generation or 0}:{row_estimate}".encode()).hexdigest()[:16]
+
+    def _fetch_columns(self, Table: Type[DeclarativeMeta], columns: List[str]) -> pd.DataFrame:
+        """
+        Reads columns from the database ordered by primary key, so every column file lines up row for row.
+        """
+        table = Table.__table__
+        primary_key = table.primary_key.columns[0]
+
+        stmt = select(*[table.c[column] for column in columns]).order_by(primary_key)
+        return pd.read_sql(stmt, self.engine)
+
+    def load(self, Table: Type[DeclarativeMeta], columns: Optional[List[str]] = None) -> Dict[str, np.ndarray]:
+        """
+        Returns memory mapped columns of a table, fetching them from the database only if the snapshot is missing or stale.
+        Args:
+            Table (Type[DeclarativeMeta]): The SQLAlchemy ORM class of the table.
+            columns (Optional[List[str]]): Columns to load, None for every column of the table.
+        Returns:
+            Dict[str, np.ndarray]: Column name → read-only memory mapped array (text columns are fixed width bytes).
+        """
+        columns = columns or [column.name for column in Table.__table__.columns]
+
+        table_dir = self.cache_dir / Table.__tablename__
+        version_dir = table_dir / self.content_version(Table)
+
+        try:
+            return self._load_version(Table, table_dir, version_dir, columns)
+        except FileNotFoundError:
+            # Another process removed the version between our check and the read, fetch it once more
+            return self._load_version(Table, table_dir, version_dir, columns)
+
+    def _load_version(self, Table: Type[DeclarativeMeta], table_dir: Path, version_dir: Path, columns: List[str]) -> Dict[str, np.ndarray]:
+        """
+        Writes the missing columns of one version, then opens the requested ones.
+        """
+        missing = [column for column in columns if not (version_dir / f"{column}.npy").exists()]
+
+        if missing:
+            write_columns(version_dir, self._fetch_columns(Table, missing))
+            self._remove_old_versions(table_dir)
+
+        return read_columns(version_dir, columns)
+
+    def _remove_old_versions(self, table_dir: Path) -> None:
+        """
+        Keeps the keep_versions most recently written versions of a table. Older ones are removed, so a process still
+        reading a recent version is not pulled from under; processes mapping a removed one keep their pages until they close them.
+        """
+        versions = sorted(
+            (path for path in table_dir.iterdir() if path.is_dir()),
+            key=lambda path: path.stat().st_mtime, reverse=True,
+        )
+
+        for old_dir in versions[self.keep_versions:]:
+            shutil.rmtree(old_dir, ignore_errors=True)
+
+    def load_frame(self, Table: Type[DeclarativeMeta], columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Same as load but returns a DataFrame, text columns are decoded to str.
+        """
+        return columns_to_frame(self.load(Table, columns))
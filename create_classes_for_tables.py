@@ -25,7 +25,7 @@ class FactPIR(Base):
     airline_iata = Column(String(2), ForeignKey('Airline.IATA'), nullable=False)  # Foreign key to Airline
 
     # PIR details
-    pir_date = Column(Date, nullable=False)  # Date of the PIR event
+    pir_date = Column(Date, nullable=False, index=True)  # Date of the PIR event, indexed for the monthly rollup rebuilds
     pir_time = Column(Time, nullable=False)  # Time of the PIR event
     pir_type = Column(SAEnum(PIRType, name="pir_type_enum"), nullable=False ) # Type of PIR (e.g., delayed, lost, damaged)
 
@@ -45,7 +45,7 @@ class BookedFlight(Base):
     ID = Column(Integer, primary_key=True, autoincrement=True) # Unique identifier for each booked flight
     passangerID = Column(Integer, ForeignKey('Passanger.passangerID'), nullable=False)  # Foreign key to Passanger 
     flight_number = Column(String(10), ForeignKey('Flight_Details.flight_number'), nullable=False)  # Foreign key to Flight_Details
-    flight_date = Column(Date, nullable=False) # Date of the flight
+    flight_date = Column(Date, nullable=False, index=True) # Date of the flight, indexed for the monthly rollup rebuilds
 
     # Relationships
     passenger = relationship("Passanger", back_populates="booked_flights") #   Relationship to Passanger
@@ -78,7 +78,7 @@ class BookedLuggage(Base):
     __table_args__ = (
         UniqueConstraint('bag_tag', 'passangerID', name="uq_bag_tag_passanger"), # Ensures a passenger cannot have duplicate bag tags
         CheckConstraint( "(split_part(dimensions_cm, 'x', 1)::int + " " split_part(dimensions_cm, 'x', 2)::int + " " split_part(dimensions_cm, 'x', 3)::int) <= 158", 
-                            name='chk_bag_dimensions' ), # Total dimensions must be <= 158 cm
+                            name='chk_bag_dimensions' ).ddl_if(dialect="postgresql"), # Total dimensions must be <= 158 cm, split_part is PostgreSQL only
         CheckConstraint( "weight_kg <= 32", name='chk_bag_weight' )  # Weight must be <= 32 kg as based on airline industry standards
     )
 
@@ -174,6 +174,7 @@ class Flight_Details(Base):
     Airline_IATA = Column(String(2), ForeignKey("Airline.IATA"), nullable=False)
 
     flight_date = Column(Date, nullable=False)  
+    departure_time = Column(Time, nullable=True)  # Scheduled local departure time, missing for flights generated before it existed
 
     booked_flights = relationship("BookedFlight", back_populates="flight_details")
     # Forward Relationship to Airport
@@ -195,6 +196,64 @@ class Flight_Details(Base):
     )
     
    
+class PIRMonthlyRollup(Base):
+    """
+    Represents the PIRMonthlyRollup aggregate table.
+    One row = number of PIR events for one month, airline, airport and PIR type.
+    """
+    __tablename__ = "PIRMonthlyRollup"
+
+    ID = Column(Integer, primary_key=True, autoincrement=True)
+    rollup_month = Column(Date, nullable=False)  # First day of the month the PIR events fall in
+    airline_iata = Column(String(2), ForeignKey('Airline.IATA'), nullable=False)  # Foreign key to Airline
+    airport_iata = Column(String(3), ForeignKey('Airport.IATA'), nullable=False)  # Foreign key to Airport
+    pir_type = Column(SAEnum(PIRType, name="pir_type_enum"), nullable=False)  # Type of PIR (e.g., delayed, lost, damaged)
+    pir_count = Column(Integer, nullable=False)  # Number of PIR events
+
+    __table_args__ = (
+        UniqueConstraint("rollup_month", "airline_iata", "airport_iata", "pir_type", name="uq_pir_monthly_rollup"),
+    )
+
+class BaggageMonthlyRollup(Base):
+    """
+    Represents the BaggageMonthlyRollup aggregate table.
+    One row = number of booked bags for one month, airline and arrival airport, used as the denominator of PIR rates.
+    """
+    __tablename__ = "BaggageMonthlyRollup"
+
+    ID = Column(Integer, primary_key=True, autoincrement=True)
+    rollup_month = Column(Date, nullable=False)  # First day of the month the flights depart in
+    airline_iata = Column(String(2), ForeignKey('Airline.IATA'), nullable=False)  # Foreign key to Airline
+    airport_iata = Column(String(3), ForeignKey('Airport.IATA'), nullable=False)  # Arrival airport, where PIRs are filed
+    bag_count = Column(Integer, nullable=False)  # Number of booked bags
+
+    __table_args__ = (
+        UniqueConstraint("rollup_month", "airline_iata", "airport_iata", name="uq_baggage_monthly_rollup"),
+    )
+
+class RollupWatermark(Base):
+    """
+    Represents the RollupWatermark table.
+    Stores the highest source ID already folded into each rollup table so a refresh only reprocesses new rows,
+    and how many source rows the window below it held, so rows committing late with a lower ID are noticed.
+    """
+    __tablename__ = "RollupWatermark"
+
+    rollup_name = Column(String(50), primary_key=True)  # Name of the rollup table
+    last_source_id = Column(Integer, nullable=False)  # Highest source primary key already aggregated
+    window_row_count = Column(Integer, nullable=False, default=0)  # Source rows with an ID in the LATE_COMMIT_WINDOW up to last_source_id
+
+class TableVersion(Base):
+    """
+    Represents the TableVersion table.
+    Counts the loads and merge batches that wrote rows of each table, so content fingerprints change on updates
+    and on rows appended below the highest key without counting the rows.
+    """
+    __tablename__ = "TableVersion"
+
+    table_name = Column(String(50), primary_key=True)  # Name of the updated table
+    update_generation = Column(Integer, nullable=False)  # Number of loads and merge batches that wrote rows of the table
+
 def get_unique_columns(model = Type[DeclarativeMeta]) -> List[str]: 
     """ Returns a list of column names participating in a UniqueConstraint. If none exist, returns an empty list. """ 
     
@@ -204,4 +263,4 @@ def get_unique_columns(model = Type[DeclarativeMeta]) -> List[str]:
         if isinstance(constraint, UniqueConstraint):  # checks if constraint is a uniqueconstraint
             unique_cols.extend([col.name for col in constraint.columns])  # add column names to the list
 
-        return unique_cols
\ No newline at end of file
+    return unique_cols
\ No newline at end of file
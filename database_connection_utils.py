@@ -1,5 +1,10 @@
+import os
 import yaml
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.pool import StaticPool
+
+# Storage backends get_engine can connect to: the PostgreSQL server from database_creds.yaml or an embedded SQLite file
+BACKENDS = ("postgres", "embedded")
 
 def create_engine_from_creds():
     """
@@ -21,4 +26,47 @@ def create_engine_from_creds():
     except ConnectionError as e:
         print(f"An Connection error has occured to the database : {e}") # if connection fails, print error message
     
-    return engine
\ No newline at end of file
+    return engine
+
+def create_embedded_engine(database_path: str = "Data/luggage.db"):
+    """
+    Creates a SQLAlchemy engine on an embedded SQLite database, so the pipeline and the PIR queries run without a server.
+    Args:
+        database_path (str): Path of the database file, created if missing. ":memory:" gives a throwaway in-process database.
+    Returns:
+        engine: SQLAlchemy engine object connected to the embedded database.
+    """
+    if database_path == ":memory:":
+        # One shared connection, otherwise every pooled connection would see its own empty database
+        engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    else:
+        os.makedirs(os.path.dirname(database_path) or ".", exist_ok=True)
+        engine = create_engine(f"sqlite:///{database_path}", connect_args={"check_same_thread": False})
+
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys = ON")  # enforced by default in PostgreSQL, off by default in SQLite
+        cursor.execute("PRAGMA journal_mode = WAL")  # readers do not block the loader
+        cursor.execute("PRAGMA synchronous = NORMAL")  # safe with WAL and far fewer fsyncs per commit
+        cursor.close()
+
+    return engine
+
+def create_engine_for_backend(backend: str | None = None, embedded_path: str | None = None):
+    """
+    Creates the engine of a storage backend.
+    Args:
+        backend (str | None): "postgres" or "embedded", defaults to the PIPELINE_BACKEND environment variable, then "postgres".
+        embedded_path (str | None): Database file of the embedded backend, defaults to PIPELINE_EMBEDDED_PATH, then Data/luggage.db.
+    Returns:
+        engine: SQLAlchemy engine object connected to the backend.
+    """
+    backend = backend or os.environ.get("PIPELINE_BACKEND", "postgres")
+
+    if backend == "postgres":
+        return create_engine_from_creds()
+    if backend == "embedded":
+        return create_embedded_engine(embedded_path or os.environ.get("PIPELINE_EMBEDDED_PATH", "Data/luggage.db"))
+
+    raise ValueError(f"Unknown storage backend {backend}, expected one of {BACKENDS}")
@@ -0,0 +1,221 @@
+from columnar_snapshot import columns_to_frame, read_columns, write_columns
+from datetime import date
+from pathlib import Path
+from types import ModuleType
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+import hashlib
+import inspect
+import json
+import sys
+import pandas as pd
+
+def file_digest(path: str) -> str:
+    """
+    SHA-256 of a file's content, used to key generated data on the input CSVs it was built from.
+    """
+    digest = hashlib.sha256()
+
+    with open(path, "rb") as source:
+        for block in iter(lambda: source.read(1 << 20), b""):
+            digest.update(block)
+
+    return digest.hexdigest()
+
+# Modules whose source lives in this folder belong to the pipeline, anything else is a third party dependency
+PROJECT_DIR = Path(__file__).resolve().parent
+
+def project_modules(module: ModuleType) -> List[ModuleType]:
+    """
+    Collects a module and every pipeline module it imports, directly or through other pipeline modules,
+    e.g. flight_details_generator → schedule_model. Imports are found from the names bound in each module.
+    Args:
+        module (ModuleType): The module to start from.
+    Returns:
+        List[ModuleType]: The modules found, sorted by name.
+    """
+    def is_project_module(candidate: Any) -> bool:
+        source = getattr(candidate, "__file__", None)
+        return source is not None and PROJECT_DIR in Path(source).resolve().parents and "site-packages" not in Path(source).parts
+
+    found: Dict[str, ModuleType] = {}
+    pending = [module]
+
+    while pending:
+        current = pending.pop()
+        if current.__name__ in found or not is_project_module(current):
+            continue
+        found[current.__name__] = current
+
+        for value in vars(current).values():
+            imported = value if inspect.ismodule(value) else sys.modules.get(getattr(value, "__module__", None) or "")
+            if imported is not None and imported.__name__ not in found:
+                pending.append(imported)  # `import x` binds the module, `from x import y` binds y whose __module__ is x
+
+    return [found[name] for name in sorted(found)]
+
+def code_version(generator: Any) -> str:
+    """
+    Fingerprint of the source of a generator class or function and of the pipeline modules it imports
+    (see project_modules), so code changes in e.g. the schedule model also invalidate cached flights.
+    Args:
+        generator (Any): Generator class, instance or function.
+    Returns:
+        str: SHA-256 over the source files.
+    """
+    if not (inspect.isclass(generator) or inspect.isfunction(generator)):
+        generator = type(generator)
+
+    digest = hashlib.sha256()
+    for module in project_modules(sys.modules[generator.__module__]):
+        digest.update(f"{module.__name__}:{file_digest(module.__file__)}\n".encode())
+
+    return digest.hexdigest()
+
+class DatasetCache:
+    """
+    Content-addressed cache of generated datasets.
+    A dataset is keyed by the stage name, the generator, its parameters, its code version and the keys of the
+    datasets it was generated from, so changing one stage only regenerates that stage and the ones downstream of it.
+    Layout: <cache_dir>/<stage>/<key>/<column>.npy
+    """
+
+    def __init__(self, cache_dir: str = "Data/.dataset_cache") -> None:
+        """
+        Initializes the cache.
+        Args:
+            cache_dir (str): Folder the cached datasets are stored in.
+        """
+        self.cache_dir = Path(cache_dir)
+
+    def key(self, stage: str, generator: Any, params: Dict[str, Any], upstream: Iterable[str] = ()) -> str:
+        """
+        Computes the cache key of a dataset.
+        Args:
+            stage (str): Name of the pipeline stage, e.g. "flight_details".
+            generator (Any): Generator class, instance or function producing the dataset.
+            params (Dict[str, Any]): Parameters the output depends on, including the seed.
+            upstream (Iterable[str]): Keys of the cached datasets this stage consumed.
+        Returns:
+            str: Hex digest identifying the dataset.
+        """
+        generator_type = generator if inspect.isclass(generator) or inspect.isfunction(generator) else type(generator)
+
+        payload = json.dumps({
+            "stage": stage,
+            "generator": f"{generator_type.__module__}.{generator_type.__qualname__}",
+            "params": params,
+            "code_version": code_version(generator),
+            "upstream": list(upstream),
+        }, sort_keys=True, default=str)
+
+        return hashlib.sha256(payload.encode()).hexdigest()[:24]
+
+    def _dataset_dir(self, stage: str, key: str) -> Path:
+        return self.cache_dir / stage / key
+
+    def get_or_generate(self, stage: str, generator: Any, params: Dict[str, Any], generate: Callable[[], pd.DataFrame],
+                        upstream: Iterable[str] = ()) -> Tuple[pd.DataFrame, str]:
+        """
+        Returns a cached dataset, running generate and caching its output on a miss.
+        Args:
+            stage (str): Name of the pipeline stage.
+            generator (Any): Generator class, instance or function producing the dataset.
+            params (Dict[str, Any]): Parameters the output depends on, including the seed.
+            generate (Callable[[], pd.DataFrame]): Produces the dataset when it is not cached.
+            upstream (Iterable[str]): Keys of the cached datasets this stage consumed.
+        Returns:
+            Tuple[pd.DataFrame, str]: The dataset and its key, pass the key as upstream to the next stage.
+        """
+        key = self.key(stage, generator, params, upstream)
+        dataset_dir = self._dataset_dir(stage, key)
+        complete_marker = dataset_dir / "_COMPLETE"
+
+        if complete_marker.exists():
+            print(f"{stage}: loaded from cache {key}")
+            return self.load(stage, key), key
+
+        dataset = generate()
+
+        write_columns(dataset_dir, dataset)
+        (dataset_dir / "columns.json").write_text(json.dumps(list(dataset.columns)))  # keeps the column order
+        complete_marker.touch()  # written last, a crashed run never leaves a half cached dataset behind
+
+        return dataset, key
+
+    def load(self, stage: str, key: str) -> pd.DataFrame:
+        """
+        Reads a cached dataset by key.
+        """
+        dataset_dir = self._dataset_dir(stage, key)
+        columns = json.loads((dataset_dir / "columns.json").read_text())
+        return columns_to_frame(read_columns(dataset_dir, columns, mmap=False))
+
+def build_fixture_database(cache: DatasetCache, year: int = 2023, flights_per_quarter: int = 2000, num_passangers: int = 20000,
+                           max_capacity: int = 20, seed: int = 42, airline_csv_file_path: str = "Data/airline.csv",
+                           airport_csv_file_path: str = "Data/airports.csv", schedule: str = "uniform") -> Dict[str, str]:
+    """
+    Generates and loads flights, passengers, bookings and luggage into the configured database, reusing cached
+    datasets for every stage whose parameters, code and upstream data are unchanged.
+    Bookings reference database IDs, so the cache assumes an empty database that assigns IDs in load order.
+    Args:
+        cache (DatasetCache): The dataset cache.
+        year (int): The year to generate flights for.
+        flights_per_quarter (int): Number of flights per quarter.
+        num_passangers (int): Number of passengers.
+        max_capacity (int): Maximum number of passengers per flight.
+        seed (int): Seed shared by every generator.
+        airline_csv_file_path (str): Path to the airline CSV.
+        airport_csv_file_path (str): Path to the airport CSV.
+        schedule (str): Flight schedule model, "uniform" or "hub" (see FlightDetailsGenerator).
+    Returns:
+        Dict[str, str]: Stage name → cache key of the dataset that was loaded.
+    """
+    # Imported here so importing the cache stays cheap for the workers that only read it
+    from read_data_into_tables import get_engine, load_df_sql
+    from create_classes_for_tables import BookedFlight, BookedLuggage, Flight_Details, Passanger
+    from flight_details_generator import FlightDetailsGenerator
+    from passanger_data_generator import generate_passangers_df
+    from booked_flights_generator import BookFlightGenerator
+    from booked_luggage_generator import BookedLuggageGenerator
+    from cleaning_data import clean_passenger_df
+
+    engine = get_engine()
+
+    flight_generator = FlightDetailsGenerator(airline_csv_file_path, airport_csv_file_path, year, flights_per_quarter, seed=seed, schedule=schedule)
+    flights, flights_key = cache.get_or_generate("flight_details", flight_generator, flight_generator.cache_params(), flight_generator.generate)
+    load_df_sql(flights, Flight_Details, chunk_size=10000)
+
+    reference_date = date(year, 12, 31)  # fixed so passenger ages do not depend on the day the fixture is built
+    passangers, passangers_key = cache.get_or_generate(
+        "passengers", generate_passangers_df,
+        {"n": num_passangers, "seed": seed, "reference_date": reference_date},
+        lambda: generate_passangers_df(num_passangers, seed=seed, reference_date=reference_date),
+    )
+    load_df_sql(clean_passenger_df(passangers), Passanger, chunk_size=10000)
+
+    booking_generator = BookFlightGenerator(engine, seed=seed)
+
+    def generate_bookings() -> pd.DataFrame:
+        booking_generator.load_flight_details_from_db("Flight_Details")
+        booking_generator.load_passengers_from_db("Passanger")
+        return booking_generator.generate_booked_flights(max_capacity)
+
+    bookings, bookings_key = cache.get_or_generate(
+        "booked_flights", booking_generator, {**booking_generator.cache_params(), "max_capacity": max_capacity},
+        generate_bookings, upstream=[flights_key, passangers_key],
+    )
+    load_df_sql(bookings, BookedFlight, chunk_size=10000)
+
+    luggage_generator = BookedLuggageGenerator(engine, seed=seed)
+    luggage, luggage_key = cache.get_or_generate(
+        "booked_luggage", luggage_generator, luggage_generator.cache_params(),
+        luggage_generator.generate_booked_luggage, upstream=[bookings_key],
+    )
+    load_df_sql(luggage, BookedLuggage, chunk_size=10000)
+
+    return {
+        "flight_details": flights_key,
+        "passengers": passangers_key,
+        "booked_flights": bookings_key,
+        "booked_luggage": luggage_key,
+    }
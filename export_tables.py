@@ -0,0 +1,223 @@
+from sqlalchemy.engine import Engine
+from sqlalchemy import Date, Integer, func, select
+from sqlalchemy.orm import DeclarativeMeta
+from create_classes_for_tables import (Airline, Airport, BookedFlight, BookedLuggage, CountryRegion, FactPIR,
+                                       Flight_Details, Passanger)
+from columnar_snapshot import write_columns
+from pipeline_metrics import track_stage
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple, Type
+import json
+import os
+import threading
+import pandas as pd
+
+# Fact and dimension tables of the star schema, in export order
+STAR_SCHEMA_TABLES: List[Type[DeclarativeMeta]] = [
+    FactPIR, BookedLuggage, BookedFlight, Flight_Details, Passanger, Airline, Airport, CountryRegion,
+]
+
+# Tables exported as one partition per month of this date column, the rest are exported whole
+PARTITION_COLUMNS: Dict[str, str] = {
+    "FactPIR": "pir_date",
+    "BookedFlight": "flight_date",
+    "Flight_Details": "flight_date",
+}
+
+EXPORT_FORMATS = ("npy", "csv", "parquet")
+
+def _month_ranges(engine: Engine, Table: Type[DeclarativeMeta], date_column: str) -> List[Tuple[date, date]]:
+    """
+    Returns [start, end) month ranges covering every date in the table's partition column.
+    """
+    column = Table.__table__.c[date_column]
+
+    with engine.connect() as connection:
+        first, last = connection.execute(select(func.min(column), func.max(column))).one()
+
+    if first is None:
+        return []
+
+    first, last = pd.Timestamp(first).date().replace(day=1), pd.Timestamp(last).date()
+    starts = pd.date_range(first, last, freq="MS").date.tolist()
+
+    return [(start, (pd.Timestamp(start) + pd.offsets.MonthBegin(1)).date()) for start in starts]
+
+def _csv_read_options(Table: Type[DeclarativeMeta]) -> dict:
+    """
+    pandas read_csv options that give every chunk of a table the same column types, whatever values the chunk holds.
+    """
+    dtypes, date_columns = {}, []
+
+    for column in Table.__table__.columns:
+        if isinstance(column.type, Integer):
+            dtypes[column.name] = "Int64"
+        elif isinstance(column.type, Date):
+            date_columns.append(column.name)
+        else:
+            dtypes[column.name] = "string"
+
+    return {"dtype": dtypes, "parse_dates": date_columns}
+
+def _copy_chunks(engine: Engine, Table: Type[DeclarativeMeta], sql: str, rows_per_file: int) -> Iterator[pd.DataFrame]:
+    """
+    Streams a query through COPY ... TO STDOUT into a pipe and parses it in chunks, so no Python row objects are
+    built and memory is bounded by rows_per_file.
+    Close the iterator when stopping early: that closes the pipe, so the COPY thread fails its next write and
+    releases its connection instead of blocking on a full pipe.
+    """
+    read_fd, write_fd = os.pipe()
+    errors: List[BaseException] = []
+
+    def copy_out() -> None:
+        # The write end is closed whatever happens, otherwise the reader never sees the end of the pipe
+        with os.fdopen(write_fd, "wb") as sink:
+            raw_connection = None
+            try:
+                raw_connection = engine.raw_connection()
+                raw_connection.cursor().copy_expert(f"COPY ({sql}) TO STDOUT WITH (FORMAT csv, HEADER true)", sink)
+            except BaseException as error:  # surfaced in the reading thread
+                errors.append(error)
+            finally:
+                if raw_connection is not None:
+                    raw_connection.close()
+
+    copier = threading.Thread(target=copy_out, daemon=True)
+    copier.start()
+
+    source = os.fdopen(read_fd, "rb")
+    try:
+        yield from pd.read_csv(source, chunksize=rows_per_file, **_csv_read_options(Table))
+    except Exception as error:
+        source.close()
+        copier.join()
+        if errors:
+            raise errors[0] from error  # the CSV was cut short because COPY failed, the database error is the cause
+        raise
+    finally:
+        source.close()
+        copier.join()
+
+    if errors:
+        raise errors[0]
+
+def _export_partition(engine: Engine, Table: Type[DeclarativeMeta], out_dir: Path, fmt: str, rows_per_file: int,
+                      month: Optional[Tuple[date, date]]) -> List[dict]:
+    """
+    Exports one table or one month of a partitioned table, returns the manifest entries of the written files.
+    """
+    table = Table.__table__
+    stmt = select(table)
+    partition_name = "all"
+
+    if month is not None:
+        date_column = table.c[PARTITION_COLUMNS[Table.__tablename__]]
+        stmt = stmt.where(date_column >= month[0], date_column < month[1])
+        partition_name = month[0].strftime("%Y-%m")
+
+    partition_dir = out_dir / Table.__tablename__ / partition_name
+    partition_dir.mkdir(parents=True, exist_ok=True)
+
+    is_postgres = engine.dialect.name == "postgresql"
+    sql = str(stmt.compile(engine, compile_kwargs={"literal_binds": True}))
+
+    with track_stage(f"export.{Table.__tablename__}") as metrics:
+
+        if fmt == "csv" and is_postgres:
+            # CSV needs no conversion, COPY writes straight to disk
+            path = partition_dir / "part-00000.csv"
+            raw_connection = engine.raw_connection()
+            try:
+                cursor = raw_connection.cursor()
+                with open(path, "wb") as sink:
+                    cursor.copy_expert(f"COPY ({sql}) TO STDOUT WITH (FORMAT csv, HEADER true)", sink)
+                rows = cursor.rowcount  # psycopg2 reports the rows copied
+            finally:
+                raw_connection.close()
+
+            metrics.rows_out = rows
+            return [{"path": str(path.relative_to(out_dir)), "partition": partition_name, "rows": rows}]
+
+        # Other engines have no COPY, their rows are read through pandas in the same bounded chunks
+        chunks = _copy_chunks(engine, Table, sql, rows_per_file) if is_postgres else pd.read_sql(stmt, engine, chunksize=rows_per_file)
+
+        files = []
+        with closing(chunks):  # on a failed write this stops the COPY thread and frees its connection
+            for part, chunk in enumerate(chunks):
+                path = partition_dir / f"part-{part:05d}"
+
+                if fmt == "parquet":
+                    path = path.with_suffix(".parquet")
+                    chunk.to_parquet(path, index=False)  # needs pyarrow or fastparquet installed
+                elif fmt == "npy":
+                    write_columns(path, chunk)
+                else:
+                    path = path.with_suffix(".csv")
+                    chunk.to_csv(path, index=False)
+
+                files.append({"path": str(path.relative_to(out_dir)), "partition": partition_name, "rows": len(chunk)})
+
+        metrics.rows_out = sum(entry["rows"] for entry in files)
+        return files
+
+def export_star_schema(engine: Engine, out_dir: str = "exports", fmt: str = "npy", workers: int = 4,
+                       rows_per_file: int = 1_000_000, tables: Optional[List[Type[DeclarativeMeta]]] = None) -> Path:
+    """
+    Exports the fact and dimension tables to columnar files for downstream analytics, in parallel per table and
+    per month partition, and writes a manifest.json describing every file.
+    Args:
+        engine (Engine): SQLAlchemy engine connected to the source database.
+        out_dir (str): Folder to export into, laid out as <table>/<partition>/part-NNNNN.<ext>.
+        fmt (str): "npy" (one .npy per column, see columnar_snapshot), "csv" or "parquet" (needs pyarrow or fastparquet,
+                   which are not project dependencies).
+        workers (int): Number of partitions exported concurrently, each on its own connection.
+        rows_per_file (int): Maximum rows held in memory and written per file.
+        tables (Optional[List[Type[DeclarativeMeta]]]): Tables to export, defaults to STAR_SCHEMA_TABLES.
+    Returns:
+        Path: Path of the manifest.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format {fmt}, expected one of {EXPORT_FORMATS}")
+
+    if fmt == "parquet":
+        pd.io.parquet.get_engine("auto")  # fails before anything is exported when neither pyarrow nor fastparquet is installed
+
+    out_path = Path(out_dir)
+    out_path.mkdir(parents=True, exist_ok=True)
+    tables = tables or STAR_SCHEMA_TABLES
+
+    tasks = []
+    for Table in tables:
+        date_column = PARTITION_COLUMNS.get(Table.__tablename__)
+        months = _month_ranges(engine, Table, date_column) if date_column else [None]
+        tasks.extend((Table, month) for month in (months or [None]))
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(
+            lambda task: _export_partition(engine, task[0], out_path, fmt, rows_per_file, task[1]), tasks
+        ))
+
+    manifest = {
+        "exported_at": datetime.now(timezone.utc).isoformat(),
+        "format": fmt,
+        "database": str(engine.url),  # password is masked when rendering the url
+        "tables": {},
+    }
+
+    for (Table, _), files in zip(tasks, results):
+        entry = manifest["tables"].setdefault(Table.__tablename__, {
+            "columns": [column.name for column in Table.__table__.columns],
+            "partition_column": PARTITION_COLUMNS.get(Table.__tablename__),
+            "rows": 0,
+            "files": [],
+        })
+        entry["files"].extend(files)
+        entry["rows"] += sum(file["rows"] for file in files)
+
+    manifest_path = out_path / "manifest.json"
+    manifest_path.write_text(json.dumps(manifest, indent=2))
+
+    return manifest_path
@@ -1,11 +1,20 @@
 import pandas as pd
 import numpy as np
-from typing import List, Tuple, Dict
+from typing import Optional, Tuple, Dict
+from pipeline_metrics import instrument_stage
+from dataset_cache import file_digest
+from schedule_model import ScheduleModel
+
+# flight_number is a String(10) and airline codes are 2 characters, so at most 8 digits follow the code
+FLIGHT_NUMBER_MAX_DIGITS = 8
+
+# Schedule models FlightDetailsGenerator can build: no skew at all, or hub weighted airports, routes, airlines and times
+SCHEDULES = ("uniform", "hub")
 
 class FlightDetailsGenerator:
     """
     A class to generate synthetic flight details for a given year.
-    Products Randomized flight numbers, airport, airline, and dates
+    Products Randomized flight numbers, airport, airline, dates and departure times
     """
 
     def __init__(
@@ -14,7 +23,9 @@ class FlightDetailsGenerator:
         airport_csv_file_path: str,
         year: int,
         flights_per_quarter: int,
-        seed: int = 42
+        seed: int = 42,
+        schedule: str = "uniform",
+        schedule_params: Optional[Dict[str, object]] = None
         
     ) -> None:
         """
@@ -25,17 +36,58 @@ class FlightDetailsGenerator:
             year (int): The year for which to generate flight details.
             flights_per_quarter (int): Number of flights to generate per quarter.
             seed (int): Random seed for reproducibility.
+            schedule (str): "uniform" or "hub", see ScheduleModel.
+            schedule_params (Optional[Dict[str, object]]): ScheduleModel arguments overriding the "hub" defaults.
         """
-        airline_codes = pd.read_csv(airline_csv_file_path)
-        self.airline_IATA = airline_codes["IATA"].dropna().unique().tolist()
-        airport_codes = pd.read_csv(airport_csv_file_path)
-        self.airports_IATA = airport_codes["IATA Code"].dropna().unique().tolist()
+        if schedule not in SCHEDULES:
+            raise ValueError(f"Unknown schedule {schedule}, expected one of {SCHEDULES}")
+
+        self.airline_csv_file_path = airline_csv_file_path
+        self.airport_csv_file_path = airport_csv_file_path
+        airline_codes = pd.read_csv(airline_csv_file_path).dropna(subset=["IATA"]).drop_duplicates("IATA")
+        self.airline_IATA = airline_codes["IATA"].tolist()
+        airport_codes = pd.read_csv(airport_csv_file_path).dropna(subset=["IATA Code"]).drop_duplicates("IATA Code")
+        self.airports_IATA = airport_codes["IATA Code"].tolist()
+
+        # Both CSVs list the busiest airports and largest airlines first, which the hub model ranks them by
+        airports = airport_codes.rename(columns={"IATA Code": "IATA"})
+        self.schedule = schedule
+        self.schedule_model = (
+            ScheduleModel.uniform(airports, airline_codes) if schedule == "uniform"
+            else ScheduleModel(airports, airline_codes, **(schedule_params or {}))
+        )
         self.year = year
         self.flights_per_quarter = flights_per_quarter
+        self.seed = seed
         
         # Random generator for all randomness in the class
         self.rng = np.random.default_rng(seed)
 
+        # 6 digits after the airline code, more when the busiest airline would otherwise use over half of its numbers,
+        # so redrawing taken numbers stays cheap
+        busiest_airline_flights = 4 * flights_per_quarter * self.schedule_model.airline_shares().max()
+        self.flight_number_digits = next(
+            (digits for digits in range(6, FLIGHT_NUMBER_MAX_DIGITS + 1) if busiest_airline_flights <= 10 ** digits / 2),
+            FLIGHT_NUMBER_MAX_DIGITS,
+        )
+
+        self._used_flight_keys = np.empty(0, dtype=np.int64)  # airline index * 10 ** digits + number of every flight generated so far
+        self._flights_per_airline = np.zeros(len(self.airline_IATA), dtype=np.int64)
+
+    def cache_params(self) -> Dict[str, object]:
+        """
+        Returns every parameter the generated flights depend on, used to key them in the DatasetCache.
+        """
+        return {
+            "year": self.year,
+            "flights_per_quarter": self.flights_per_quarter,
+            "seed": self.seed,
+            "schedule": self.schedule,
+            "schedule_params": self.schedule_model.cache_params(),
+            "airline_csv": file_digest(self.airline_csv_file_path),
+            "airport_csv": file_digest(self.airport_csv_file_path),
+        }
+
     def _quarter_ranges(self) -> Dict[str, Tuple[str,str]]:
         """
         Returns a dictionary with quarter names as keys and their corresponding start and end dates as values.
@@ -47,62 +99,58 @@ class FlightDetailsGenerator:
             "Q4": (f"{self.year}-10-01", f"{self.year}-12-31"),
         }
 
-    def _random_dates(self, start_date: str, end_date: str, n: int) -> pd.Series:
-        """
-        Generates a list of random dates between start_date and end_date.
-        Args:
-            start_date (str): The start date in 'YYYY-MM-DD'
-            end_date (str): The end date in 'YYYY-MM-DD'
-            n (int): Number of random dates to generate.
-        Returns:
-            pd.Series: A Series of random dates.
+    def _generate_flightnumbers(self, airline_index: np.ndarray) -> np.ndarray:
         """
-        start = np.datetime64(start_date)
-        end = np.datetime64(end_date)
-
-        #Total number of days in the range 
-        days = (end - start).astype(int) + 1 # the +1 makes the end date inclusive
-
-        #random offset fomr the start date
-        random_days = self.rng.integers(0, days, size=n)
-
-        return pd.to_datetime(start + random_days) 
-
-    def _generate_flightnumbers(self, n: int) -> Tuple[np.ndarray, List[str]]:
-        """
-        Generates unique flight numbers using: Airline IATA code and 6 random digits
+        Generates unique flight numbers using: Airline IATA code and flight_number_digits random digits (6 by default)
 
         Args:
-            n (int): Number of flight numbers to generate.
+            airline_index (np.ndarray): Index of the operating airline in airline_IATA, per flight.
 
         Returns:
-            Tuple[np.ndarray, List[str]]: A array of airline codes, list of unique flightnumbers
-        """
-
-        # Random airline assingment per row
-        airline_codes = self.rng.choice(self.airline_IATA, size=n, replace= True)
+            np.ndarray: Unique flight numbers
 
-        # Generate random 6 digit numbers
-        random_numbers = self.rng.integers(0, 1_000_000, size=n)
-        nums_str = [f"{num:06d}" for num in random_numbers]
+        Raises:
+            ValueError: If an airline would need more flight numbers than the digits allow.
+        """
+        n = len(airline_index)
+        capacity = 10 ** self.flight_number_digits
+
+        # Every airline needs a free number per flight, otherwise the redraws below would never end
+        flights_per_airline = self._flights_per_airline + np.bincount(airline_index, minlength=len(self.airline_IATA))
+        if flights_per_airline.max() > capacity:
+            busiest = int(flights_per_airline.argmax())
+            raise ValueError(
+                f"Airline {self.airline_IATA[busiest]} needs {flights_per_airline[busiest]} flight numbers but only {capacity} "
+                f"exist with {self.flight_number_digits} digits, generate fewer flights or use a less skewed schedule"
+            )
+        self._flights_per_airline = flights_per_airline
+
+        # Generate random numbers
+        random_numbers = self.rng.integers(0, capacity, size=n)
+
+        # Ensure uniqueness, also against earlier quarters since flight_number is the primary key:
+        # redraw the number of every repeated airline + number pair until none is left
+        used = self._used_flight_keys  # sorted
+        while True:
+            keys = airline_index.astype(np.int64) * capacity + random_numbers
+            order = np.argsort(keys)
+            sorted_keys = keys[order]
+
+            repeats = np.zeros(n, dtype=bool)
+            repeats[order[1:][sorted_keys[1:] == sorted_keys[:-1]]] = True  # every occurrence after the first
+            if len(used):
+                found = used[np.minimum(np.searchsorted(used, sorted_keys), len(used) - 1)] == sorted_keys  # sorted lookups stay cache friendly
+                repeats[order[found]] = True
+
+            if not repeats.any():
+                break
+            random_numbers[repeats] = self.rng.integers(0, capacity, size=int(repeats.sum()))
+
+        self._used_flight_keys = np.sort(np.concatenate([used, keys]))
 
         # Combine Airline + Number
-
-        flight_numbers = [airline_codes[i] + nums_str[i] for i in range(n)]
-
-        # Ensure uniqueness
-        if len(set(flight_numbers)) != len(flight_numbers):
-            seen = set()
-            final = []
-            for fn in flight_numbers:
-                while fn in seen:
-                    new_num = self.rng.integers(0, 1_000_000)
-                    fn = fn[:2] + f"{new_num:06d}"
-                seen.add(fn)
-                final.append(fn)
-            flight_numbers = final
-
-        return airline_codes, flight_numbers
+        airline_codes = pd.Series(np.asarray(self.airline_IATA, dtype=object)[airline_index])
+        return (airline_codes + pd.Series(random_numbers).astype(str).str.zfill(self.flight_number_digits)).to_numpy()
 
     def _generate_quarter(self, start:str, end: str) -> pd.DataFrame:
         """
@@ -114,59 +162,51 @@ class FlightDetailsGenerator:
             pd.DataFrame: DataFrame containing flight details for the quarter.
         """
         n = self.flights_per_quarter
-        
-        # Generate airline choices and flight numbers
-        airline_choices, flight_numbers = self._generate_flightnumbers(n)
-
-        # Random departure and arrival airports
-        departure_airport = self.rng.integers(0, len(self.airports_IATA), size = n)
-        arrival_airport = self.rng.integers(0, len(self.airports_IATA), size = n)
+        model = self.schedule_model
 
-        departure_airport = [self.airports_IATA[i] for i in departure_airport]
-        arrival_airport = [self.airports_IATA[i] for i in arrival_airport] 
+        # Departure and arrival airports from the route matrix, never the same airport
+        departure_airport, arrival_airport = model.sample_routes(self.rng, n)
 
-        # Ensure the departue and arrival airport is not the same
+        # Airline choices given the departure airport, and their flight numbers
+        airline_choices = model.sample_airlines(self.rng, departure_airport)
+        flight_numbers = self._generate_flightnumbers(airline_choices)
 
-        for i in range(n):
-            if departure_airport[i] == arrival_airport[i]:
-                new_idx = self.rng.integers(0, len(self.airports_IATA))
-                while self.airports_IATA[new_idx] == departure_airport[i]:
-                    new_idx = self.rng.integers(0, len(self.airports_IATA))
-                arrival_airport[i] = self.airports_IATA[new_idx]
+        dates = model.sample_dates(self.rng, start, end, n)
+        departure_minutes = model.sample_departure_minutes(self.rng, n)
 
-        dates = self._random_dates(start, end, n)
-        dates = pd.Series(dates)
+        # Departure times fall on 5 minute slots, so they are formatted once per slot instead of once per flight
+        slot_labels = np.array([f"{minute // 60:02d}:{minute % 60:02d}:00" for minute in range(0, 24 * 60, 5)], dtype=object)
 
         return pd.DataFrame({ 
             "flight_number": flight_numbers, 
-            "Departure_IATA": departure_airport, 
-            "Arrival_IATA": arrival_airport, 
-            "Airline_IATA": airline_choices, 
-            "flight_date": dates.dt.strftime("%Y-%m-%d") 
+            "Departure_IATA": model.airport_codes[departure_airport], 
+            "Arrival_IATA": model.airport_codes[arrival_airport], 
+            "Airline_IATA": model.airline_codes[airline_choices], 
+            "flight_date": np.datetime_as_string(dates, unit="D").astype(object),
+            "departure_time": slot_labels[departure_minutes // 5],
             })
 
     #  Public method to generate full data set
+    @instrument_stage("flight_details.generate")
     def generate(self) -> pd.DataFrame:
         """
         Generates a DataFrame containing flight details for the entire year.
         Returns:
             pd.DataFrame: DataFrame containing flight details for the year.
         """
-        print("Start generating flight details")
         all_quarters = []
         quarter_ranges = self._quarter_ranges()
-        print("first quarter")
         for quarter, (start, end) in quarter_ranges.items():
             
             quarter_df = self._generate_quarter(start, end)
-            print("next quarter")
             all_quarters.append(quarter_df)
 
         return pd.concat(all_quarters, ignore_index=True)
         
 
 
-gen = FlightDetailsGenerator( "Data/airline.csv", "Data/airports.csv", 2023, flights_per_quarter=2000 ) 
-df = gen.generate() 
-df = df.sort_values(by=["flight_date"], ascending=True).reset_index(drop=True)
-df.to_csv("Data/flights_details/flight_details_2023.csv", index=False)
+if __name__ == "__main__":
+    gen = FlightDetailsGenerator( "Data/airline.csv", "Data/airports.csv", 2023, flights_per_quarter=2000 ) 
+    df = gen.generate() 
+    df = df.sort_values(by=["flight_date"], ascending=True).reset_index(drop=True)
+    df.to_csv("Data/flights_details/flight_details_2023.csv", index=False)
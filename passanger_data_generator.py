@@ -1,21 +1,44 @@
-from faker import Faker
 import random
 from datetime import date, timedelta
 import pandas as pd
 import os
+from pipeline_metrics import current_stage, instrument_stage
+from typing import Optional
 
 
-fake = Faker()
+_fake = None  # Faker loads its locale providers when created, so it is only created once passengers are generated
 
-def generate_passanger_row(): 
+def get_faker():
+    """
+    Returns the shared Faker instance, creating it on first use.
+    """
+    global _fake
+
+    if _fake is None:
+        from faker import Faker
+        _fake = Faker()
+
+    return _fake
+
+def seed_passanger_generator(seed: Optional[int]) -> None:
+    """
+    Seeds Faker and random so the same seed produces the same passengers. None leaves them unseeded.
+    """
+    if seed is not None:
+        get_faker().seed_instance(seed)
+        random.seed(seed)
+
+def generate_passanger_row(reference_date: Optional[date] = None): 
     """Generates a single row of passenger data.
+    Args:
+    reference_date (Optional[date]): Date the passenger ages are counted from, defaults to today.
     Returns:
     dict: A dictionary representing a passenger's data.
     """
-    
+    fake = get_faker()
     given  =  fake.first_name() 
     family =  fake.last_name() # DOB realism: 14 days old → 85 years old 
-    today  =  date.today() 
+    today  =  reference_date or date.today() 
     min_dob = today.replace(year=today.year - 16)
     max_dob = today.replace(year=today.year - 85) 
     dob = fake.date_between(start_date=max_dob, end_date=min_dob) 
@@ -29,22 +52,39 @@ def generate_passanger_row():
             "email": f"{given.lower()}.{family.lower()}@{fake.free_email_domain()}" 
             }
 
-def passanger_generator(num_passangers: int): 
+def passanger_generator(num_passangers: int, reference_date: Optional[date] = None): 
     """
     Generator function that yields a specified number of passenger data rows.
     Args:
         num_passangers (int): The number of passenger rows to generate.
+        reference_date (Optional[date]): Date the passenger ages are counted from, defaults to today.
     Yields:
         dict: A dictionary representing a passenger's data.    
         """
    
     for _ in range(num_passangers): 
-        yield generate_passanger_row()
+        yield generate_passanger_row(reference_date)
+
+def generate_passangers_df(n: int, seed: Optional[int] = None, reference_date: Optional[date] = None) -> pd.DataFrame:
+    """
+    Generates passengers into a DataFrame instead of a CSV file.
+    Args:
+        n (int): The number of passengers to generate.
+        seed (Optional[int]): Random seed for reproducibility.
+        reference_date (Optional[date]): Date the passenger ages are counted from, defaults to today.
+    Returns:
+        pd.DataFrame: The generated passengers.
+    """
+    seed_passanger_generator(seed)
+    return pd.DataFrame(passanger_generator(n, reference_date))
 
-def write_passangers_to_csv(n, chunk_size=50000, path="passengers.csv"): 
+@instrument_stage("write_passangers_to_csv")
+def write_passangers_to_csv(n, chunk_size=50000, path="passengers.csv", seed: Optional[int] = None, reference_date: Optional[date] = None): 
     
-    gen = passanger_generator(n) 
+    seed_passanger_generator(seed)
+    gen = passanger_generator(n, reference_date) 
     first = not os.path.exists(path)
+    rows_written = 0
     
     while True: 
         chunk = [] 
@@ -60,6 +100,9 @@ def write_passangers_to_csv(n, chunk_size=50000, path="passengers.csv"):
         df = pd.DataFrame(chunk) 
         df.to_csv(path, mode="a", header=first, index=False) 
         first = False
+        rows_written += len(df)
+
+    current_stage().rows_out = rows_written
 
 if __name__ == "__main__":
     write_passangers_to_csv(20000, path = "Data/Passenger details/passengers.csv")  # Generate 20k passenger records
\ No newline at end of file
@@ -0,0 +1,246 @@
+from sqlalchemy.engine import Engine
+from sqlalchemy import select
+from create_classes_for_tables import Passanger
+from cleaning_data import normalize_email, normalize_name
+from typing import Callable, Dict, Iterable, Tuple
+import numpy as np
+import pandas as pd
+
+SOUNDEX_CODES = {
+    **dict.fromkeys("BFPV", "1"), **dict.fromkeys("CGJKQSXZ", "2"), **dict.fromkeys("DT", "3"),
+    "L": "4", **dict.fromkeys("MN", "5"), "R": "6",
+}
+
+def soundex(name: str) -> str:
+    """
+    American Soundex code of a name, e.g. "Robert" and "Rupert" both give "R163".
+    Args:
+        name (str): The name to encode.
+    Returns:
+        str: Four character code, empty if the name has no letters.
+    """
+    letters = [c for c in name.upper() if "A" <= c <= "Z"]
+
+    if not letters:
+        return ""
+
+    code = letters[0]
+    previous = SOUNDEX_CODES.get(letters[0], "")
+
+    for letter in letters[1:]:
+        digit = SOUNDEX_CODES.get(letter, "")
+        if digit and digit != previous:
+            code += digit
+        if letter not in "HW":  # H and W do not separate letters with the same code
+            previous = digit
+
+    return (code + "000")[:4]
+
+def _soundex_series(names: pd.Series) -> pd.Series:
+    """
+    Soundex codes of a column, each distinct name is only encoded once.
+    """
+    codes = {name: soundex(name) for name in names.dropna().unique()}
+    return names.map(codes).astype("string")
+
+def _phone_digits(phone_numbers: pd.Series) -> pd.Series:
+    """
+    Last nine digits of a phone number, so country prefixes, formatting and extensions (e.g. "206.269.0743x9150",
+    as Faker writes them) do not matter.
+    """
+    numbers = phone_numbers.astype("string").str.replace(r"\s*(?:x|ext\.?)\s*\d+\s*$", "", regex=True, case=False)
+    return numbers.str.replace(r"\D", "", regex=True).str[-9:].replace("", pd.NA)
+
+def normalize_people(people: pd.DataFrame) -> pd.DataFrame:
+    """
+    Brings passengers or claimants into one comparable shape, using the same normalization as clean_passenger_df.
+    A free-form "name" column is split into given_name (all but the last word) and family_name (last word)
+    when the separate columns are missing.
+    Args:
+        people (pd.DataFrame): Rows with family_name/given_name or name, and optionally date_of_birth, email, phone_number.
+    Returns:
+        pd.DataFrame: Columns family_name, given_name, date_of_birth, email, phone_digits, family_soundex, given_soundex.
+    """
+    people = people.reset_index(drop=True)
+    missing = pd.Series(pd.NA, index=people.index, dtype="string")
+
+    if "family_name" not in people.columns and "name" in people.columns:
+        parts = people["name"].astype("string").str.strip().str.rsplit(" ", n=1, expand=True)
+        parts = parts.reindex(columns=[0, 1]).astype("string")  # an empty batch has no columns, single words have no second one
+
+        single_word = parts[1].isna()
+        given, family = parts[0].mask(single_word), parts[1].fillna(parts[0])
+        people = people.assign(given_name=given, family_name=family)
+
+    normalized = pd.DataFrame({
+        "family_name": normalize_name(people.get("family_name", missing).astype("string")),
+        "given_name": normalize_name(people.get("given_name", missing).astype("string")),
+        "date_of_birth": pd.to_datetime(people.get("date_of_birth", missing), errors="coerce"),
+        "email": normalize_email(people.get("email", missing).astype("string")),
+        "phone_digits": _phone_digits(people.get("phone_number", missing)),
+    })
+
+    normalized["family_soundex"] = _soundex_series(normalized["family_name"])
+    normalized["given_soundex"] = _soundex_series(normalized["given_name"])
+
+    return normalized
+
+def _join_key(*parts: pd.Series) -> pd.Series:
+    """
+    Concatenates key parts, the key is missing if any part is missing.
+    """
+    key = parts[0].astype("string")
+    for part in parts[1:]:
+        key = key + "|" + part.astype("string")
+    return key
+
+# Blocking key name → function building the key from normalized people. Candidates must share at least one key.
+BLOCKING_KEYS: Dict[str, Callable[[pd.DataFrame], pd.Series]] = {
+    "email": lambda people: people["email"],
+    "family_soundex_birth_year": lambda people: _join_key(people["family_soundex"], people["date_of_birth"].dt.year),
+    "given_soundex_birth_date": lambda people: _join_key(people["given_soundex"], people["date_of_birth"].dt.strftime("%Y-%m-%d")),
+    "phone": lambda people: people["phone_digits"],
+}
+
+# Weight of each agreeing field in the match score, the weights add up to 1
+FIELD_WEIGHTS = {
+    "email": 0.30,
+    "family_name": 0.20,
+    "given_name": 0.15,
+    "date_of_birth": 0.20,
+    "phone_digits": 0.15,
+}
+
+def _hash_keys(keys: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Hashes blocking keys to uint64 so blocks can be searched with numpy, returns (hashes, key is present mask).
+    """
+    present = keys.notna().to_numpy()
+    hashes = pd.util.hash_pandas_object(keys.fillna(""), index=False).to_numpy()
+    return hashes, present
+
+class PassengerMatcher:
+    """
+    Matches PIR claimants to Passanger rows.
+    Passengers are grouped into blocks by several keys up front, and a claim is only scored against the
+    passengers sharing at least one of its blocks, instead of against every passenger.
+    """
+
+    def __init__(self, passengers: pd.DataFrame, blocking_keys: Iterable[str] = tuple(BLOCKING_KEYS), max_block_size: int = 5000) -> None:
+        """
+        Normalizes the passengers and builds one sorted index per blocking key.
+        Args:
+            passengers (pd.DataFrame): Passanger rows, including the passangerID column.
+            blocking_keys (Iterable[str]): Names from BLOCKING_KEYS to index. More keys raise recall and cost.
+            max_block_size (int): Blocks larger than this are skipped as uninformative (e.g. a very common surname).
+        """
+        self.passenger_ids = passengers["passangerID"].to_numpy()
+        self.passengers = normalize_people(passengers)
+        self.blocking_keys = list(blocking_keys)
+        self.max_block_size = max_block_size
+
+        # key name → (sorted key hashes, passenger positions in the same order)
+        self._blocks: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+
+        for key_name in self.blocking_keys:
+            hashes, present = _hash_keys(BLOCKING_KEYS[key_name](self.passengers))
+            positions = np.flatnonzero(present)
+            order = np.argsort(hashes[positions], kind="stable")
+            self._blocks[key_name] = (hashes[positions][order], positions[order])
+
+    @classmethod
+    def from_db(cls, engine: Engine, **kwargs) -> "PassengerMatcher":
+        """
+        Builds a matcher over every passenger in the database.
+        Args:
+            engine (Engine): SQLAlchemy engine connected to the target database.
+            **kwargs: Passed on to PassengerMatcher.
+        Returns:
+            PassengerMatcher: The matcher.
+        """
+        stmt = select(
+            Passanger.passangerID, Passanger.family_name, Passanger.given_name,
+            Passanger.date_of_birth, Passanger.email, Passanger.phone_number,
+        )
+        return cls(pd.read_sql(stmt, engine), **kwargs)
+
+    def _candidate_pairs(self, claims: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns (claim position, passenger position) for every passenger sharing a block with a claim, without duplicates.
+        """
+        claim_parts, passenger_parts = [], []
+
+        for key_name in self.blocking_keys:
+            sorted_hashes, positions = self._blocks[key_name]
+            claim_hashes, present = _hash_keys(BLOCKING_KEYS[key_name](claims))
+
+            # Each claim's block is the run [left, right) of equal hashes in the sorted index
+            left = np.searchsorted(sorted_hashes, claim_hashes, side="left")
+            right = np.searchsorted(sorted_hashes, claim_hashes, side="right")
+            sizes = np.where(present & (right - left <= self.max_block_size), right - left, 0)
+
+            claim_index = np.repeat(np.arange(len(claims)), sizes)
+            run_offsets = np.arange(sizes.sum()) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+
+            claim_parts.append(claim_index)
+            passenger_parts.append(positions[np.repeat(left, sizes) + run_offsets])
+
+        pairs = np.unique(np.concatenate(claim_parts).astype(np.int64) * len(self.passenger_ids) + np.concatenate(passenger_parts))
+        return pairs // len(self.passenger_ids), pairs % len(self.passenger_ids)
+
+    def score_candidates(self, claims: pd.DataFrame) -> pd.DataFrame:
+        """
+        Scores every claim against the passengers in its blocks.
+        Args:
+            claims (pd.DataFrame): Claimant rows, see normalize_people for the accepted columns.
+        Returns:
+            pd.DataFrame: claim_position, passangerID and score (0 to 1) per candidate pair.
+        """
+        normalized_claims = normalize_people(claims)
+        claim_index, passenger_index = self._candidate_pairs(normalized_claims)
+
+        def agrees(field: str) -> np.ndarray:
+            claim_values = normalized_claims[field].take(claim_index).reset_index(drop=True)
+            passenger_values = self.passengers[field].take(passenger_index).reset_index(drop=True)
+            return (claim_values == passenger_values).fillna(False).to_numpy(dtype=bool)  # missing never agrees
+
+        score = np.zeros(len(claim_index))
+        for field, weight in FIELD_WEIGHTS.items():
+            score += weight * agrees(field)
+
+        # Partial credit when the names only sound alike (typos, transliterations)
+        for field, code_field in (("family_name", "family_soundex"), ("given_name", "given_soundex")):
+            score += 0.5 * FIELD_WEIGHTS[field] * (agrees(code_field) & ~agrees(field))
+
+        return pd.DataFrame({
+            "claim_position": claim_index,
+            "passangerID": self.passenger_ids[passenger_index],
+            "score": score,
+        })
+
+    def match(self, claims: pd.DataFrame, threshold: float = 0.6) -> pd.DataFrame:
+        """
+        Finds the best matching passenger for every claim.
+        Args:
+            claims (pd.DataFrame): Claimant rows, see normalize_people for the accepted columns.
+            threshold (float): Minimum score to accept a match, lower it to trade precision for recall.
+        Returns:
+            pd.DataFrame: One row per claim in input order with passangerID (missing if no match), score and candidate count.
+        """
+        scored = self.score_candidates(claims)
+
+        result = pd.DataFrame({"claim_position": np.arange(len(claims))})
+
+        candidates = scored.groupby("claim_position").size().rename("candidates")
+        best = (
+            scored[scored["score"] >= threshold]
+            .sort_values(["claim_position", "score"], ascending=[True, False], kind="stable")
+            .drop_duplicates("claim_position")
+            .set_index("claim_position")
+        )
+
+        result = result.join(best, on="claim_position").join(candidates, on="claim_position")
+        result["passangerID"] = result["passangerID"].astype("Int64")
+        result["candidates"] = result["candidates"].fillna(0).astype(int)
+
+        return result.drop(columns="claim_position")
@@ -0,0 +1,282 @@
+"""
+Command line entry point for every pipeline stage.
+
+    python pipeline_cli.py generate flights --year 2023 --flights-per-quarter 2000
+    python pipeline_cli.py generate passengers -n 20000
+    python pipeline_cli.py load reference
+    python pipeline_cli.py load passengers
+    python pipeline_cli.py load flights
+    python pipeline_cli.py generate bookings
+    python pipeline_cli.py generate luggage
+    python pipeline_cli.py generate pir
+    python pipeline_cli.py export --format npy
+    python pipeline_cli.py bench
+    python pipeline_cli.py --backend embedded bench   # no PostgreSQL needed, see create_embedded_engine
+
+Only argparse is imported at startup. pandas, SQLAlchemy, Faker and the pipeline modules are imported inside the
+command that needs them, so --help answers immediately and no command connects to the database unless it has to.
+"""
+import argparse
+import os
+import sys
+from typing import List, Optional
+
+def _print_stage_summary() -> None:
+    """
+    Prints one line per finished pipeline stage of this process.
+    """
+    from pipeline_metrics import completed_stages
+
+    print(f"{'stage':<40} {'seconds':>9} {'rows in':>11} {'rows out':>11} {'rows/s':>11} {'db trips':>9} {'peak MB':>9}")
+    for metrics in completed_stages:
+        print(
+            f"{metrics.stage:<40} {metrics.wall_seconds:>9.3f} {metrics.rows_in if metrics.rows_in is not None else '':>11} "
+            f"{metrics.rows_out if metrics.rows_out is not None else '':>11} "
+            f"{f'{metrics.rows_per_second:.0f}' if metrics.rows_per_second else '':>11} {metrics.db_round_trips:>9} "
+            f"{f'{metrics.peak_memory_mb:.0f}' if metrics.peak_memory_mb else '':>9}"
+        )
+
+def _save_or_load(df, Table, out: Optional[str], chunk_size: int) -> None:
+    """
+    Writes generated rows to a CSV when out is given, otherwise loads them into the database.
+    """
+    if out:
+        df.to_csv(out, index=False)
+        print(f"Wrote {len(df)} rows to {out}")
+        return
+
+    from read_data_into_tables import load_df_sql
+    load_df_sql(df, Table, chunk_size=chunk_size)
+    print(f"Loaded {len(df)} rows into {Table.__tablename__}")
+
+def generate_flights(args: argparse.Namespace) -> None:
+    from flight_details_generator import FlightDetailsGenerator
+
+    generator = FlightDetailsGenerator(args.airline_csv, args.airport_csv, args.year, args.flights_per_quarter, seed=args.seed, schedule=args.schedule)
+    df = generator.generate().sort_values(by=["flight_date"], ascending=True).reset_index(drop=True)
+
+    out = args.out or f"Data/flights_details/flight_details_{args.year}.csv"
+    df.to_csv(out, index=False)
+    print(f"Wrote {len(df)} flights to {out}")
+
+def generate_passengers(args: argparse.Namespace) -> None:
+    from passanger_data_generator import write_passangers_to_csv
+
+    write_passangers_to_csv(args.n, chunk_size=args.chunk_size, path=args.out, seed=args.seed)
+    print(f"Wrote {args.n} passengers to {args.out}")
+
+def generate_bookings(args: argparse.Namespace) -> None:
+    from read_data_into_tables import get_engine
+    from create_classes_for_tables import BookedFlight
+    from booked_flights_generator import BookFlightGenerator
+
+    generator = BookFlightGenerator(get_engine(), seed=args.seed)
+    generator.load_flight_details_from_db("Flight_Details")
+    generator.load_passengers_from_db("Passanger")
+    _save_or_load(generator.generate_booked_flights(args.max_capacity), BookedFlight, args.out, args.chunk_size)
+
+def generate_luggage(args: argparse.Namespace) -> None:
+    from read_data_into_tables import get_engine
+    from create_classes_for_tables import BookedLuggage
+    from booked_luggage_generator import BookedLuggageGenerator
+
+    generator = BookedLuggageGenerator(get_engine(), seed=args.seed)
+    _save_or_load(generator.generate_booked_luggage(), BookedLuggage, args.out, args.chunk_size)
+
+def generate_pir(args: argparse.Namespace) -> None:
+    from read_data_into_tables import get_engine
+    from create_classes_for_tables import FactPIR
+    from pir_report_generator import PIRReportGenerator
+
+    generator = PIRReportGenerator(get_engine(), seed=args.seed, pir_rate=args.pir_rate)
+    _save_or_load(generator.generate_pir_reports(), FactPIR, args.out, args.chunk_size)
+
+def _load_reference_data(airline_csv: str, airport_csv: str, load_frame) -> None:
+    """
+    Loads countries, airports and airlines, which every other table references.
+    """
+    from read_data_into_tables import create_countryregion_table
+    from create_classes_for_tables import Airline, Airport, CountryRegion
+
+    airports_df, airlines_df = create_countryregion_table(airline_csv, airport_csv, CountryRegion)
+    airports_df = airports_df.rename(columns={"Airport Name": "Airport_name", "IATA Code": "IATA"})
+    load_frame(airports_df, Airport)
+    load_frame(airlines_df, Airline)
+
+def load(args: argparse.Namespace) -> None:
+    from read_data_into_tables import load_df_sql, load_df_sql_parallel, process_folder
+    from create_classes_for_tables import Flight_Details, Passanger
+
+    def load_frame(df, Table) -> None:
+        if args.writers > 1 and args.mode == "insert":
+            load_df_sql_parallel(df, Table, writers=args.writers, chunk_size=args.chunk_size)
+        else:
+            load_df_sql(df, Table, chunk_size=args.chunk_size, mode=args.mode)
+
+    if args.what == "reference":
+        _load_reference_data(args.airline_csv, args.airport_csv, load_frame)
+
+    elif args.what == "passengers":
+        from cleaning_data import clean_passenger_df
+
+        for passanger_df in process_folder(args.folder or "Data/Passenger details"):
+            load_frame(clean_passenger_df(passanger_df), Passanger)
+
+    else:
+        for flight_details_df in process_folder(args.folder or "Data/flights_details"):
+            load_frame(flight_details_df, Flight_Details)
+
+def export(args: argparse.Namespace) -> None:
+    from read_data_into_tables import get_engine
+    from export_tables import export_star_schema
+
+    manifest_path = export_star_schema(get_engine(), out_dir=args.out, fmt=args.format, workers=args.workers, rows_per_file=args.rows_per_file)
+    print(f"Manifest written to {manifest_path}")
+
+def bench(args: argparse.Namespace) -> None:
+    """
+    Loads the reference data, then runs the whole generate and load pipeline against the configured database.
+    main prints the metrics of every stage afterwards.
+    Without --cache-dir a throwaway dataset cache is used, so every stage really runs.
+    """
+    import tempfile
+    from read_data_into_tables import get_engine, load_df_sql
+    from create_classes_for_tables import FactPIR
+    from dataset_cache import DatasetCache, build_fixture_database
+    from pir_report_generator import PIRReportGenerator
+
+    def load_frame(df, Table) -> None:
+        load_df_sql(df, Table, chunk_size=10000)
+
+    # Flights reference airports and airlines, PostgreSQL rejects them on a database without reference data
+    _load_reference_data(args.airline_csv, args.airport_csv, load_frame)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cache = DatasetCache(args.cache_dir or tmp_dir)
+        build_fixture_database(
+            cache, year=args.year, flights_per_quarter=args.flights_per_quarter,
+            num_passangers=args.passengers, max_capacity=args.max_capacity, seed=args.seed,
+            airline_csv_file_path=args.airline_csv, airport_csv_file_path=args.airport_csv, schedule=args.schedule,
+        )
+
+    load_df_sql(PIRReportGenerator(get_engine(), seed=args.seed).generate_pir_reports(), FactPIR, chunk_size=10000)
+
+def build_parser() -> argparse.ArgumentParser:
+    """
+    Builds the argument parser of every command.
+    """
+    parser = argparse.ArgumentParser(prog="pipeline_cli", description="Luggage claims data pipeline.")
+    parser.add_argument("--backend", choices=["postgres", "embedded"],
+                        help="Storage backend, defaults to PIPELINE_BACKEND or postgres. embedded needs no server.")
+    parser.add_argument("--embedded-path", help="Database file of the embedded backend, defaults to Data/luggage.db.")
+    parser.add_argument("--metrics-file", help="Append one JSON line of metrics per finished stage to this file.")
+    parser.add_argument("--profile", help="Comma separated stage names to run under cProfile, or 'all'.")
+    parser.add_argument("--profile-dir", help="Folder the .prof files are written to.")
+    parser.add_argument("--summary", action="store_true", help="Print the metrics of every stage when the command ends.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    # generate ...
+    generate = commands.add_parser("generate", help="Generate synthetic data.")
+    datasets = generate.add_subparsers(dest="dataset", required=True)
+
+    flights = datasets.add_parser("flights", help="Generate a year of flight details into a CSV.")
+    flights.add_argument("--year", type=int, default=2023)
+    flights.add_argument("--flights-per-quarter", type=int, default=2000)
+    flights.add_argument("--seed", type=int, default=42)
+    flights.add_argument("--schedule", choices=["uniform", "hub"], default="uniform",
+                         help="hub skews airports, routes, airlines, weekdays and departure times like a real schedule.")
+    flights.add_argument("--airline-csv", default="Data/airline.csv")
+    flights.add_argument("--airport-csv", default="Data/airports.csv")
+    flights.add_argument("--out", help="CSV to write, defaults to Data/flights_details/flight_details_<year>.csv.")
+    flights.set_defaults(handler=generate_flights)
+
+    passengers = datasets.add_parser("passengers", help="Generate passengers into a CSV.")
+    passengers.add_argument("-n", type=int, default=20000, help="Number of passengers.")
+    passengers.add_argument("--chunk-size", type=int, default=50000)
+    passengers.add_argument("--seed", type=int)
+    passengers.add_argument("--out", default="Data/Passenger details/passengers.csv")
+    passengers.set_defaults(handler=generate_passengers)
+
+    for name, handler, help_text in (
+        ("bookings", generate_bookings, "Book the loaded passengers onto the loaded flights."),
+        ("luggage", generate_luggage, "Generate checked bags for the booked flights."),
+        ("pir", generate_pir, "Generate PIRs for the booked bags that have none."),
+    ):
+        dataset = datasets.add_parser(name, help=f"{help_text} Loaded into the database unless --out is given.")
+        dataset.add_argument("--seed", type=int)
+        dataset.add_argument("--chunk-size", type=int, default=10000)
+        dataset.add_argument("--out", help="Write a CSV instead of loading the rows.")
+        dataset.set_defaults(handler=handler)
+
+    datasets.choices["bookings"].add_argument("--max-capacity", type=int, default=20)
+    datasets.choices["pir"].add_argument("--pir-rate", type=float, default=0.007, help="Probability that a bag is mishandled.")
+
+    # load
+    load_parser = commands.add_parser("load", help="Load CSV data into the database.")
+    load_parser.add_argument("what", choices=["reference", "passengers", "flights"],
+                             help="reference loads countries, airports and airlines, the others every CSV in their folder.")
+    load_parser.add_argument("--folder", help="Folder of CSVs, defaults to the one under Data/.")
+    load_parser.add_argument("--airline-csv", default="Data/airline.csv")
+    load_parser.add_argument("--airport-csv", default="Data/airports.csv")
+    load_parser.add_argument("--chunk-size", type=int, default=10000)
+    load_parser.add_argument("--mode", choices=["insert", "merge"], default="insert")
+    load_parser.add_argument("--writers", type=int, default=1, help="Concurrent writers for insert mode.")
+    load_parser.set_defaults(handler=load)
+
+    # export
+    export_parser = commands.add_parser("export", help="Export the star schema for analytics.")
+    export_parser.add_argument("--out", default="exports")
+    export_parser.add_argument("--format", choices=["npy", "csv", "parquet"], default="npy",
+                               help="parquet needs pyarrow or fastparquet installed.")
+    export_parser.add_argument("--workers", type=int, default=4)
+    export_parser.add_argument("--rows-per-file", type=int, default=1_000_000)
+    export_parser.set_defaults(handler=export)
+
+    # bench
+    bench_parser = commands.add_parser("bench", help="Run the full pipeline on an empty database and report every stage.")
+    bench_parser.add_argument("--year", type=int, default=2023)
+    bench_parser.add_argument("--flights-per-quarter", type=int, default=2000)
+    bench_parser.add_argument("--passengers", type=int, default=20000)
+    bench_parser.add_argument("--max-capacity", type=int, default=20)
+    bench_parser.add_argument("--seed", type=int, default=42)
+    bench_parser.add_argument("--schedule", choices=["uniform", "hub"], default="uniform")
+    bench_parser.add_argument("--airline-csv", default="Data/airline.csv")
+    bench_parser.add_argument("--airport-csv", default="Data/airports.csv")
+    bench_parser.add_argument("--cache-dir", help="Reuse cached datasets from this folder instead of generating everything.")
+    bench_parser.set_defaults(handler=bench)
+
+    return parser
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Parses the command line and runs the chosen command.
+    Args:
+        argv (Optional[List[str]]): Arguments without the program name, defaults to sys.argv[1:].
+    Returns:
+        int: Exit code.
+    """
+    args = build_parser().parse_args(argv)
+
+    # Read by get_engine when a command first needs the database, so nothing is imported or connected here
+    if args.backend:
+        os.environ["PIPELINE_BACKEND"] = args.backend
+    if args.embedded_path:
+        os.environ["PIPELINE_EMBEDDED_PATH"] = args.embedded_path
+
+    if args.metrics_file or args.profile or args.profile_dir:
+        from pipeline_metrics import configure_metrics
+        configure_metrics(
+            jsonl_path=args.metrics_file,
+            profile_stages=args.profile.split(",") if args.profile else None,
+            profile_dir=args.profile_dir,
+        )
+
+    args.handler(args)
+
+    if args.summary or args.handler is bench:  # bench always reports its stages
+        _print_stage_summary()
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
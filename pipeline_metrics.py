@@ -0,0 +1,328 @@
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional
+import cProfile
+import json
+import os
+import threading
+import time
+
+try:
+    import resource  # not available on Windows, peak memory is then reported as None
+except ImportError:
+    resource = None
+
+@dataclass
+class StageMetrics:
+    """
+    Measurements recorded for one run of one pipeline stage.
+    """
+    stage: str
+    started_at: float = field(default_factory=time.time)  # unix timestamp the stage started at
+    wall_seconds: float = 0.0
+    rows_in: Optional[int] = None
+    rows_out: Optional[int] = None
+    rows_per_second: Optional[float] = None
+    db_round_trips: int = 0
+    peak_memory_mb: Optional[float] = None  # highest resident memory of the process sampled while the stage ran
+    profile_path: Optional[str] = None
+
+class _MetricsConfig:
+    """
+    Process wide settings of the instrumentation layer, initialised from environment variables.
+    """
+
+    def __init__(self) -> None:
+        self.jsonl_path: Optional[str] = os.environ.get("PIPELINE_METRICS_FILE")  # append one JSON line per stage
+        self.profile_stages = set(filter(None, os.environ.get("PIPELINE_PROFILE", "").split(",")))  # stage names or "all"
+        self.profile_dir: str = os.environ.get("PIPELINE_PROFILE_DIR", "profiles")
+
+_config = _MetricsConfig()
+_lock = threading.Lock()
+_profiling_active = False  # cProfile cannot profile nested or concurrent stages twice, guarded by _lock
+_running_stages: Dict[int, StageMetrics] = {}  # id → metrics of every stage running in any thread, guarded by _lock
+_stages_running = threading.Event()  # wakes the memory sampler
+_memory_sampler: Optional[threading.Thread] = None
+
+# Seconds between two resident memory samples while a stage runs
+MEMORY_SAMPLE_SECONDS = 0.01
+_current_stage: ContextVar[Optional[StageMetrics]] = ContextVar("current_stage", default=None)
+
+# Totals per stage used for the Prometheus text exposition
+_totals: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+# Every finished stage of this process, in completion order
+completed_stages: List[StageMetrics] = []
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _count_round_trip(conn, cursor, statement, parameters, context, executemany) -> None:
+    """
+    Counts every statement sent to any database against the stage running in the sending thread's context,
+    so concurrent stages do not count each other's statements. An executemany batch counts once.
+    """
+    metrics = _current_stage.get()
+
+    if metrics is not None:
+        with _lock:  # worker threads started with the stage's context count into the same stage
+            metrics.db_round_trips += 1
+
+def configure_metrics(jsonl_path: Optional[str] = None, profile_stages: Optional[List[str]] = None, profile_dir: Optional[str] = None) -> None:
+    """
+    Overrides the settings taken from the PIPELINE_METRICS_FILE, PIPELINE_PROFILE and PIPELINE_PROFILE_DIR environment variables.
+    Args:
+        jsonl_path (Optional[str]): File every finished stage is appended to as one JSON line.
+        profile_stages (Optional[List[str]]): Stage names to run under cProfile, ["all"] profiles every stage.
+        profile_dir (Optional[str]): Folder the .prof files are written to.
+    Returns:
+        None
+    """
+    if jsonl_path is not None:
+        _config.jsonl_path = jsonl_path
+    if profile_stages is not None:
+        _config.profile_stages = set(profile_stages)
+    if profile_dir is not None:
+        _config.profile_dir = profile_dir
+
+def current_stage() -> Optional[StageMetrics]:
+    """
+    Returns the metrics of the innermost running stage so the stage can report its own row counts.
+    """
+    return _current_stage.get()
+
+def _peak_memory_mb() -> Optional[float]:
+    """
+    Returns the peak resident memory of the process in megabytes.
+    """
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # ru_maxrss is in kilobytes on Linux
+
+def _resident_memory_mb() -> Optional[float]:
+    """
+    Returns the current resident memory of the process in megabytes, read from /proc on Linux. Elsewhere the
+    process high-water mark is the best available value.
+    """
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, AttributeError):
+        return _peak_memory_mb()
+
+def _sample_memory() -> None:
+    """
+    Raises the peak of every running stage to the current resident memory.
+    """
+    resident_mb = _resident_memory_mb()
+    if resident_mb is None:
+        return
+
+    with _lock:
+        for metrics in _running_stages.values():
+            metrics.peak_memory_mb = max(metrics.peak_memory_mb or 0.0, resident_mb)
+
+def _sample_memory_forever() -> None:
+    """
+    Body of the memory sampler thread, samples every MEMORY_SAMPLE_SECONDS while any stage runs and sleeps otherwise.
+    """
+    while True:
+        _stages_running.wait()
+        _sample_memory()
+        time.sleep(MEMORY_SAMPLE_SECONDS)
+
+def _start_memory_tracking(metrics: StageMetrics) -> None:
+    """
+    Registers a starting stage with the memory sampler, its peak starts at the current resident memory.
+    """
+    global _memory_sampler
+
+    metrics.peak_memory_mb = _resident_memory_mb()
+
+    with _lock:
+        _running_stages[id(metrics)] = metrics
+        _stages_running.set()
+
+        if _memory_sampler is None:
+            _memory_sampler = threading.Thread(target=_sample_memory_forever, name="stage-memory-sampler", daemon=True)
+            _memory_sampler.start()
+
+def _stop_memory_tracking(metrics: StageMetrics) -> None:
+    """
+    Takes a last sample, so short stages also see their final memory, and unregisters the stage.
+    """
+    _sample_memory()
+
+    with _lock:
+        _running_stages.pop(id(metrics), None)
+        if not _running_stages:
+            _stages_running.clear()
+
+def _record(metrics: StageMetrics) -> None:
+    """
+    Stores a finished stage and exports it to the configured JSON lines file.
+    """
+    with _lock:
+        completed_stages.append(metrics)
+
+        totals = _totals[metrics.stage]
+        totals["runs"] += 1
+        totals["seconds"] += metrics.wall_seconds
+        totals["rows_in"] += metrics.rows_in or 0
+        totals["rows_out"] += metrics.rows_out or 0
+        totals["db_round_trips"] += metrics.db_round_trips
+        totals["peak_memory_mb"] = max(totals["peak_memory_mb"], metrics.peak_memory_mb or 0)
+
+        if _config.jsonl_path:
+            with open(_config.jsonl_path, "a") as jsonl_file:
+                jsonl_file.write(json.dumps(asdict(metrics)) + "\n")
+
+@contextmanager
+def track_stage(stage: str, rows_in: Optional[int] = None) -> Iterator[StageMetrics]:
+    """
+    Measures wall time, row throughput, database round-trips and peak memory of the wrapped block.
+    Peak memory is the highest resident memory of the process sampled while the block ran, so concurrent stages
+    see each other's allocations.
+    Stages listed in the profile settings are also run under cProfile and dumped to a .prof file.
+    Args:
+        stage (str): Name of the stage, e.g. "load_df_sql".
+        rows_in (Optional[int]): Number of rows the stage received, if known up front.
+    Yields:
+        StageMetrics: The metrics of the running stage, set rows_out on it before the block ends.
+    """
+    global _profiling_active
+
+    metrics = StageMetrics(stage=stage, rows_in=rows_in)
+    parent = _current_stage.get()
+    token = _current_stage.set(metrics)
+
+    profiler = None
+    if stage in _config.profile_stages or "all" in _config.profile_stages:
+        with _lock:  # stages of a thread pool race for the single profiler otherwise
+            if not _profiling_active:
+                profiler = cProfile.Profile()
+                _profiling_active = True
+        if profiler is not None:
+            profiler.enable()
+
+    _start_memory_tracking(metrics)
+
+    start = time.perf_counter()
+
+    try:
+        yield metrics
+    finally:
+        metrics.wall_seconds = time.perf_counter() - start
+
+        if profiler is not None:
+            profiler.disable()
+            with _lock:
+                _profiling_active = False
+
+            Path(_config.profile_dir).mkdir(parents=True, exist_ok=True)
+            metrics.profile_path = str(Path(_config.profile_dir) / f"{stage}-{int(metrics.started_at)}.prof")
+            profiler.dump_stats(metrics.profile_path)  # inspect with python -m pstats or snakeviz
+
+        if parent is not None:
+            with _lock:
+                parent.db_round_trips += metrics.db_round_trips  # an enclosing stage includes its nested stages
+        _stop_memory_tracking(metrics)
+
+        rows = metrics.rows_out if metrics.rows_out is not None else metrics.rows_in
+        if rows is not None and metrics.wall_seconds > 0:
+            metrics.rows_per_second = rows / metrics.wall_seconds
+
+        _current_stage.reset(token)
+        _record(metrics)
+
+def instrument_stage(stage: str) -> Callable:
+    """
+    Decorator that runs a function inside track_stage.
+    rows_in is taken from the first argument with a length (e.g. a DataFrame) and rows_out from the return value,
+    unless the function sets them itself through current_stage().
+    Args:
+        stage (str): Name of the stage.
+    Returns:
+        Callable: The decorator.
+    """
+    def decorator(stage_function: Callable) -> Callable:
+
+        @wraps(stage_function)
+        def wrapper(*args, **kwargs):
+            rows_in = next((len(arg) for arg in args if hasattr(arg, "__len__") and not isinstance(arg, (str, bytes))), None)
+
+            with track_stage(stage, rows_in=rows_in) as metrics:
+                result = stage_function(*args, **kwargs)
+
+                if metrics.rows_out is None and hasattr(result, "__len__"):
+                    metrics.rows_out = len(result)
+
+            return result
+
+        return wrapper
+
+    return decorator
+
+def render_prometheus() -> str:
+    """
+    Renders the per stage totals in the Prometheus text exposition format.
+    Returns:
+        str: The metrics page.
+    """
+    metric_help = {
+        "runs": ("pipeline_stage_runs_total", "counter", "Number of completed runs of the stage"),
+        "seconds": ("pipeline_stage_seconds_total", "counter", "Wall time spent in the stage"),
+        "rows_in": ("pipeline_stage_rows_in_total", "counter", "Rows received by the stage"),
+        "rows_out": ("pipeline_stage_rows_out_total", "counter", "Rows produced by the stage"),
+        "db_round_trips": ("pipeline_stage_db_round_trips_total", "counter", "Database statements sent by the stage"),
+        "peak_memory_mb": ("pipeline_stage_peak_memory_megabytes", "gauge", "Highest resident memory sampled during any run of the stage"),
+    }
+
+    with _lock:
+        totals = {stage: dict(values) for stage, values in _totals.items()}
+
+    lines = []
+    for key, (name, metric_type, description) in metric_help.items():
+        lines.append(f"# HELP {name} {description}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        for stage, values in sorted(totals.items()):
+            lines.append(f'{name}{{stage="{stage}"}} {values.get(key, 0)}')
+
+    return "\n".join(lines) + "\n"
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    """
+    Serves render_prometheus() on /metrics.
+    """
+
+    def do_GET(self) -> None:
+        if self.path != "/metrics":
+            self.send_error(404)
+            return
+
+        body = render_prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args) -> None:
+        pass  # keep scrapes out of the pipeline output
+
+def start_metrics_server(port: int = 9108, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """
+    Starts a background HTTP server exposing the stage metrics for Prometheus to scrape.
+    Args:
+        port (int): Port to listen on.
+        host (str): Interface to bind, local only by default.
+    Returns:
+        ThreadingHTTPServer: The running server, call shutdown() to stop it.
+    """
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
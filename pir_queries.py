@@ -0,0 +1,264 @@
+from sqlalchemy.engine import Engine
+from sqlalchemy import func, select
+from create_classes_for_tables import (Airline, Airport, BaggageMonthlyRollup, BookedFlight, BookedLuggage,
+                                       FactPIR, PIRMonthlyRollup)
+from pir_type import PIRType
+from collections import OrderedDict
+from datetime import date, datetime
+from enum import Enum
+from functools import wraps
+from typing import Any, Callable, Hashable, Optional, Tuple
+import inspect
+import threading
+import time
+import pandas as pd
+
+class QueryCache:
+    """
+    A bounded least-recently-used cache whose entries also expire after a time-to-live.
+    Safe to share between threads, e.g. the workers of a report server.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 300.0) -> None:
+        """
+        Initializes an empty cache.
+        Args:
+            max_entries (int): Maximum number of results kept, the least recently used result is evicted first.
+            ttl_seconds (float): Number of seconds a result stays valid after it was stored.
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()  # key -> (expiry time, result)
+        self._lock = threading.Lock()  # get reorders the entries too, so every access holds it
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Returns the cached result for a key, or None if it is missing or expired.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None:
+                return None
+
+            expires_at, result = entry
+
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)  # mark as most recently used
+            return result
+
+    def set(self, key: Hashable, result: Any) -> None:
+        """
+        Stores a result, evicting the least recently used entries when the cache is full.
+        """
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, result)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """
+        Drops every cached result.
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+# Shared cache for every PIR report function in this module
+pir_query_cache = QueryCache()
+
+def _normalize_value(value: Any) -> Hashable:
+    """
+    Converts a query parameter into a hashable, canonical form so equivalent calls share one cache entry.
+    """
+    if isinstance(value, Engine):
+        return str(value.url)  # password is masked when rendering the url
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return tuple(sorted(_normalize_value(v) for v in value))
+
+    return value
+
+def cached_pir_query(query_function: Callable[..., pd.DataFrame]) -> Callable[..., pd.DataFrame]:
+    """
+    Decorator that answers a PIR report function from pir_query_cache when called again with the same parameters.
+    A cached call costs a few tens of microseconds, mostly binding the arguments to build the key and the shallow copy.
+    Args:
+        query_function (Callable[..., pd.DataFrame]): Report function returning a DataFrame.
+    Returns:
+        Callable[..., pd.DataFrame]: The wrapped report function.
+    """
+    signature = inspect.signature(query_function)
+
+    @wraps(query_function)
+    def wrapper(*args, **kwargs) -> pd.DataFrame:
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()  # positional, keyword and defaulted calls map to the same key
+
+        key = (query_function.__qualname__,) + tuple(
+            (name, _normalize_value(value)) for name, value in bound.arguments.items()
+        )
+
+        result = pir_query_cache.get(key)
+
+        if result is None:
+            result = query_function(*args, **kwargs)
+            pir_query_cache.set(key, result)
+
+        # With pandas copy-on-write (the default since pandas 3) a shallow copy is enough: writes through the
+        # caller's frame copy the touched columns first, so the cached result is never modified
+        return result.copy(deep=False)
+
+    return wrapper
+
+def invalidate_pir_query_cache(engine: Optional[Engine] = None) -> None:
+    """
+    Drops all cached PIR report results. Registered as a post-load hook so new FactPIR rows are never hidden by the cache.
+    Args:
+        engine (Optional[Engine]): Unused, accepted so the function can be used as a loader hook.
+    Returns:
+        None
+    """
+    pir_query_cache.clear()
+
+@cached_pir_query
+def top_airports_by_lost_bags(engine: Engine, top_n: int = 10, start_date: Optional[date] = None, end_date: Optional[date] = None) -> pd.DataFrame:
+    """
+    Returns the airports with the most lost bags.
+    Args:
+        engine (Engine): SQLAlchemy engine connected to the target database.
+        top_n (int): Number of airports to return.
+        start_date (Optional[date]): First month to include, None for no lower bound.
+        end_date (Optional[date]): Last month to include, None for no upper bound.
+    Returns:
+        pd.DataFrame: Columns airport_iata, Airport_name, lost_bags ordered by lost_bags descending.
+    """
+    lost_bags = func.sum(PIRMonthlyRollup.pir_count).label("lost_bags")
+
+    stmt = (
+        select(PIRMonthlyRollup.airport_iata, Airport.Airport_name, lost_bags)
+        .join(Airport, Airport.IATA == PIRMonthlyRollup.airport_iata)
+        .where(PIRMonthlyRollup.pir_type == PIRType.LOST)
+        .group_by(PIRMonthlyRollup.airport_iata, Airport.Airport_name)
+        .order_by(lost_bags.desc(), PIRMonthlyRollup.airport_iata)
+        .limit(top_n)
+    )
+
+    if start_date is not None:
+        stmt = stmt.where(PIRMonthlyRollup.rollup_month >= start_date.replace(day=1))
+    if end_date is not None:
+        stmt = stmt.where(PIRMonthlyRollup.rollup_month <= end_date)
+
+    return pd.read_sql(stmt, engine)
+
+@cached_pir_query
+def airline_delay_rate_by_quarter(engine: Engine, year: int) -> pd.DataFrame:
+    """
+    Returns the share of booked bags that were delayed, per airline and quarter.
+    Args:
+        engine (Engine): SQLAlchemy engine connected to the target database.
+        year (int): The year to report on.
+    Returns:
+        pd.DataFrame: Columns airline_iata, Airline, quarter, delayed_bags, booked_bags, delay_rate.
+    """
+    year_start, next_year_start = date(year, 1, 1), date(year + 1, 1, 1)
+
+    delayed_stmt = (
+        select(PIRMonthlyRollup.rollup_month, PIRMonthlyRollup.airline_iata, func.sum(PIRMonthlyRollup.pir_count).label("delayed_bags"))
+        .where(
+            PIRMonthlyRollup.pir_type == PIRType.DELAYED,
+            PIRMonthlyRollup.rollup_month >= year_start,
+            PIRMonthlyRollup.rollup_month < next_year_start,
+        )
+        .group_by(PIRMonthlyRollup.rollup_month, PIRMonthlyRollup.airline_iata)
+    )
+
+    booked_stmt = (
+        select(BaggageMonthlyRollup.rollup_month, BaggageMonthlyRollup.airline_iata, func.sum(BaggageMonthlyRollup.bag_count).label("booked_bags"))
+        .where(BaggageMonthlyRollup.rollup_month >= year_start, BaggageMonthlyRollup.rollup_month < next_year_start)
+        .group_by(BaggageMonthlyRollup.rollup_month, BaggageMonthlyRollup.airline_iata)
+    )
+
+    airlines_stmt = select(Airline.IATA.label("airline_iata"), Airline.Airline)
+
+    with engine.connect() as connection:
+        delayed = pd.read_sql(delayed_stmt, connection)
+        booked = pd.read_sql(booked_stmt, connection)
+        airlines = pd.read_sql(airlines_stmt, connection)
+
+    # Monthly partitions are folded into quarters client side, there are at most 12 per airline
+    for monthly in (delayed, booked):
+        monthly["quarter"] = pd.to_datetime(monthly["rollup_month"]).dt.quarter
+
+    delayed = delayed.groupby(["airline_iata", "quarter"], as_index=False)["delayed_bags"].sum()
+    booked = booked.groupby(["airline_iata", "quarter"], as_index=False)["booked_bags"].sum()
+
+    report = booked.merge(delayed, on=["airline_iata", "quarter"], how="outer").fillna({"delayed_bags": 0, "booked_bags": 0})
+    report = report.astype({"delayed_bags": "int64", "booked_bags": "int64"})
+    report["delay_rate"] = report["delayed_bags"] / report["booked_bags"].where(report["booked_bags"] > 0)
+    report = report.merge(airlines, on="airline_iata", how="left")
+
+    return report[["airline_iata", "Airline", "quarter", "delayed_bags", "booked_bags", "delay_rate"]].sort_values(
+        ["airline_iata", "quarter"], ignore_index=True
+    )
+
+@cached_pir_query
+def damage_rate_by_bag_profile(engine: Engine, weight_band_kg: int = 5, start_date: Optional[date] = None, end_date: Optional[date] = None) -> pd.DataFrame:
+    """
+    Returns the share of booked bags that were damaged, per bag dimension and weight band.
+    Args:
+        engine (Engine): SQLAlchemy engine connected to the target database.
+        weight_band_kg (int): Width of the weight bands in kilograms.
+        start_date (Optional[date]): First flight date to include, None for no lower bound.
+        end_date (Optional[date]): Last flight date to include, None for no upper bound.
+    Returns:
+        pd.DataFrame: Columns dimensions_cm, weight_band, booked_bags, damaged_bags, damage_rate.
+    """
+    booked_stmt = (
+        select(BookedLuggage.dimensions_cm, BookedLuggage.weight_kg, func.count(BookedLuggage.ID).label("booked_bags"))
+        .join(BookedFlight, BookedLuggage.BookedFlightID == BookedFlight.ID)
+        .group_by(BookedLuggage.dimensions_cm, BookedLuggage.weight_kg)
+    )
+
+    damaged_stmt = (
+        select(BookedLuggage.dimensions_cm, BookedLuggage.weight_kg, func.count(FactPIR.PIR_ID).label("damaged_bags"))
+        .join(BookedLuggage, FactPIR.bag_luggage_id == BookedLuggage.ID)
+        .join(BookedFlight, FactPIR.bokked_flight_id == BookedFlight.ID)
+        .where(FactPIR.pir_type == PIRType.DAMAGED)
+        .group_by(BookedLuggage.dimensions_cm, BookedLuggage.weight_kg)
+    )
+
+    if start_date is not None:
+        booked_stmt = booked_stmt.where(BookedFlight.flight_date >= start_date)
+        damaged_stmt = damaged_stmt.where(BookedFlight.flight_date >= start_date)
+    if end_date is not None:
+        booked_stmt = booked_stmt.where(BookedFlight.flight_date <= end_date)
+        damaged_stmt = damaged_stmt.where(BookedFlight.flight_date <= end_date)
+
+    with engine.connect() as connection:
+        booked = pd.read_sql(booked_stmt, connection)
+        damaged = pd.read_sql(damaged_stmt, connection)
+
+    report = booked.merge(damaged, on=["dimensions_cm", "weight_kg"], how="left").fillna({"damaged_bags": 0})
+    report = report.astype({"booked_bags": "int64", "damaged_bags": "int64"})
+
+    # Weights are whole kilograms (at most 33 distinct values) so banding after the aggregation is cheap
+    band_start = (report["weight_kg"] // weight_band_kg) * weight_band_kg
+    report["weight_band"] = band_start.astype(str) + "-" + (band_start + weight_band_kg - 1).astype(str)
+
+    report["band_start"] = band_start
+
+    report = report.groupby(["dimensions_cm", "band_start", "weight_band"], as_index=False)[["booked_bags", "damaged_bags"]].sum()
+    report["damage_rate"] = report["damaged_bags"] / report["booked_bags"]
+
+    return report.sort_values(["dimensions_cm", "band_start"], ignore_index=True).drop(columns="band_start")
@@ -1,14 +1,105 @@
-"""
- # Foreign keys
-    bag_luggage_id = Column(Integer, ForeignKey('BookedLuggage.ID'), nullable=False)  # Foreign key to BookedLuggage # can get from boooked luggage
-    passanger_id = Column(Integer, ForeignKey('Passanger.passangerID'), nullable=False)  # Foreign key to Passanger # can get from boooked luggage
-    bokked_flight_id = Column(Integer, ForeignKey('BookedFlight.ID'), nullable=False)  # Foreign key to BookedFlight # can get from boooked luggage
-    airport_iata = Column(String(3), ForeignKey('Airport.IATA'), nullable=False)  # Foreign key to Airport # The gotten bookedflight ID can be use to get flight_details and AIRport IATA  
-    airline_iata = Column(String(2), ForeignKey('Airline.IATA'), nullable=False)  # Foreign key to Airline can get froom booked flight
-
-    # PIR details
-    pir_date = Column(Date, nullable=False)  # Date of the PIR event # can get froom booked flight
-    pir_time = Column(Time, nullable=False)  # Time of the PIR event # can generate randomly
-    pir_type = Column(SAEnum(PIRType, name="pir_type_enum"), nullable=False ) # Type of PIR (e.g., delayed, lost, damaged) # can generate randomly
-
-"""
+from sqlalchemy.engine import Engine
+from sqlalchemy import select
+from create_classes_for_tables import BookedFlight, BookedLuggage, FactPIR, Flight_Details
+from pir_type import PIRType
+from pipeline_metrics import current_stage, instrument_stage
+from datetime import time
+from typing import Dict, Optional
+import numpy as np
+import pandas as pd
+
+class PIRReportGenerator:
+    """
+    A class to generate synthetic Property Irregularity Reports (PIR) for booked luggage.
+    Every bag without a PIR yet is mishandled with a fixed probability, and the report is filed at the
+    arrival airport of its flight on the flight date.
+    """
+
+    def __init__(self, engine: Engine, seed: Optional[int] = None, pir_rate: float = 0.007) -> None:
+        """
+        Initializes the PIRReportGenerator with a database engine.
+        Args:
+            engine (Engine): SQLAlchemy engine connected to the target database.
+            seed (Optional[int]): Random seed for reproducibility, None for fresh random reports each run.
+            pir_rate (float): Probability that a bag is mishandled, about 7 in 1000 bags industry wide.
+        """
+        self.engine = engine
+        self.seed = seed
+        self.pir_rate = pir_rate
+
+        self.pir_type_probabilities: Dict[PIRType, float] = {
+            PIRType.DELAYED: 0.80,
+            PIRType.DAMAGED: 0.15,
+            PIRType.LOST: 0.05,
+        }  # Share of each PIR type among mishandled bags
+
+        # Random generator for all randomness in the class
+        self.rng = np.random.default_rng(seed)
+
+    def cache_params(self) -> dict:
+        """
+        Returns every parameter the generated reports depend on, used to key them in the DatasetCache.
+        """
+        return {
+            "seed": self.seed,
+            "pir_rate": self.pir_rate,
+            "pir_type_probabilities": {pir_type.name: p for pir_type, p in self.pir_type_probabilities.items()},
+        }
+
+    def _load_unreported_bags(self) -> pd.DataFrame:
+        """
+        Loads every booked bag that has no PIR yet, with the flight it travelled on.
+        """
+        stmt = (
+            select(
+                BookedLuggage.ID.label("bag_luggage_id"),
+                BookedLuggage.passangerID.label("passanger_id"),
+                BookedLuggage.BookedFlightID.label("bokked_flight_id"),
+                Flight_Details.Arrival_IATA.label("airport_iata"),
+                Flight_Details.Airline_IATA.label("airline_iata"),
+                BookedFlight.flight_date.label("pir_date"),
+            )
+            .join(BookedFlight, BookedLuggage.BookedFlightID == BookedFlight.ID)
+            .join(Flight_Details, BookedFlight.flight_number == Flight_Details.flight_number)
+            .outerjoin(FactPIR, FactPIR.bag_luggage_id == BookedLuggage.ID)
+            .where(FactPIR.PIR_ID.is_(None))
+            .order_by(BookedLuggage.ID)
+        )
+
+        with self.engine.connect() as connection:
+            rows = connection.execute(stmt).all()
+
+        return pd.DataFrame(rows, columns=["bag_luggage_id", "passanger_id", "bokked_flight_id", "airport_iata", "airline_iata", "pir_date"])
+
+    def _random_pir_times(self, n: int) -> list:
+        """
+        Generates random report times during the day.
+        Args:
+            n (int): Number of times to generate.
+        Returns:
+            list: n datetime.time values.
+        """
+        seconds = self.rng.integers(0, 24 * 60 * 60, size=n)
+        return [time(s // 3600, s // 60 % 60, s % 60) for s in seconds.tolist()]
+
+    @instrument_stage("pir.generate")
+    def generate_pir_reports(self) -> pd.DataFrame:
+        """
+        Generates PIRs for the bags in the database that do not have one yet.
+        Returns:
+            pd.DataFrame: DataFrame ready to load into FactPIR.
+        """
+        bags = self._load_unreported_bags()
+        current_stage().rows_in = len(bags)
+
+        reports = bags[self.rng.random(len(bags)) < self.pir_rate].reset_index(drop=True)
+
+        reports["pir_time"] = self._random_pir_times(len(reports))
+        reports["pir_type"] = self.rng.choice(
+            [pir_type.name for pir_type in self.pir_type_probabilities],
+            size=len(reports),
+            p=list(self.pir_type_probabilities.values()),
+        )  # pick a PIR type for every mishandled bag based on defined probabilities, stored by enum name
+
+        current_stage().rows_out = len(reports)
+        return reports
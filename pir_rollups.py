@@ -0,0 +1,206 @@
+from sqlalchemy.engine import Engine, Connection
+from sqlalchemy import Date, delete, func, insert, literal, select, update
+from sqlalchemy.orm import InstrumentedAttribute
+from create_classes_for_tables import (BaggageMonthlyRollup, BookedFlight, BookedLuggage, FactPIR,
+                                       Flight_Details, PIRMonthlyRollup, RollupWatermark)
+from datetime import date
+from typing import Iterable, List, Optional, Set, Tuple
+import zlib
+
+def _month_start(day: date) -> date:
+    """
+    Returns the first day of the month the given date falls in.
+    """
+    return day.replace(day=1)
+
+def _next_month(month: date) -> date:
+    """
+    Returns the first day of the month following the given month start.
+    """
+    if month.month == 12:
+        return month.replace(year=month.year + 1, month=1)
+    return month.replace(month=month.month + 1)
+
+# Source IDs come from a sequence and are handed out before commit, so a slow transaction can commit rows with IDs
+# below a watermark another refresh already stored. That many IDs under the watermark are checked again on every refresh.
+LATE_COMMIT_WINDOW = 100_000
+
+def _lock_rollup(connection: Connection, rollup_name: str) -> None:
+    """
+    Serializes refreshes of one rollup until the transaction ends. Every loader process runs the refresh hooks,
+    and two concurrent rebuilds of a month would collide on its unique constraint, as would two first refreshes
+    inserting the watermark row. SQLite already allows only one writer at a time.
+    """
+    if connection.dialect.name == "postgresql":
+        lock_id = zlib.crc32(f"rollup:{rollup_name}".encode()) - 2**31  # single key form, apart from the loaders' two key locks
+        connection.execute(select(func.pg_advisory_xact_lock(lock_id)))
+
+def _get_watermark(connection: Connection, rollup_name: str) -> Tuple[int, int]:
+    """
+    Reads the highest source ID already aggregated into a rollup and the number of source rows that were visible
+    in the LATE_COMMIT_WINDOW IDs up to it, (0, 0) if the rollup was never refreshed.
+    """
+    row = connection.execute(
+        select(RollupWatermark.last_source_id, RollupWatermark.window_row_count).where(RollupWatermark.rollup_name == rollup_name)
+    ).first()
+
+    return (row.last_source_id, row.window_row_count) if row else (0, 0)
+
+def _set_watermark(connection: Connection, rollup_name: str, last_source_id: int, window_row_count: int) -> None:
+    """
+    Stores the highest source ID aggregated into a rollup and the row count of the window below it.
+    """
+    result = connection.execute(
+        update(RollupWatermark)
+        .where(RollupWatermark.rollup_name == rollup_name)
+        .values(last_source_id=last_source_id, window_row_count=window_row_count)
+    )
+
+    if result.rowcount == 0:  # first refresh of this rollup
+        connection.execute(
+            insert(RollupWatermark).values(rollup_name=rollup_name, last_source_id=last_source_id, window_row_count=window_row_count)
+        )
+
+def _window_row_count(connection: Connection, id_column: InstrumentedAttribute, last_source_id: int) -> int:
+    """
+    Counts the source rows visible in the LATE_COMMIT_WINDOW IDs up to last_source_id.
+    """
+    return connection.execute(
+        select(func.count()).where(id_column > last_source_id - LATE_COMMIT_WINDOW, id_column <= last_source_id)
+    ).scalar()
+
+def _unaggregated_id_range(connection: Connection, rollup_name: str, id_column: InstrumentedAttribute) -> Optional[Tuple[int, int, int]]:
+    """
+    Finds the source IDs a refresh has to look at: the IDs above the watermark, and also the window below it
+    when rows committed there after the last refresh (the window holds more rows than it did then).
+    Args:
+        connection (Connection): Connection of the refresh transaction.
+        rollup_name (str): Name of the rollup table.
+        id_column (InstrumentedAttribute): Primary key of the source table.
+    Returns:
+        Optional[Tuple[int, int, int]]: Exclusive lower and inclusive upper ID, and the window row count to store
+                                        with the new watermark. None when there is nothing to aggregate.
+    """
+    last_id, window_row_count = _get_watermark(connection, rollup_name)
+    max_id = connection.execute(select(func.max(id_column))).scalar() or 0  # snapshot so rows landing mid-refresh are picked up next time
+
+    # Counted before the rows are read, a row committing in between is aggregated now and re-checked next time
+    new_window_row_count = _window_row_count(connection, id_column, max_id)
+    late_rows = _window_row_count(connection, id_column, last_id) > window_row_count
+
+    start_id = max(last_id - LATE_COMMIT_WINDOW, 0) if late_rows else last_id
+    if max_id <= start_id:
+        return None
+
+    return start_id, max_id, new_window_row_count
+
+def _touched_months(dates: Iterable[date]) -> List[date]:
+    """
+    Collapses a list of dates into the sorted list of month partitions they belong to.
+    """
+    months: Set[date] = {_month_start(d) for d in dates if d is not None}
+    return sorted(months)
+
+def refresh_pir_rollup(engine: Engine) -> List[date]:
+    """
+    Incrementally refreshes the PIRMonthlyRollup table.
+    Only the months containing FactPIR rows committed since the last refresh are re-aggregated.
+    Args:
+        engine (Engine): SQLAlchemy engine connected to the target database.
+    Returns:
+        List[date]: The month partitions that were rebuilt.
+    """
+    rollup_name = PIRMonthlyRollup.__tablename__
+
+    with engine.begin() as connection:
+        _lock_rollup(connection, rollup_name)  # a waiting refresh then sees the rows the first one aggregated
+        id_range = _unaggregated_id_range(connection, rollup_name, FactPIR.PIR_ID)
+        if id_range is None:
+            return []
+        start_id, max_id, window_row_count = id_range
+
+        new_dates = connection.execute(
+            select(FactPIR.pir_date).distinct().where(FactPIR.PIR_ID > start_id, FactPIR.PIR_ID <= max_id)
+        ).scalars()
+        months = _touched_months(new_dates)
+
+        for month in months:
+            next_month = _next_month(month)
+
+            connection.execute(delete(PIRMonthlyRollup).where(PIRMonthlyRollup.rollup_month == month))
+
+            month_aggregate = (
+                select(
+                    literal(month, type_=Date),
+                    FactPIR.airline_iata,
+                    FactPIR.airport_iata,
+                    FactPIR.pir_type,
+                    func.count(FactPIR.PIR_ID),
+                )
+                .where(FactPIR.pir_date >= month, FactPIR.pir_date < next_month)
+                .group_by(FactPIR.airline_iata, FactPIR.airport_iata, FactPIR.pir_type)
+            )
+
+            connection.execute(
+                insert(PIRMonthlyRollup).from_select(
+                    ["rollup_month", "airline_iata", "airport_iata", "pir_type", "pir_count"], month_aggregate
+                )
+            )
+
+        _set_watermark(connection, rollup_name, max_id, window_row_count)
+
+    return months
+
+def refresh_baggage_rollup(engine: Engine) -> List[date]:
+    """
+    Incrementally refreshes the BaggageMonthlyRollup table.
+    Only the months containing BookedLuggage rows committed since the last refresh are re-aggregated.
+    Args:
+        engine (Engine): SQLAlchemy engine connected to the target database.
+    Returns:
+        List[date]: The month partitions that were rebuilt.
+    """
+    rollup_name = BaggageMonthlyRollup.__tablename__
+
+    with engine.begin() as connection:
+        _lock_rollup(connection, rollup_name)  # a waiting refresh then sees the rows the first one aggregated
+        id_range = _unaggregated_id_range(connection, rollup_name, BookedLuggage.ID)
+        if id_range is None:
+            return []
+        start_id, max_id, window_row_count = id_range
+
+        new_dates = connection.execute(
+            select(BookedFlight.flight_date).distinct()
+            .join(BookedLuggage, BookedLuggage.BookedFlightID == BookedFlight.ID)
+            .where(BookedLuggage.ID > start_id, BookedLuggage.ID <= max_id)
+        ).scalars()
+        months = _touched_months(new_dates)
+
+        for month in months:
+            next_month = _next_month(month)
+
+            connection.execute(delete(BaggageMonthlyRollup).where(BaggageMonthlyRollup.rollup_month == month))
+
+            month_aggregate = (
+                select(
+                    literal(month, type_=Date),
+                    Flight_Details.Airline_IATA,
+                    Flight_Details.Arrival_IATA,
+                    func.count(BookedLuggage.ID),
+                )
+                .select_from(BookedLuggage)
+                .join(BookedFlight, BookedLuggage.BookedFlightID == BookedFlight.ID)
+                .join(Flight_Details, BookedFlight.flight_number == Flight_Details.flight_number)
+                .where(BookedFlight.flight_date >= month, BookedFlight.flight_date < next_month)
+                .group_by(Flight_Details.Airline_IATA, Flight_Details.Arrival_IATA)
+            )
+
+            connection.execute(
+                insert(BaggageMonthlyRollup).from_select(
+                    ["rollup_month", "airline_iata", "airport_iata", "bag_count"], month_aggregate
+                )
+            )
+
+        _set_watermark(connection, rollup_name, max_id, window_row_count)
+
+    return months
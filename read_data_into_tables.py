@@ -1,18 +1,102 @@
-from database_connection_utils import create_engine_from_creds
-from create_classes_for_tables import Airline, Airport,BookedFlight, BookedLuggage ,CountryRegion, Passanger,Flight_Details,Base, get_unique_columns
-from sqlalchemy import UniqueConstraint
+from database_connection_utils import create_engine_for_backend
+from create_classes_for_tables import Airline, Airport,BookedFlight, BookedLuggage ,CountryRegion, FactPIR, Passanger,Flight_Details,Base, TableVersion, get_unique_columns
+from sqlalchemy import Date, Time, UniqueConstraint, func, or_, select, tuple_
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import DeclarativeMeta, Session
-from sqlalchemy.dialects.postgresql import insert
-from typing import Iterable, Optional, Type
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.sql.dml import Insert
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Type
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
 from pathlib import Path
-from cleaning_data import clean_passenger_df
-from booked_flights_generator import BookFlightGenerator
-from booked_luggage_generator import BookedLuggageGenerator
+from pir_rollups import refresh_baggage_rollup, refresh_pir_rollup
+from pir_queries import invalidate_pir_query_cache
+from pipeline_metrics import current_stage, instrument_stage
+import numpy as np
 import pandas as pd
 import os
+import zlib
 
-engine = create_engine_from_creds() 
-Base.metadata.create_all(engine)
+_engine: Optional[Engine] = None  # created on first use, importing this module never connects to the database
+
+def get_engine() -> Engine:
+    """
+    Returns the engine of the configured storage backend (see create_engine_for_backend), connecting and creating
+    any missing tables on the first call.
+    Returns:
+        Engine: The shared SQLAlchemy engine.
+    """
+    global _engine
+
+    if _engine is None:
+        _engine = create_engine_for_backend()
+        Base.metadata.create_all(_engine)
+
+    return _engine
+
+def use_engine(engine: Engine) -> Engine:
+    """
+    Points the loader at another database, e.g. create_embedded_engine(":memory:") for an offline analysis or a test.
+    Args:
+        engine (Engine): SQLAlchemy engine connected to the database to load into, missing tables are created.
+    Returns:
+        Engine: The same engine.
+    """
+    global _engine
+
+    Base.metadata.create_all(engine)
+    _engine = engine
+    return engine
+
+# INSERT constructs with ON CONFLICT support, PostgreSQL and SQLite share the on_conflict_do_nothing/do_update API
+DIALECT_INSERTS: Dict[str, Callable[[Type[DeclarativeMeta]], Insert]] = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+def insert(Table_to_be_loaded: Type[DeclarativeMeta], engine: Optional[Engine] = None) -> Insert:
+    """
+    Returns an INSERT for the dialect of the engine (the loader's engine by default).
+    Args:
+        Table_to_be_loaded (Type[DeclarativeMeta]): The SQLAlchemy ORM class representing the table to insert into.
+        engine (Optional[Engine]): Engine the statement will run on.
+    Returns:
+        Insert: Dialect specific insert statement.
+    """
+    dialect_name = (engine or get_engine()).dialect.name
+
+    if dialect_name not in DIALECT_INSERTS:
+        raise ValueError(f"Loading into {dialect_name} is not supported, expected one of {list(DIALECT_INSERTS)}")
+
+    return DIALECT_INSERTS[dialect_name](Table_to_be_loaded)
+
+def __getattr__(name: str):
+    """
+    Keeps `from read_data_into_tables import engine` working, the engine is only created when it is asked for.
+    """
+    if name == "engine":
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# Callbacks run after new rows have been loaded into a table, keyed by table name
+post_load_hooks: Dict[str, List[Callable[[Engine], None]]] = defaultdict(list)
+
+def register_post_load_hook(Table_to_be_loaded: Type[DeclarativeMeta], hook: Callable[[Engine], None]) -> None:
+    """
+    Registers a callback that load_df_sql runs once new rows have been loaded into a table.
+    Args:
+        Table_to_be_loaded (Type[DeclarativeMeta]): The SQLAlchemy ORM class the hook listens on.
+        hook (Callable[[Engine], None]): Function called with the engine after the load.
+    Returns:
+        None
+    """
+    post_load_hooks[Table_to_be_loaded.__tablename__].append(hook)
+
+register_post_load_hook(FactPIR, refresh_pir_rollup)  # keep the PIR aggregates in step with new PIRs
+register_post_load_hook(BookedLuggage, refresh_baggage_rollup)  # keep the booked bag denominators in step
+register_post_load_hook(FactPIR, invalidate_pir_query_cache)  # cached reports must not hide the new PIRs
+register_post_load_hook(BookedLuggage, invalidate_pir_query_cache)  # rates depend on the booked bag counts too
 
 def build_key(df, cols): 
     """
@@ -67,16 +151,209 @@ def read_csv_data_into_dataframe(csv_file_path: str, desired_columns: Optional[I
 
     return loaded_dataframe
 
-    
-def load_df_sql(dataframe_to_upload: pd.DataFrame, Table_to_be_loaded: Type[DeclarativeMeta], chunk_size: int | None = None) -> None:
+
+class MergeBatchReport(NamedTuple):
+    """
+    Outcome of merging one batch of rows.
+    """
+    batch: int
+    inserted: int
+    updated: int
+    unchanged: int
+    duplicates: int = 0  # rows dropped because a later row of the batch has the same key
+
+def normalized_text(df: pd.DataFrame, cols: List[str]) -> pd.DataFrame:
+    """
+    Renders columns as text the same way for DataFrame rows and rows read back from the database,
+    e.g. a Timestamp and a date of the same day both become "YYYY-MM-DD".
+    Args:
+        df (pd.DataFrame): The DataFrame containing the data.
+        cols (List[str]): List of column names to render.
+    Returns:
+        pd.DataFrame: The rendered columns.
+    """
+    rendered = {}
+
+    for col in cols:
+        values = df[col]
+        if pd.api.types.is_datetime64_any_dtype(values):
+            values = values.dt.strftime("%Y-%m-%d")
+        rendered[col] = values.astype(str)
+
+    return pd.DataFrame(rendered, index=df.index)
+
+def content_hash(df: pd.DataFrame, cols: List[str]) -> pd.Series:
+    """
+    Hashes the given columns of every row, rows with equal values get equal hashes.
+    """
+    return pd.util.hash_pandas_object(normalized_text(df, cols), index=False)
+
+def with_bindable_dates(dataframe_to_upload: pd.DataFrame, Table_to_be_loaded: Type[DeclarativeMeta]) -> pd.DataFrame:
+    """
+    Converts text in Date and Time columns (e.g. "2023-01-05" read from a CSV) to date and time objects.
+    PostgreSQL parses the text itself, other backends such as SQLite only bind Python objects.
+    Args:
+        dataframe_to_upload (pd.DataFrame): The rows to load.
+        Table_to_be_loaded (Type[DeclarativeMeta]): The SQLAlchemy ORM class the rows are loaded into.
+    Returns:
+        pd.DataFrame: The rows, copied only if a column was converted.
+    """
+    converted = {}
+
+    for column in Table_to_be_loaded.__table__.columns:
+        if column.name not in dataframe_to_upload.columns:
+            continue
+        values = dataframe_to_upload[column.name]
+        if not (pd.api.types.is_object_dtype(values) or pd.api.types.is_string_dtype(values)):
+            continue  # already datetime64 or numeric
+
+        if isinstance(column.type, Date) and values.map(lambda value: isinstance(value, str)).any():
+            parsed = pd.to_datetime(values).dt.date
+        elif isinstance(column.type, Time) and values.map(lambda value: isinstance(value, str)).any():
+            parsed = pd.to_datetime(values, format="mixed").dt.time
+        else:
+            continue
+
+        converted[column.name] = parsed.astype(object).where(values.notna(), None)  # NaT is not bindable, missing values become NULL
+
+    return dataframe_to_upload.assign(**converted) if converted else dataframe_to_upload
+
+def bump_table_generation(session: Session, Table_to_be_loaded: Type[DeclarativeMeta], engine: Engine) -> None:
+    """
+    Counts one more write of a table in TableVersion, in the caller's transaction so it commits with the write.
+    Snapshots fingerprint a table by its highest key and this generation (see ColumnarSnapshot.content_version).
+    """
+    stmt = insert(TableVersion, engine).values(table_name=Table_to_be_loaded.__tablename__, update_generation=1)
+    session.execute(stmt.on_conflict_do_update(
+        index_elements=["table_name"], set_={"update_generation": TableVersion.update_generation + 1},
+    ))
+
+def _finish_load(Table_to_be_loaded: Type[DeclarativeMeta], engine: Engine) -> None:
+    """
+    Runs after a load wrote rows: counts the write in TableVersion, then runs the table's post-load hooks.
+    """
+    with Session(engine) as session:
+        bump_table_generation(session, Table_to_be_loaded, engine)  # also covers rows appended below the highest key
+        session.commit()
+
+    for hook in post_load_hooks[Table_to_be_loaded.__tablename__]:
+        hook(engine)  # e.g. refresh the rollup partitions touched by this load
+
+@instrument_stage("merge_df_sql")
+def merge_df_sql(dataframe_to_upload: pd.DataFrame, Table_to_be_loaded: Type[DeclarativeMeta], merge_on: Optional[List[str]] = None, chunk_size: int = 10000) -> List[MergeBatchReport]:
+    """
+    Inserts new rows and updates rows whose values changed, in batches. Rows identical to the stored ones are not written,
+    so re-loading a corrected file only touches the corrected rows.
+    Args:
+        dataframe_to_upload (pd.DataFrame): The DataFrame to merge into the database.
+        Table_to_be_loaded (Type[DeclarativeMeta]): The SQLAlchemy ORM class representing the table to merge into.
+        merge_on (Optional[List[str]]): Columns identifying a row, must be backed by a primary key or unique constraint.
+                                        Defaults to the primary key when the DataFrame has it, so columns of the
+                                        unique constraint can be corrected too (e.g. a passenger's email), and to the
+                                        table's unique constraint otherwise.
+        chunk_size (int): Number of rows per batch.
+    Returns:
+        List[MergeBatchReport]: Inserted, updated and unchanged counts per batch.
+    """
+    table = Table_to_be_loaded.__table__
+    primary_key_name = table.primary_key.columns[0].name
+
+    if merge_on:
+        key_cols = merge_on
+    elif primary_key_name in dataframe_to_upload.columns:
+        key_cols = [primary_key_name]  # rows read back from the table and corrected keep their ID
+    else:
+        key_cols = get_unique_columns(Table_to_be_loaded) or [primary_key_name]
+
+    value_cols = [
+        col for col in dataframe_to_upload.columns
+        if col in table.c and col not in key_cols and col != primary_key_name
+    ]  # the surrogate primary key is never overwritten
+
+    engine = get_engine()
+    dataframe_to_upload = with_bindable_dates(dataframe_to_upload, Table_to_be_loaded)
+    reports = []
+    metrics = current_stage()
+    metrics.rows_out = 0
+
+    with Session(engine) as session:
+
+        for batch, start in enumerate(range(0, len(dataframe_to_upload), chunk_size)):
+            chunk = dataframe_to_upload.iloc[start:start + chunk_size]
+
+            # A corrected file can repeat a row, the last version wins. One statement must not touch a row twice
+            # (PostgreSQL rejects that with "ON CONFLICT DO UPDATE command cannot affect row a second time")
+            chunk_keys = build_key(normalized_text(chunk, key_cols), key_cols)
+            is_duplicate = chunk_keys.duplicated(keep="last").to_numpy()
+            chunk, chunk_keys = chunk[~is_duplicate], chunk_keys[~is_duplicate]
+
+            # Read the stored version of the rows in this batch only
+            batch_keys = list(chunk[key_cols].itertuples(index=False, name=None))
+            existing = pd.read_sql(
+                select(*[table.c[col] for col in key_cols + value_cols]).where(tuple_(*[table.c[col] for col in key_cols]).in_(batch_keys)),
+                session.connection(),
+            )
+
+            # Position of every incoming row among the stored rows, -1 where the row does not exist yet
+            existing_keys = pd.Index(build_key(normalized_text(existing, key_cols), key_cols))
+            stored_position = existing_keys.get_indexer(chunk_keys)
+
+            is_new = stored_position == -1
+            existing_hashes = content_hash(existing, value_cols).to_numpy() if len(existing) else np.zeros(1, dtype=np.uint64)
+            stored_hash = np.where(is_new, 0, existing_hashes[np.maximum(stored_position, 0)])  # new rows have no stored hash
+            is_changed = ~is_new & (stored_hash != content_hash(chunk, value_cols).to_numpy())
+
+            to_write = chunk[is_new | is_changed]
+
+            if not to_write.empty:
+                stmt = insert(Table_to_be_loaded, engine)
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=key_cols,
+                    set_={col: stmt.excluded[col] for col in value_cols},
+                    where=or_(*[table.c[col].is_distinct_from(stmt.excluded[col]) for col in value_cols]),  # a concurrent writer may have applied the same change
+                ) if value_cols else stmt.on_conflict_do_nothing(index_elements=key_cols)
+
+                session.execute(stmt, to_write[key_cols + value_cols].to_dict(orient="records"))
+                bump_table_generation(session, Table_to_be_loaded, engine)  # updates keep the highest key
+                session.commit()
+
+            report = MergeBatchReport(batch, int(is_new.sum()), int(is_changed.sum()), int(len(chunk) - is_new.sum() - is_changed.sum()),
+                                      int(is_duplicate.sum()))
+            print(f"{Table_to_be_loaded.__tablename__} batch {batch}: {report.inserted} inserted, {report.updated} updated, "
+                  f"{report.unchanged} unchanged, {report.duplicates} duplicates dropped")
+            reports.append(report)
+            metrics.rows_out += report.inserted + report.updated
+
+    if metrics.rows_out:
+        for hook in post_load_hooks[Table_to_be_loaded.__tablename__]:
+            hook(engine)  # the batches already counted their writes in TableVersion
+
+    return reports
+
+@instrument_stage("load_df_sql")
+def load_df_sql(dataframe_to_upload: pd.DataFrame, Table_to_be_loaded: Type[DeclarativeMeta], chunk_size: int | None = None,
+                mode: str = "insert", merge_on: Optional[List[str]] = None) -> Optional[List[MergeBatchReport]]:
     """
     Loads a dataframe into a SQL table.
     Args:
         dataframe_to_upload (pd.DataFrame): The DataFrame to upload to the database.
         Table_to_be_loaded (Type[DeclarativeMeta]): The SQLAlchemy ORM class representing the table to load data into.
+        chunk_size (int | None): Rows per batch, None inserts row by row.
+        mode (str): "insert" skips rows that already exist, "merge" also updates existing rows whose values changed (see merge_df_sql).
+        merge_on (Optional[List[str]]): Key columns for "merge" mode.
     Returns:
-        None        
+        Optional[List[MergeBatchReport]]: Per batch counts in "merge" mode, None otherwise.
     """
+    if mode == "merge":
+        reports = merge_df_sql(dataframe_to_upload, Table_to_be_loaded, merge_on, chunk_size or 10000)
+        current_stage().rows_out = sum(report.inserted + report.updated for report in reports)  # rows written, not batches
+        return reports
+    if mode != "insert":
+        raise ValueError(f"Unknown load mode: {mode}")
+
+    engine = get_engine()
+    dataframe_to_upload = with_bindable_dates(dataframe_to_upload, Table_to_be_loaded)
+
     #Primary Key column name
     primary_key_name = Table_to_be_loaded.__table__.primary_key.columns[0].name
 
@@ -91,7 +368,6 @@ def load_df_sql(dataframe_to_upload: pd.DataFrame, Table_to_be_loaded: Type[Decl
     
     if unique_cols:
         cols_str = ", ".join(unique_cols)
-        print(cols_str)
 
         existing = pd.read_sql( f'SELECT {cols_str} FROM "{Table_to_be_loaded.__tablename__}"', engine )
         # Example: detect duplicates before insert 
@@ -102,6 +378,8 @@ def load_df_sql(dataframe_to_upload: pd.DataFrame, Table_to_be_loaded: Type[Decl
         dataframe_to_upload = dataframe_to_upload[~dataframe_to_upload["__key__"].isin(existing["__key__"])]
         dataframe_to_upload = dataframe_to_upload.drop(columns="__key__")
 
+    current_stage().rows_out = len(dataframe_to_upload)  # rows sent to the database after dropping known keys
+
     # Insert data into the specified table
     unique_constraints = [ 
         c for c in Table_to_be_loaded.__table__.constraints 
@@ -111,6 +389,7 @@ def load_df_sql(dataframe_to_upload: pd.DataFrame, Table_to_be_loaded: Type[Decl
     uc = unique_constraints[0] if unique_constraints else None  # Get the first unique constraint if it exists
     
     constraint_name = uc.name if uc else None  # Get the name of the unique constraint if it exists
+    conflict_cols = [c.name for c in uc.columns] if uc else None  # SQLite cannot name a constraint as conflict target, its columns work everywhere
     
 
     with Session(engine) as session:  # Create a new session
@@ -123,8 +402,8 @@ def load_df_sql(dataframe_to_upload: pd.DataFrame, Table_to_be_loaded: Type[Decl
                 chunk = records[i:i + chunk_size]  # Get the current chunk
             
                 if constraint_name:
-                    stmt = insert(Table_to_be_loaded).on_conflict_do_nothing( 
-                        constraint=constraint_name 
+                    stmt = insert(Table_to_be_loaded, engine).on_conflict_do_nothing( 
+                        index_elements=conflict_cols 
                         ) # Handle conflicts based on the unique constraint
                     session.execute(stmt, chunk)  # Execute the statement within the session
                 else:
@@ -133,17 +412,103 @@ def load_df_sql(dataframe_to_upload: pd.DataFrame, Table_to_be_loaded: Type[Decl
                 session.commit()  # Commit the transaction
         else:    
             for row in dataframe_to_upload.to_dict(orient="records"): # Iterate over each row in the DataFrame 
-                stmt = insert(Table_to_be_loaded).values(**row) # Create an insert statement for the row
+                stmt = insert(Table_to_be_loaded, engine).values(**row) # Create an insert statement for the row
                 
                 if constraint_name: # If a unique constraint exists, handle conflicts
-                    stmt = stmt.on_conflict_do_nothing( constraint=constraint_name ) # Do nothing on conflict based on the unique constraint
+                    stmt = stmt.on_conflict_do_nothing( index_elements=conflict_cols ) # Do nothing on conflict based on the unique constraint
                     
                 session.execute(stmt)  # Execute the statement within the session
                     
                 session.commit() # Commit the transaction
 
+    if not dataframe_to_upload.empty:
+        _finish_load(Table_to_be_loaded, engine)
+
+# Fixed so that separate loader processes split a table into the same key ranges and share the same locks
+PARALLEL_LOAD_PARTITIONS = 64
+
+def partition_rows(dataframe_to_upload: pd.DataFrame, key_cols: List[str], partitions: int = PARALLEL_LOAD_PARTITIONS) -> np.ndarray:
+    """
+    Assigns every row to a partition by hashing its key columns. The hash is stable across processes,
+    so two loaders always put the same key in the same partition.
+    Args:
+        dataframe_to_upload (pd.DataFrame): The rows to partition.
+        key_cols (List[str]): Columns identifying a row, all columns when empty.
+        partitions (int): Number of partitions.
+    Returns:
+        np.ndarray: Partition number per row.
+    """
+    return (content_hash(dataframe_to_upload, key_cols or list(dataframe_to_upload.columns)).to_numpy() % partitions).astype(np.int64)
+
+def advisory_lock_id(Table_to_be_loaded: Type[DeclarativeMeta]) -> int:
+    """
+    Stable signed 32 bit id of a table, the first half of its partitions' advisory lock keys.
+    """
+    return zlib.crc32(Table_to_be_loaded.__tablename__.encode()) - 2**31
+
+@instrument_stage("load_df_sql_parallel")
+def load_df_sql_parallel(dataframe_to_upload: pd.DataFrame, Table_to_be_loaded: Type[DeclarativeMeta], writers: int = 4,
+                         chunk_size: int = 10000, partitions: int = PARALLEL_LOAD_PARTITIONS) -> None:
+    """
+    Loads a dataframe with several concurrent writers, also safe to run from several processes on the same table
+    (e.g. one per CSV in Data/flights_details).
+    Rows are hash partitioned on the unique constraint key so every partition owns a disjoint key range, and each
+    transaction first takes the PostgreSQL advisory lock of its partition. Writers therefore never wait on each other's
+    ON CONFLICT checks, and since a transaction holds a single lock and only touches keys of that partition, no lock
+    cycle and hence no deadlock can form. Conflicts with existing rows are left to ON CONFLICT DO NOTHING, so the
+    existing keys are not downloaded first.
+    Args:
+        dataframe_to_upload (pd.DataFrame): The DataFrame to upload to the database.
+        Table_to_be_loaded (Type[DeclarativeMeta]): The SQLAlchemy ORM class representing the table to load data into.
+        writers (int): Number of concurrent connections inserting.
+        chunk_size (int): Rows per insert transaction.
+        partitions (int): Number of key partitions, must be the same in every process loading the table.
+    Returns:
+        None
+    """
+    engine = get_engine()
+
+    if engine.dialect.name != "postgresql":  # advisory locks are PostgreSQL only
+        load_df_sql(dataframe_to_upload, Table_to_be_loaded, chunk_size=chunk_size)
+        return
+
+    table = Table_to_be_loaded.__table__
+    primary_key_name = table.primary_key.columns[0].name
+
+    key_cols = get_unique_columns(Table_to_be_loaded)
+    if not key_cols and primary_key_name in dataframe_to_upload.columns:
+        key_cols = [primary_key_name]
+
+    stmt = insert(Table_to_be_loaded, engine)
+    if key_cols:
+        stmt = stmt.on_conflict_do_nothing(index_elements=key_cols)
+
+    table_lock_id = advisory_lock_id(Table_to_be_loaded)
+    row_partitions = partition_rows(dataframe_to_upload, key_cols, partitions)
+
+    def load_partition(partition: int) -> int:
+        partition_df = dataframe_to_upload[row_partitions == partition]
+
+        for start in range(0, len(partition_df), chunk_size):
+            with engine.begin() as connection:
+                connection.execute(select(func.pg_advisory_xact_lock(table_lock_id, partition)))  # released at commit
+                connection.execute(stmt, partition_df.iloc[start:start + chunk_size].to_dict(orient="records"))
+
+        return len(partition_df)
+
+    with ThreadPoolExecutor(max_workers=writers) as executor:
+        # Each writer runs in a copy of this context, so its statements count towards this stage's metrics
+        futures = [executor.submit(copy_context().run, load_partition, partition) for partition in np.unique(row_partitions).tolist()]
+        rows_sent = sum(future.result() for future in futures)
+
+    current_stage().rows_out = rows_sent
+
+    if rows_sent:
+        _finish_load(Table_to_be_loaded, engine)
+
 def create_countryregion_table(airline_csv_file_path: str,airport_csv_file_path: str,Table_to_be_loaded: Type[DeclarativeMeta]):
     
+    engine = get_engine()
     airlines_df= read_csv_data_into_dataframe(airline_csv_file_path)
     airports_df = read_csv_data_into_dataframe(airport_csv_file_path, desired_columns=["IATA Code", "Airport Name", "City", "Country", "Region"])
     
@@ -166,7 +531,6 @@ def create_countryregion_table(airline_csv_file_path: str,airport_csv_file_path:
     country_region_df.to_sql(Table_to_be_loaded.__tablename__, engine, if_exists='append', index=False)
     
     print(f"Inserted {len(country_region_df)} records into the {Table_to_be_loaded.__tablename__} table.")
-    print(country_region_df.head(10))
 
     #after creating the CountryRegion table, we need to update the Airline and Airport tables to reference it
 
@@ -183,6 +547,11 @@ def create_countryregion_table(airline_csv_file_path: str,airport_csv_file_path:
     return airports_df, airlines_df
 
 if __name__ == "__main__":
+    from cleaning_data import clean_passenger_df
+    from booked_flights_generator import BookFlightGenerator
+    from booked_luggage_generator import BookedLuggageGenerator
+
+    engine = get_engine()
    
     # airports_df, airlines_df= create_countryregion_table("Data/airline.csv","Data/airports.csv", CountryRegion)
     # airports_df.rename(columns={"Airport Name": "Airport_name", "IATA Code": "IATA"}, inplace=True)
@@ -0,0 +1,211 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+import pandas as pd
+
+# Relative share of departures per hour of the day (0-23): a morning bank, a midday lull and an evening bank
+DIURNAL_DEPARTURE_PROFILE: List[float] = [
+    0.3, 0.2, 0.1, 0.1, 0.2, 1.0, 4.0, 6.5, 6.5, 5.5, 5.0, 4.5,
+    4.5, 4.5, 4.5, 5.0, 5.5, 6.0, 6.0, 5.5, 4.5, 3.0, 2.0, 1.0,
+]
+
+# Relative number of flights per weekday, Monday first: Fridays and Sundays are the busiest days
+WEEKDAY_WEIGHTS: List[float] = [1.05, 0.95, 0.95, 1.0, 1.1, 0.9, 1.05]
+
+def zipf_weights(n: int, exponent: float) -> np.ndarray:
+    """
+    Zipf weights by rank, 1 / rank ** exponent. Exponent 0 gives equal weights.
+    Args:
+        n (int): Number of ranks.
+        exponent (float): Skew, around 1 for airport passenger numbers.
+    Returns:
+        np.ndarray: Weights of ranks 1 to n.
+    """
+    return 1.0 / np.arange(1, n + 1, dtype=np.float64) ** exponent
+
+def build_alias_table(weights: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Builds Walker's alias table (Vose's method) of a discrete distribution, so any number of draws costs O(1) each.
+    Args:
+        weights (np.ndarray): Non-negative weights of the outcomes, at least one positive.
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Probability of keeping the drawn outcome and its alias, per outcome.
+    """
+    scaled = np.asarray(weights, dtype=np.float64)
+    scaled = scaled * (len(scaled) / scaled.sum())
+
+    keep = np.ones(len(scaled))
+    alias = np.arange(len(scaled), dtype=np.int64)
+
+    small = [i for i in range(len(scaled)) if scaled[i] < 1.0]
+    large = [i for i in range(len(scaled)) if scaled[i] >= 1.0]
+
+    while small and large:
+        under, over = small.pop(), large.pop()
+        keep[under], alias[under] = scaled[under], over
+
+        scaled[over] -= 1.0 - scaled[under]  # the over-full outcome fills the rest of the under-full slot
+        (small if scaled[over] < 1.0 else large).append(over)
+
+    return keep, alias  # leftovers are 1 up to rounding, they keep their own outcome
+
+class AliasSampler:
+    """
+    Draws from a discrete distribution, or from one of several distributions (one per row of a weight matrix),
+    with the alias method: one uniform integer and one uniform float per draw, no search and no Python loop.
+    """
+
+    def __init__(self, weights: np.ndarray) -> None:
+        """
+        Builds the alias tables.
+        Args:
+            weights (np.ndarray): 1D weights of one distribution, or 2D weights with one distribution per row.
+        """
+        weights = np.asarray(weights, dtype=np.float64)
+        self.conditional = weights.ndim == 2
+
+        tables = [build_alias_table(row) for row in np.atleast_2d(weights)]
+        self.keep = np.stack([keep for keep, _ in tables])
+        self.alias = np.stack([alias for _, alias in tables])
+
+    def sample(self, rng: np.random.Generator, size: Optional[int] = None, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Draws outcomes.
+        Args:
+            rng (np.random.Generator): Random generator to draw with.
+            size (Optional[int]): Number of draws from a 1D distribution.
+            rows (Optional[np.ndarray]): For a 2D sampler, the distribution (row) to draw from per draw.
+        Returns:
+            np.ndarray: Outcome index per draw.
+        """
+        rows = np.asarray(rows) if self.conditional else np.zeros(size, dtype=np.int64)
+
+        slots = rng.integers(0, self.keep.shape[1], size=len(rows))
+        kept = rng.random(len(rows)) < self.keep[rows, slots]
+
+        return np.where(kept, slots, self.alias[rows, slots])
+
+class ScheduleModel:
+    """
+    Probability model of a flight schedule, sampled with alias tables:
+    - airports are weighted by Zipf on their rank in the airport CSV (the busiest airports come first),
+    - routes come from a gravity model over those weights with extra weight for domestic and same region routes,
+    - airlines are weighted by Zipf on their rank and fly mostly from airports in their home country and region,
+    - dates follow weekday weights and departure times a diurnal profile in 5 minute slots.
+    """
+
+    def __init__(
+        self,
+        airports: pd.DataFrame,
+        airlines: pd.DataFrame,
+        airport_skew: float = 1.0,
+        airline_skew: float = 0.8,
+        domestic_affinity: float = 4.0,
+        regional_affinity: float = 2.0,
+        home_affinity: float = 8.0,
+        departure_profile: Sequence[float] = DIURNAL_DEPARTURE_PROFILE,
+        weekday_weights: Sequence[float] = WEEKDAY_WEIGHTS,
+    ) -> None:
+        """
+        Precomputes the route matrix and every alias table.
+        Args:
+            airports (pd.DataFrame): IATA, Country and Region per airport, busiest first.
+            airlines (pd.DataFrame): IATA, Country and Region per airline, largest first.
+            airport_skew (float): Zipf exponent of the airport weights, 0 for uniform.
+            airline_skew (float): Zipf exponent of the airline weights, 0 for uniform.
+            domestic_affinity (float): Weight multiplier of routes within one country.
+            regional_affinity (float): Weight multiplier of routes within one region, and of airlines at airports of their region.
+            home_affinity (float): Weight multiplier of airlines at airports of their home country.
+            departure_profile (Sequence[float]): 24 relative hourly departure weights.
+            weekday_weights (Sequence[float]): 7 relative weekday weights, Monday first.
+        """
+        self.airport_codes = airports["IATA"].to_numpy()
+        self.airline_codes = airlines["IATA"].to_numpy()
+
+        self.params = {
+            "airport_skew": airport_skew,
+            "airline_skew": airline_skew,
+            "domestic_affinity": domestic_affinity,
+            "regional_affinity": regional_affinity,
+            "home_affinity": home_affinity,
+            "departure_profile": list(departure_profile),
+            "weekday_weights": list(weekday_weights),
+        }
+
+        airport_country = airports["Country"].to_numpy()
+        airport_region = airports["Region"].to_numpy()
+
+        # Gravity model: traffic between two airports grows with both of their weights, no airport flies to itself
+        airport_weight = zipf_weights(len(airports), airport_skew)
+        self.route_matrix = np.outer(airport_weight, airport_weight)
+        self.route_matrix *= np.where(airport_region[:, None] == airport_region[None, :], regional_affinity, 1.0)
+        self.route_matrix *= np.where(airport_country[:, None] == airport_country[None, :], domestic_affinity / regional_affinity, 1.0)
+        np.fill_diagonal(self.route_matrix, 0.0)
+        self.route_matrix /= self.route_matrix.sum()
+
+        # Airline weights per departure airport, one distribution per row
+        airline_weight = zipf_weights(len(airlines), airline_skew)
+        same_country = airport_country[:, None] == airlines["Country"].to_numpy()[None, :]
+        same_region = airport_region[:, None] == airlines["Region"].to_numpy()[None, :]
+        airline_matrix = airline_weight[None, :] * np.where(same_country, home_affinity, np.where(same_region, regional_affinity, 1.0))
+
+        self.airline_matrix = airline_matrix / airline_matrix.sum(axis=1, keepdims=True)
+
+        self._routes = AliasSampler(self.route_matrix.ravel())
+        self._airlines = AliasSampler(airline_matrix)
+        self._hours = AliasSampler(np.asarray(departure_profile, dtype=np.float64))
+        self.weekday_weights = np.asarray(weekday_weights, dtype=np.float64)
+
+    @classmethod
+    def uniform(cls, airports: pd.DataFrame, airlines: pd.DataFrame) -> "ScheduleModel":
+        """
+        Model without any skew: every route between two different airports, airline, day and 5 minute slot is equally likely.
+        """
+        return cls(
+            airports, airlines, airport_skew=0.0, airline_skew=0.0,
+            domestic_affinity=1.0, regional_affinity=1.0, home_affinity=1.0,
+            departure_profile=[1.0] * 24, weekday_weights=[1.0] * 7,
+        )
+
+    def cache_params(self) -> Dict[str, object]:
+        """
+        Returns every parameter the sampled schedule depends on, used to key it in the DatasetCache.
+        """
+        return dict(self.params)
+
+    def airline_shares(self) -> np.ndarray:
+        """
+        Expected share of all flights operated by each airline.
+        """
+        return self.route_matrix.sum(axis=1) @ self.airline_matrix
+
+    def sample_routes(self, rng: np.random.Generator, n: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Draws n routes from the route matrix.
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Departure and arrival airport index per flight.
+        """
+        routes = self._routes.sample(rng, size=n)
+        return np.divmod(routes, len(self.airport_codes))
+
+    def sample_airlines(self, rng: np.random.Generator, departure_airports: np.ndarray) -> np.ndarray:
+        """
+        Draws the operating airline of every flight given its departure airport index.
+        """
+        return self._airlines.sample(rng, rows=departure_airports)
+
+    def sample_dates(self, rng: np.random.Generator, start_date: str, end_date: str, n: int) -> np.ndarray:
+        """
+        Draws n flight dates between start_date and end_date (inclusive) following the weekday weights.
+        Returns:
+            np.ndarray: datetime64[D] dates.
+        """
+        days = np.arange(np.datetime64(start_date), np.datetime64(end_date) + 1)
+        weekdays = (days.astype(np.int64) + 3) % 7  # 1970-01-01 was a Thursday, Monday is 0
+
+        return days[AliasSampler(self.weekday_weights[weekdays]).sample(rng, size=n)]
+
+    def sample_departure_minutes(self, rng: np.random.Generator, n: int) -> np.ndarray:
+        """
+        Draws n departure times as minutes after midnight, on 5 minute slots.
+        """
+        return self._hours.sample(rng, size=n) * 60 + rng.integers(0, 12, size=n) * 5
@@ -0,0 +1,53 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # the pipeline modules live in the repo root
+
+@pytest.fixture
+def embedded_engine():
+    """
+    Points the loader at a fresh in-memory SQLite database for the duration of a test.
+    """
+    import read_data_into_tables
+    from database_connection_utils import create_embedded_engine
+
+    engine = read_data_into_tables.use_engine(create_embedded_engine(":memory:"))
+    yield engine
+
+    read_data_into_tables._engine = None
+    engine.dispose()
+
+@pytest.fixture
+def reference_data(embedded_engine):
+    """
+    One airline (AA) and one airport (JFK) in the embedded database.
+    """
+    from sqlalchemy import insert
+    from create_classes_for_tables import Airline, Airport
+
+    with embedded_engine.begin() as connection:
+        connection.execute(insert(Airline).values(IATA="AA", Airline="American"))
+        connection.execute(insert(Airport).values(IATA="JFK", Airport_name="John F. Kennedy"))
+    return embedded_engine
+
+@pytest.fixture
+def booked_flight(reference_data):
+    """
+    Passenger 1 booked on flight AA000001 (BookedFlight 1, 2023-01-05) on top of reference_data.
+    """
+    from datetime import date
+    from sqlalchemy import insert
+    from create_classes_for_tables import BookedFlight, Flight_Details, Passanger
+
+    with reference_data.begin() as connection:
+        connection.execute(insert(Passanger).values(
+            passangerID=1, family_name="Doe", given_name="Jane", gender="F",
+            date_of_birth=date(1990, 1, 1), email="jane@example.com", phone_number="1",
+        ))
+        connection.execute(insert(Flight_Details).values(
+            flight_number="AA000001", Departure_IATA="JFK", Arrival_IATA="JFK", Airline_IATA="AA", flight_date=date(2023, 1, 5),
+        ))
+        connection.execute(insert(BookedFlight).values(ID=1, passangerID=1, flight_number="AA000001", flight_date=date(2023, 1, 5)))
+    return reference_data
@@ -0,0 +1,39 @@
+import pandas as pd
+import pytest
+
+from bag_tag_lookup import BagTagIndex
+from create_classes_for_tables import BookedLuggage
+from read_data_into_tables import load_df_sql, post_load_hooks
+
+@pytest.fixture
+def index(booked_flight):
+    index = BagTagIndex(booked_flight)
+    yield index
+    index.close()
+
+def bags(tags, ids=None) -> pd.DataFrame:
+    df = pd.DataFrame({"bag_tag": tags, "passangerID": 1, "BookedFlightID": 1, "weight_kg": 20, "dimensions_cm": "50x40x20"})
+    return df.assign(ID=ids) if ids is not None else df
+
+def test_loads_refresh_the_index(index):
+    load_df_sql(bags([f"T{i}" for i in range(1500)]), BookedLuggage, chunk_size=500)
+    load_df_sql(bags([f"T{i}" for i in range(1500, 3000)]), BookedLuggage, chunk_size=500)
+
+    assert len(index) == 3000
+    assert [bag["luggage_id"] for bag in index.lookup("T2999")] == [3000]
+    assert index.lookup("T0")[0]["flight_number"] == "AA000001"
+    assert index.lookup("unknown") == []
+
+def test_refresh_indexes_bags_committed_below_the_last_id_once(index):
+    load_df_sql(bags(["T1"], ids=[10]), BookedLuggage, chunk_size=100)
+    load_df_sql(bags(["T2"], ids=[5]), BookedLuggage, chunk_size=100)  # took its ID first but committed later
+
+    assert len(index) == 2
+    assert [bag["luggage_id"] for bag in index.lookup("T2")] == [5]
+    assert index.refresh() == 0
+
+def test_close_unregisters_the_hook(booked_flight):
+    index = BagTagIndex(booked_flight)
+    index.close()
+
+    assert index.refresh not in post_load_hooks[BookedLuggage.__tablename__]
@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from booked_flights_generator import BookFlightGenerator
+
+def generator(passengers: int, flights_per_day: dict, seed: int = 3) -> BookFlightGenerator:
+    generator = BookFlightGenerator(None, seed=seed)
+    generator.passanger_df = pd.DataFrame({"passangerID": np.arange(1, passengers + 1)})
+
+    dates = [day for day, count in flights_per_day.items() for _ in range(count)]
+    generator.flight_details_df = pd.DataFrame({
+        "flight_number": [f"AA{i:06d}" for i in range(len(dates))],
+        "flight_date": dates,
+    })
+    return generator
+
+@pytest.mark.parametrize("passengers", [5, 40, 500])
+def test_assignment_rules(passengers):
+    gen = generator(passengers, {"2023-01-05": 5, "2023-01-06": 3, "2023-02-01": 1})
+
+    bookings = gen.generate_booked_flights(max_capacity=4)
+
+    per_flight = bookings.groupby("flight_number").size()
+    assert set(per_flight.index) == set(gen.flight_details_df["flight_number"])  # every flight has a passenger
+    assert per_flight.max() <= 4
+    assert not bookings.duplicated(["passangerID", "flight_date"]).any()  # nobody twice on one date
+
+    flight_dates = gen.flight_details_df.set_index("flight_number")["flight_date"]
+    assert (bookings["flight_date"].dt.strftime("%Y-%m-%d") == bookings["flight_number"].map(flight_dates)).all()
+
+def test_too_few_passengers_for_the_flights_of_a_day():
+    with pytest.raises(ValueError, match="Not enough unique passengers"):
+        generator(2, {"2023-01-05": 3})._assign_flights(max_capacity=4)
+
+def test_same_seed_same_bookings():
+    first = generator(50, {"2023-01-05": 5}).generate_booked_flights(max_capacity=4)
+    second = generator(50, {"2023-01-05": 5}).generate_booked_flights(max_capacity=4)
+
+    pd.testing.assert_frame_equal(first, second)
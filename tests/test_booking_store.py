@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+
+from booked_luggage_generator import BAG_TAG_LENGTH, BookedLuggageGenerator
+from booking_store import (BookingStore, LuggageStore, dates_to_day_numbers, day_numbers_to_dates,
+                           dictionary_encode)
+
+def test_booking_store_round_trip():
+    codes, flight_numbers = dictionary_encode(["AA000001", "DL000002", "AA000001"])
+    days = dates_to_day_numbers(["2023-01-05", "2023-01-05", "2023-02-28"])
+
+    store = BookingStore([7, 8, 7], codes, days, flight_numbers)
+    frame = store.to_frame()
+
+    assert store.passenger_ids.dtype == store.flight_codes.dtype == store.flight_days.dtype == np.int32
+    assert frame["passangerID"].tolist() == [7, 8, 7]
+    assert frame["flight_number"].tolist() == ["AA000001", "DL000002", "AA000001"]
+    assert frame["flight_date"].dtype.kind == "M"  # datetime64, as the loader expects
+    assert frame["flight_date"].dt.strftime("%Y-%m-%d").tolist() == ["2023-01-05", "2023-01-05", "2023-02-28"]
+    assert (dates_to_day_numbers(frame["flight_date"]) == days).all()
+    assert (day_numbers_to_dates(days) == frame["flight_date"].to_numpy(dtype="datetime64[D]")).all()
+    assert store.nbytes == 3 * 4 * 3 + flight_numbers.nbytes
+
+def test_luggage_store_round_trip():
+    dimensions = np.array(["50x38x22", "55x40x20"])
+    tags = BookedLuggageGenerator(None, seed=1)._generate_bag_tags(4)
+
+    store = LuggageStore([1, 1, 2, 3], [7, 7, 8, 9], tags, [10, 32, 20, 15], [0, 1, 1, 0], dimensions)
+    frame = store.to_frame()
+
+    assert tags.dtype == f"S{BAG_TAG_LENGTH}"
+    assert store.weights_kg.dtype == store.dimension_codes.dtype == np.int8
+    assert list(frame.columns) == ["bag_tag", "passangerID", "BookedFlightID", "weight_kg", "dimensions_cm"]
+    assert frame["bag_tag"].tolist() == [tag.decode() for tag in tags]
+    assert all(len(tag) == BAG_TAG_LENGTH and tag.isalnum() and tag.upper() == tag for tag in frame["bag_tag"])
+    assert pd.api.types.is_string_dtype(frame["bag_tag"])
+    assert frame["BookedFlightID"].tolist() == [1, 1, 2, 3]
+    assert frame["weight_kg"].tolist() == [10, 32, 20, 15]
+    assert frame["dimensions_cm"].tolist() == ["50x38x22", "55x40x20", "55x40x20", "50x38x22"]
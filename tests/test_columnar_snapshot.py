@@ -0,0 +1,71 @@
+import pandas as pd
+
+from booked_flights_generator import BookFlightGenerator
+from columnar_snapshot import ColumnarSnapshot
+from create_classes_for_tables import Passanger
+from read_data_into_tables import load_df_sql
+from test_merge_df_sql import passengers
+
+def test_content_version_changes_when_a_merge_updates_rows(embedded_engine, tmp_path):
+    load_df_sql(passengers(3), Passanger, mode="merge")
+    snapshot = ColumnarSnapshot(embedded_engine, cache_dir=str(tmp_path))
+    before = snapshot.content_version(Passanger)
+    snapshot.load(Passanger)
+
+    stored = pd.read_sql("SELECT * FROM \"Passanger\"", embedded_engine)
+    stored.loc[0, "email"] = "corrected@example.com"
+    load_df_sql(stored, Passanger, mode="merge")
+
+    assert snapshot.content_version(Passanger) != before
+    assert "corrected@example.com" in snapshot.load_frame(Passanger, ["email"])["email"].tolist()
+
+def test_snapshot_passengers_have_the_database_columns(embedded_engine, tmp_path):
+    load_df_sql(passengers(3), Passanger, mode="merge")
+
+    from_db = BookFlightGenerator(embedded_engine)
+    from_db.load_passengers_from_db("Passanger")
+    from_snapshot = BookFlightGenerator(embedded_engine, snapshot=ColumnarSnapshot(embedded_engine, cache_dir=str(tmp_path)))
+    from_snapshot.load_passengers_from_db("Passanger")
+
+    assert list(from_snapshot.passanger_df.columns) == list(from_db.passanger_df.columns)
+    assert from_snapshot.passanger_df["email"].tolist() == from_db.passanger_df["email"].tolist()
+
+def test_content_version_changes_when_rows_land_below_the_highest_key(embedded_engine, tmp_path):
+    load_df_sql(passengers(3).assign(passangerID=[1, 2, 10]), Passanger, chunk_size=100)
+    snapshot = ColumnarSnapshot(embedded_engine, cache_dir=str(tmp_path))
+    before = snapshot.content_version(Passanger)
+
+    load_df_sql(passengers(1, start=3).assign(passangerID=[5]), Passanger, chunk_size=100)
+
+    assert snapshot.content_version(Passanger) != before
+
+def test_recent_versions_are_kept(embedded_engine, tmp_path):
+    snapshot = ColumnarSnapshot(embedded_engine, cache_dir=str(tmp_path), keep_versions=2)
+
+    for start in range(0, 12, 3):
+        load_df_sql(passengers(3, start=start), Passanger, chunk_size=100)
+        snapshot.load(Passanger, ["passangerID"])
+
+    assert len(list((tmp_path / "Passanger").iterdir())) == 2
+
+def test_load_survives_a_version_removed_by_another_process(embedded_engine, tmp_path, monkeypatch):
+    import shutil
+    import columnar_snapshot
+
+    load_df_sql(passengers(3), Passanger, chunk_size=100)
+    snapshot = ColumnarSnapshot(embedded_engine, cache_dir=str(tmp_path))
+    snapshot.load(Passanger, ["passangerID"])
+
+    read_columns = columnar_snapshot.read_columns
+    removed = []
+
+    def read_after_removal(directory, columns=None, mmap=True):
+        if not removed:
+            shutil.rmtree(directory)  # another process cleaned it up between the exists() check and the read
+            removed.append(directory)
+        return read_columns(directory, columns, mmap)
+
+    monkeypatch.setattr(columnar_snapshot, "read_columns", read_after_removal)
+
+    assert snapshot.load(Passanger, ["passangerID"])["passangerID"].tolist() == [1, 2, 3]
+    assert removed
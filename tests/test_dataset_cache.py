@@ -0,0 +1,66 @@
+import booked_flights_generator
+import flight_details_generator
+import dataset_cache
+from dataset_cache import code_version, project_modules
+import pandas as pd
+
+def module_names(module) -> list:
+    return [found.__name__ for found in project_modules(module)]
+
+def test_code_version_covers_imported_pipeline_modules():
+    assert "schedule_model" in module_names(flight_details_generator)
+    assert "booking_store" in module_names(booked_flights_generator)
+    assert "pandas" not in module_names(flight_details_generator)
+
+def test_code_version_changes_with_an_imported_module(monkeypatch):
+    before = code_version(flight_details_generator.FlightDetailsGenerator)
+
+    unchanged_booking_version = code_version(booked_flights_generator.BookFlightGenerator)
+
+    file_digest = dataset_cache.file_digest
+    monkeypatch.setattr(dataset_cache, "file_digest", lambda path: "edited" if path.endswith("schedule_model.py") else file_digest(path))
+
+    assert code_version(flight_details_generator.FlightDetailsGenerator) != before
+    assert code_version(booked_flights_generator.BookFlightGenerator) == unchanged_booking_version  # does not use the schedule model
+
+def test_get_or_generate_hits_after_a_miss(tmp_path):
+    cache = dataset_cache.DatasetCache(str(tmp_path))
+    calls = []
+
+    def generate() -> pd.DataFrame:
+        calls.append(1)
+        return pd.DataFrame({"flight_number": ["AA000001", "DL000002"], "seats": [180, 220]})
+
+    first, first_key = cache.get_or_generate("flights", generate, {"seed": 1}, generate)
+    second, second_key = cache.get_or_generate("flights", generate, {"seed": 1}, generate)
+    _, other_key = cache.get_or_generate("flights", generate, {"seed": 2}, generate)
+
+    assert len(calls) == 2  # the second call was served from the cache, the changed seed was not
+    assert first_key == second_key != other_key
+    pd.testing.assert_frame_equal(first, second, check_dtype=False)
+    assert list(second.columns) == ["flight_number", "seats"]
+
+def test_changing_max_capacity_regenerates_only_bookings_and_luggage(tmp_path, embedded_engine):
+    import read_data_into_tables
+    from database_connection_utils import create_embedded_engine
+    from pipeline_cli import _load_reference_data
+    from test_schedule_model import AIRLINE_CSV, AIRPORT_CSV
+
+    cache = dataset_cache.DatasetCache(str(tmp_path))
+    options = dict(flights_per_quarter=30, num_passangers=200, airline_csv_file_path=AIRLINE_CSV, airport_csv_file_path=AIRPORT_CSV)
+
+    _load_reference_data(AIRLINE_CSV, AIRPORT_CSV, read_data_into_tables.load_df_sql)
+    first = dataset_cache.build_fixture_database(cache, max_capacity=20, **options)
+
+    second_engine = read_data_into_tables.use_engine(create_embedded_engine(":memory:"))  # the fixture assumes an empty database
+    _load_reference_data(AIRLINE_CSV, AIRPORT_CSV, read_data_into_tables.load_df_sql)
+    second = dataset_cache.build_fixture_database(cache, max_capacity=5, **options)
+    second_engine.dispose()
+
+    assert first["flight_details"] == second["flight_details"]
+    assert first["passengers"] == second["passengers"]
+    assert first["booked_flights"] != second["booked_flights"]
+    assert first["booked_luggage"] != second["booked_luggage"]
+    assert {stage: len(list((tmp_path / stage).iterdir())) for stage in first} == {
+        "flight_details": 1, "passengers": 1, "booked_flights": 2, "booked_luggage": 2,
+    }
@@ -0,0 +1,67 @@
+import threading
+
+import pandas as pd
+import pytest
+
+from create_classes_for_tables import Airline
+from export_tables import _copy_chunks
+
+class FakeCopyConnection:
+    """
+    Stands in for a psycopg2 connection: copy_expert writes the given CSV into the pipe, then optionally fails.
+    """
+
+    def __init__(self, csv: bytes, error: Exception = None) -> None:
+        self.csv, self.error = csv, error
+        self.closed = threading.Event()
+
+    def cursor(self):
+        return self
+
+    def copy_expert(self, sql: str, sink) -> None:
+        sink.write(self.csv)
+        if self.error:
+            raise self.error
+
+    def close(self) -> None:
+        self.closed.set()
+
+class FakeEngine:
+    def __init__(self, connection: FakeCopyConnection = None, error: Exception = None) -> None:
+        self.connection, self.error = connection, error
+
+    def raw_connection(self) -> FakeCopyConnection:
+        if self.error:
+            raise self.error
+        return self.connection
+
+def test_copy_chunks_parses_in_chunks():
+    connection = FakeCopyConnection(b"IATA,Airline,country_region_id\nAA,American,1\nDL,Delta,1\nUA,United,1\n")
+
+    chunks = list(_copy_chunks(FakeEngine(connection), Airline, "SELECT 1", rows_per_file=2))
+
+    assert [len(chunk) for chunk in chunks] == [2, 1]
+    assert pd.concat(chunks)["IATA"].tolist() == ["AA", "DL", "UA"]
+    assert connection.closed.is_set()
+
+def test_copy_chunks_surfaces_the_copy_error():
+    connection = FakeCopyConnection(b"", error=RuntimeError("relation does not exist"))
+
+    with pytest.raises(RuntimeError, match="relation does not exist"):
+        list(_copy_chunks(FakeEngine(connection), Airline, "SELECT 1", rows_per_file=2))
+
+def test_copy_chunks_surfaces_a_failing_connect():
+    engine = FakeEngine(error=ConnectionError("could not connect to server"))
+
+    with pytest.raises(ConnectionError, match="could not connect"):
+        list(_copy_chunks(engine, Airline, "SELECT 1", rows_per_file=2))
+
+def test_copy_chunks_releases_the_copy_thread_when_the_consumer_stops():
+    rows = b"".join(b"AA%07d,Airline,1\n" % i for i in range(200_000))  # far more than a pipe buffer holds
+    connection = FakeCopyConnection(b"IATA,Airline,country_region_id\n" + rows)
+
+    chunks = _copy_chunks(FakeEngine(connection), Airline, "SELECT 1", rows_per_file=10)
+    next(chunks)
+    chunks.close()
+
+    assert connection.closed.wait(timeout=5)
@@ -0,0 +1,61 @@
+import os
+import subprocess
+import sys
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from create_classes_for_tables import Passanger
+import read_data_into_tables
+from read_data_into_tables import load_df_sql_parallel, partition_rows, post_load_hooks
+from test_merge_df_sql import count_passengers, passengers
+
+KEY_COLS = ["family_name", "date_of_birth"]
+
+def test_partitions_do_not_depend_on_the_date_dtype():
+    people = passengers(200)
+    as_text = people.assign(date_of_birth=[day.isoformat() for day in people["date_of_birth"]])
+    as_timestamps = people.assign(date_of_birth=pd.to_datetime(as_text["date_of_birth"]))
+
+    partitions = partition_rows(people, KEY_COLS)
+
+    assert (partition_rows(as_text, KEY_COLS) == partitions).all()
+    assert (partition_rows(as_timestamps, KEY_COLS) == partitions).all()
+    assert partitions.min() >= 0 and partitions.max() < 64
+    assert len(np.unique(partitions)) > 1
+
+def test_the_same_key_always_lands_in_the_same_partition():
+    people = passengers(50)
+    changed = people.assign(phone_number="changed")  # same keys, other values
+
+    both = partition_rows(pd.concat([people, changed], ignore_index=True), KEY_COLS)
+
+    assert (both[:50] == both[50:]).all()  # so concurrent writers never touch one key from two partitions
+
+def test_partitions_are_the_same_in_another_process():
+    key = pd.DataFrame({"family_name": ["Doe", "Smith"], "date_of_birth": [date(1990, 1, 1), date(1985, 6, 15)]})
+    script = (
+        "import pandas as pd\n"
+        "from read_data_into_tables import partition_rows\n"
+        "key = pd.DataFrame({'family_name': ['Doe', 'Smith'], 'date_of_birth': ['1990-01-01', '1985-06-15']})\n"
+        "print(partition_rows(key, ['family_name', 'date_of_birth']).tolist())\n"
+    )
+    root = os.path.dirname(read_data_into_tables.__file__)
+
+    output = subprocess.run([sys.executable, "-c", script], cwd=root, capture_output=True, text=True, check=True).stdout
+
+    assert output.strip() == str(partition_rows(key, KEY_COLS).tolist())
+
+def test_fallback_loads_every_row_and_runs_hooks_once(embedded_engine):
+    calls = []
+    hook = calls.append
+    post_load_hooks[Passanger.__tablename__].append(hook)
+
+    try:
+        load_df_sql_parallel(passengers(120), Passanger, writers=4, chunk_size=25)
+    finally:
+        post_load_hooks[Passanger.__tablename__].remove(hook)
+
+    assert count_passengers(embedded_engine) == 120
+    assert calls == [embedded_engine]
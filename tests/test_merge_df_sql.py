@@ -0,0 +1,73 @@
+from datetime import date
+
+import pandas as pd
+from sqlalchemy import func, select
+
+from create_classes_for_tables import Passanger
+from read_data_into_tables import MergeBatchReport, load_df_sql
+from pipeline_metrics import completed_stages
+
+def passengers(n: int, start: int = 0) -> pd.DataFrame:
+    return pd.DataFrame({
+        "family_name": [f"Family{i}" for i in range(start, start + n)],
+        "given_name": [f"Given{i}" for i in range(start, start + n)],
+        "gender": ["F"] * n,
+        "date_of_birth": [date(1990, 1, 1 + i % 28) for i in range(start, start + n)],
+        "email": [f"person{i}@example.com" for i in range(start, start + n)],
+        "phone_number": [str(i) for i in range(start, start + n)],
+    })
+
+def count_passengers(engine) -> int:
+    with engine.connect() as connection:
+        return connection.execute(select(func.count()).select_from(Passanger)).scalar()
+
+def test_merge_into_empty_table_inserts_everything(embedded_engine):
+    reports = load_df_sql(passengers(3), Passanger, mode="merge")
+
+    assert reports == [MergeBatchReport(batch=0, inserted=3, updated=0, unchanged=0)]
+    assert count_passengers(embedded_engine) == 3
+    assert completed_stages[-1].stage == "load_df_sql" and completed_stages[-1].rows_out == 3
+
+def test_merge_mixed_batch(embedded_engine):
+    load_df_sql(passengers(3), Passanger, mode="merge")
+
+    incoming = passengers(4)  # three known rows and a new one
+    incoming.loc[1, "phone_number"] = "changed"
+
+    reports = load_df_sql(incoming, Passanger, mode="merge")
+
+    assert reports == [MergeBatchReport(batch=0, inserted=1, updated=1, unchanged=2)]
+    assert count_passengers(embedded_engine) == 4
+    assert completed_stages[-1].rows_out == 2
+
+def test_merge_unchanged_rows_write_nothing(embedded_engine):
+    load_df_sql(passengers(3), Passanger, mode="merge")
+
+    reports = load_df_sql(passengers(3), Passanger, mode="merge")
+
+    assert reports == [MergeBatchReport(batch=0, inserted=0, updated=0, unchanged=3)]
+    assert completed_stages[-1].rows_out == 0
+
+def test_merge_corrects_unique_key_column_by_primary_key(embedded_engine):
+    load_df_sql(passengers(3), Passanger, mode="merge")
+
+    stored = pd.read_sql(select(Passanger.__table__), embedded_engine)
+    stored.loc[0, "email"] = "corrected@example.com"
+
+    reports = load_df_sql(stored, Passanger, mode="merge")
+
+    assert reports == [MergeBatchReport(batch=0, inserted=0, updated=1, unchanged=2)]
+    assert count_passengers(embedded_engine) == 3
+    assert "corrected@example.com" in pd.read_sql(select(Passanger.email), embedded_engine)["email"].tolist()
+
+def test_merge_keeps_the_last_of_repeated_keys(embedded_engine):
+    load_df_sql(passengers(3), Passanger, mode="merge")
+
+    stored = pd.read_sql(select(Passanger.__table__), embedded_engine)
+    repeated = pd.concat([stored, stored.iloc[[0]].assign(phone_number="first fix"), stored.iloc[[0]].assign(phone_number="second fix")])
+
+    reports = load_df_sql(repeated, Passanger, mode="merge")
+
+    assert reports == [MergeBatchReport(batch=0, inserted=0, updated=1, unchanged=2, duplicates=2)]
+    assert completed_stages[-1].rows_out == 1
+    assert pd.read_sql(select(Passanger.phone_number), embedded_engine)["phone_number"].tolist()[0] == "second fix"
@@ -0,0 +1,44 @@
+import pandas as pd
+
+from passenger_matching import PassengerMatcher, _phone_digits, normalize_people
+
+PASSENGERS = pd.DataFrame({
+    "passangerID": [1, 2],
+    "family_name": ["Doe", "Smith"],
+    "given_name": ["Jane", "John"],
+    "date_of_birth": ["1990-01-01", "1985-06-15"],
+    "email": ["jane@example.com", "john@example.com"],
+    "phone_number": ["+1 555 0100", "206.269.0743x9150"],
+})
+
+CLAIMS = pd.DataFrame({
+    "name": ["Jane Doe", "John Smyth", "Max Mustermann"],
+    "date_of_birth": ["1990-01-01", "1985-06-15", "1970-03-03"],
+    "email": ["JANE@example.com", None, "max@example.com"],
+    "phone_number": [None, "(206) 269-0743", "0170 1234567"],
+})
+
+def test_normalize_people_splits_free_form_names():
+    normalized = normalize_people(pd.DataFrame({"name": ["Jane van Doe", "Smyth"]}))
+
+    assert normalized["family_name"].str.lower().tolist() == ["doe", "smyth"]
+    assert normalized["given_name"].isna().tolist() == [False, True]  # a single word is the family name
+
+def test_phone_digits_ignore_extensions():
+    digits = _phone_digits(pd.Series(["206.269.0743x9150", "(206) 269-0743", "+1-206-269-0743 ext. 12", None]))
+
+    assert digits.tolist()[:3] == ["062690743"] * 3
+    assert pd.isna(digits.iloc[3])
+
+def test_match_empty_claims_batch():
+    result = PassengerMatcher(PASSENGERS).match(CLAIMS.iloc[:0])
+
+    assert len(result) == 0
+    assert len(normalize_people(CLAIMS.iloc[:0])) == 0
+
+def test_match_every_claim():
+    result = PassengerMatcher(PASSENGERS).match(CLAIMS)
+
+    assert result["passangerID"].tolist()[:2] == [1, 2]  # exact email, and a misspelt name with the same birth date and phone
+    assert pd.isna(result["passangerID"].iloc[2])  # nobody shares a block with this claim
+    assert result["candidates"].fillna(0).tolist()[2] == 0
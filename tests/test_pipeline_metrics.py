@@ -0,0 +1,69 @@
+import threading
+
+from sqlalchemy import text
+
+from pipeline_metrics import track_stage
+
+def run_statements(engine, count: int) -> None:
+    with engine.connect() as connection:
+        for _ in range(count):
+            connection.execute(text("SELECT 1"))
+
+def test_concurrent_stages_count_only_their_own_statements(embedded_engine):
+    results = {}
+    ready = threading.Barrier(2)
+
+    def stage(name: str, count: int) -> None:
+        with track_stage(name) as metrics:
+            ready.wait()
+            run_statements(embedded_engine, count)
+            ready.wait()  # both stages are running while either sends statements
+        results[name] = metrics.db_round_trips
+
+    threads = [threading.Thread(target=stage, args=(name, count)) for name, count in (("a", 50), ("b", 200))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == {"a": 50, "b": 200}
+
+def test_enclosing_stage_includes_nested_stages(embedded_engine):
+    with track_stage("outer") as outer:
+        run_statements(embedded_engine, 2)
+        with track_stage("inner") as inner:
+            run_statements(embedded_engine, 3)
+
+    assert inner.db_round_trips == 3
+    assert outer.db_round_trips == 5
+
+def test_peak_memory_is_measured_per_stage():
+    import numpy as np
+
+    with track_stage("large") as large:
+        block = np.ones(200 * 2**20 // 8)  # 200 MB, returned to the system when freed
+        del block
+
+    with track_stage("small") as small:
+        np.ones(1000).sum()
+
+    assert large.peak_memory_mb - small.peak_memory_mb > 100
+
+def test_concurrent_stages_share_one_profiler(tmp_path, monkeypatch):
+    from concurrent.futures import ThreadPoolExecutor
+
+    import pipeline_metrics
+
+    monkeypatch.setattr(pipeline_metrics._config, "profile_stages", {"all"})
+    monkeypatch.setattr(pipeline_metrics._config, "profile_dir", str(tmp_path))
+
+    def stage(number: int):
+        with track_stage(f"partition{number}") as metrics:
+            sum(range(100_000))
+        return metrics
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        stages = list(executor.map(stage, range(32)))
+
+    assert any(metrics.profile_path for metrics in stages)
+    assert not pipeline_metrics._profiling_active
@@ -0,0 +1,145 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, time
+
+import pandas as pd
+import pytest
+from sqlalchemy import insert, select
+
+import pir_queries
+from create_classes_for_tables import Airport, BookedFlight, BookedLuggage, FactPIR, Flight_Details
+from pir_queries import QueryCache
+from pir_type import PIRType
+from read_data_into_tables import load_df_sql
+
+def test_query_cache_is_safe_to_share_between_threads():
+    cache = QueryCache(max_entries=64)
+
+    def hammer(worker: int) -> None:
+        for i in range(20_000):
+            key = (worker * 7 + i) % 128
+            if cache.get(key) is None:
+                cache.set(key, i)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(hammer, range(8)))  # re-raises a KeyError from a racing eviction
+
+    assert len(cache) == 64
+
+def test_query_cache_evicts_least_recently_used():
+    cache = QueryCache(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+
+@pytest.fixture
+def pir_database(booked_flight):
+    """
+    Bags on two flights (January at JFK, April at LAX) and PIRs of every type, loaded through load_df_sql so the rollups refresh.
+    """
+    with booked_flight.begin() as connection:
+        connection.execute(insert(Airport).values(IATA="LAX", Airport_name="Los Angeles"))
+        connection.execute(insert(Flight_Details).values(
+            flight_number="AA000002", Departure_IATA="JFK", Arrival_IATA="LAX", Airline_IATA="AA", flight_date=date(2023, 4, 10),
+        ))
+        connection.execute(insert(BookedFlight).values(ID=2, passangerID=1, flight_number="AA000002", flight_date=date(2023, 4, 10)))
+
+    load_df_sql(pd.DataFrame({
+        "bag_tag": [f"T{i}" for i in range(1, 9)],
+        "passangerID": 1,
+        "BookedFlightID": [1, 1, 1, 1, 2, 2, 2, 2],
+        "weight_kg": [12, 14, 23, 23, 12, 23, 27, 31],
+        "dimensions_cm": ["55x40x20", "55x40x20", "55x40x20", "70x50x30", "55x40x20", "70x50x30", "70x50x30", "70x50x30"],
+    }), BookedLuggage, chunk_size=100)
+
+    load_pirs(pd.DataFrame({
+        "bag_luggage_id": [1, 2, 3, 4, 5, 6, 7],
+        "bokked_flight_id": [1, 1, 1, 1, 2, 2, 2],
+        "airport_iata": ["JFK", "JFK", "JFK", "JFK", "LAX", "LAX", "LAX"],
+        "pir_date": [date(2023, 1, 6), date(2023, 1, 6), date(2023, 1, 7), date(2023, 1, 8), date(2023, 4, 11), date(2023, 4, 11), date(2023, 4, 12)],
+        "pir_type": ["LOST", "DELAYED", "DAMAGED", "LOST", "LOST", "DELAYED", "DAMAGED"],
+    }))
+    return booked_flight
+
+def load_pirs(pirs: pd.DataFrame) -> None:
+    load_df_sql(pirs.assign(passanger_id=1, airline_iata="AA", pir_time=time(12, 0)), FactPIR, chunk_size=100)
+
+def read_table(engine, stmt) -> pd.DataFrame:
+    with engine.connect() as connection:
+        return pd.read_sql(stmt, connection)
+
+def direct_pirs(engine) -> pd.DataFrame:
+    return read_table(engine, select(FactPIR.airport_iata, FactPIR.airline_iata, FactPIR.pir_date, FactPIR.pir_type))
+
+def direct_bags(engine) -> pd.DataFrame:
+    return read_table(engine, (
+        select(BookedLuggage.ID, BookedLuggage.weight_kg, BookedLuggage.dimensions_cm, Flight_Details.Airline_IATA, BookedFlight.flight_date)
+        .join(BookedFlight, BookedLuggage.BookedFlightID == BookedFlight.ID)
+        .join(Flight_Details, BookedFlight.flight_number == Flight_Details.flight_number)
+    ))
+
+def test_top_airports_match_a_direct_aggregate(pir_database):
+    pir_queries.invalidate_pir_query_cache()
+    report = pir_queries.top_airports_by_lost_bags(pir_database)
+
+    pirs = direct_pirs(pir_database)
+    expected = pirs[pirs["pir_type"] == PIRType.LOST].groupby("airport_iata").size()
+
+    assert dict(zip(report["airport_iata"], report["lost_bags"])) == expected.to_dict() == {"JFK": 2, "LAX": 1}
+    assert report["airport_iata"].tolist() == ["JFK", "LAX"]
+    assert pir_queries.top_airports_by_lost_bags(pir_database, top_n=1)["airport_iata"].tolist() == ["JFK"]
+
+def test_delay_rate_matches_a_direct_aggregate(pir_database):
+    pir_queries.invalidate_pir_query_cache()
+    report = pir_queries.airline_delay_rate_by_quarter(pir_database, 2023)
+
+    pirs = direct_pirs(pir_database)
+    delayed = pirs[pirs["pir_type"] == PIRType.DELAYED]
+    delayed = delayed.groupby([delayed["airline_iata"], pd.to_datetime(delayed["pir_date"]).dt.quarter.rename("quarter")]).size()
+    bags = direct_bags(pir_database)
+    booked = bags.groupby([bags["Airline_IATA"].rename("airline_iata"), pd.to_datetime(bags["flight_date"]).dt.quarter.rename("quarter")]).size()
+
+    assert report.set_index(["airline_iata", "quarter"])["delayed_bags"].to_dict() == delayed.to_dict()
+    assert report.set_index(["airline_iata", "quarter"])["booked_bags"].to_dict() == booked.to_dict()
+    assert report["delay_rate"].tolist() == [0.25, 0.25]
+
+def test_damage_rate_matches_a_direct_aggregate(pir_database):
+    pir_queries.invalidate_pir_query_cache()
+    report = pir_queries.damage_rate_by_bag_profile(pir_database, weight_band_kg=10)
+
+    bags = direct_bags(pir_database)
+    pirs = read_table(pir_database, select(FactPIR.bag_luggage_id).where(FactPIR.pir_type == PIRType.DAMAGED))
+    bags["damaged"] = bags["ID"].isin(pirs["bag_luggage_id"])
+    bags["band_start"] = bags["weight_kg"] // 10 * 10
+    expected = bags.groupby(["dimensions_cm", "band_start"])["damaged"].agg(["size", "sum"])
+
+    assert report["booked_bags"].tolist() == expected["size"].tolist()
+    assert report["damaged_bags"].tolist() == expected["sum"].tolist()
+    assert report["weight_band"].tolist() == ["10-19", "20-29", "20-29", "30-39"]
+    assert report["damage_rate"].tolist() == pytest.approx([0.0, 1.0, 1 / 3, 0.0])
+
+def test_loading_pirs_invalidates_cached_reports(pir_database):
+    pir_queries.invalidate_pir_query_cache()
+    before = pir_queries.top_airports_by_lost_bags(pir_database)
+
+    load_pirs(pd.DataFrame({
+        "bag_luggage_id": [8], "bokked_flight_id": [2], "airport_iata": ["LAX"], "pir_date": [date(2023, 4, 13)], "pir_type": ["LOST"],
+    }))
+    after = pir_queries.top_airports_by_lost_bags(pir_database)
+
+    assert dict(zip(before["airport_iata"], before["lost_bags"])) == {"JFK": 2, "LAX": 1}
+    assert dict(zip(after["airport_iata"], after["lost_bags"])) == {"JFK": 2, "LAX": 2}
+
+def test_cached_results_are_protected_from_caller_writes(pir_database):
+    pir_queries.invalidate_pir_query_cache()
+    report = pir_queries.top_airports_by_lost_bags(pir_database)
+    report.loc[0, "lost_bags"] = 100
+    report["extra"] = 1
+
+    cached = pir_queries.top_airports_by_lost_bags(pir_database)
+
+    assert cached["lost_bags"].tolist() == [2, 1]
+    assert "extra" not in cached.columns
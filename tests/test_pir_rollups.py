@@ -0,0 +1,65 @@
+from datetime import date, time
+
+from sqlalchemy import insert, select
+
+from create_classes_for_tables import BookedLuggage, FactPIR, PIRMonthlyRollup
+from pir_rollups import refresh_pir_rollup
+from pir_type import PIRType
+
+def add_bag(engine) -> None:
+    with engine.begin() as connection:
+        connection.execute(insert(BookedLuggage).values(ID=1, bag_tag="T1", passangerID=1, BookedFlightID=1, weight_kg=20, dimensions_cm="50x40x20"))
+
+def add_pir(engine, pir_id: int, pir_date: date) -> None:
+    with engine.begin() as connection:
+        connection.execute(insert(FactPIR).values(
+            PIR_ID=pir_id, bag_luggage_id=1, passanger_id=1, bokked_flight_id=1, airport_iata="JFK", airline_iata="AA",
+            pir_date=pir_date, pir_time=time(12, 0), pir_type=PIRType.DELAYED,
+        ))
+
+def rollup_counts(engine) -> dict:
+    with engine.connect() as connection:
+        return dict(connection.execute(select(PIRMonthlyRollup.rollup_month, PIRMonthlyRollup.pir_count)).all())
+
+def test_refresh_only_rebuilds_months_of_new_rows(booked_flight):
+    add_bag(booked_flight)
+    add_pir(booked_flight, 1, date(2023, 1, 10))
+
+    assert refresh_pir_rollup(booked_flight) == [date(2023, 1, 1)]
+    assert refresh_pir_rollup(booked_flight) == []
+
+    add_pir(booked_flight, 2, date(2023, 2, 10))
+
+    assert refresh_pir_rollup(booked_flight) == [date(2023, 2, 1)]
+    assert rollup_counts(booked_flight) == {date(2023, 1, 1): 1, date(2023, 2, 1): 1}
+
+def test_refresh_picks_up_rows_committed_below_the_watermark(booked_flight):
+    add_bag(booked_flight)
+    add_pir(booked_flight, 10, date(2023, 1, 10))
+    refresh_pir_rollup(booked_flight)
+
+    add_pir(booked_flight, 5, date(2023, 3, 10))  # took its ID before PIR 10 but committed after the refresh
+
+    assert refresh_pir_rollup(booked_flight) == [date(2023, 1, 1), date(2023, 3, 1)]
+    assert rollup_counts(booked_flight) == {date(2023, 1, 1): 1, date(2023, 3, 1): 1}
+    assert refresh_pir_rollup(booked_flight) == []
+
+def test_postgres_refreshes_take_an_advisory_lock_per_rollup():
+    from types import SimpleNamespace
+    from pir_rollups import _lock_rollup
+
+    class RecordingConnection:
+        dialect = SimpleNamespace(name="postgresql")
+
+        def __init__(self) -> None:
+            self.statements = []
+
+        def execute(self, statement):
+            self.statements.append(statement)
+
+    pir, baggage = RecordingConnection(), RecordingConnection()
+    _lock_rollup(pir, "PIRMonthlyRollup")
+    _lock_rollup(baggage, "BaggageMonthlyRollup")
+
+    assert "pg_advisory_xact_lock" in str(pir.statements[0])
+    assert pir.statements[0].compile().params != baggage.statements[0].compile().params
@@ -0,0 +1,86 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from flight_details_generator import FlightDetailsGenerator
+from schedule_model import AliasSampler, ScheduleModel, build_alias_table, zipf_weights
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Data")
+AIRLINE_CSV = os.path.join(DATA_DIR, "airline.csv")
+AIRPORT_CSV = os.path.join(DATA_DIR, "airports.csv")
+
+def alias_probabilities(keep: np.ndarray, alias: np.ndarray) -> np.ndarray:
+    """
+    Probability of every outcome under an alias table: its own slot's keep share plus the rest of the slots aliasing it.
+    """
+    n = len(keep)
+    return (keep + np.bincount(alias, weights=1.0 - keep, minlength=n)) / n
+
+@pytest.mark.parametrize("weights", [[1, 1, 1, 1], [5, 1, 0, 2], zipf_weights(50, 1.0), [0, 0, 3]])
+def test_alias_table_reproduces_the_weights(weights):
+    weights = np.asarray(weights, dtype=np.float64)
+
+    keep, alias = build_alias_table(weights)
+
+    np.testing.assert_allclose(alias_probabilities(keep, alias), weights / weights.sum(), atol=1e-12)
+
+def test_sampled_frequencies_match_the_weights():
+    weights = np.array([0.5, 0.3, 0.15, 0.05, 0.0])
+
+    draws = AliasSampler(weights).sample(np.random.default_rng(1), size=400_000)
+
+    np.testing.assert_allclose(np.bincount(draws, minlength=5) / len(draws), weights, atol=0.005)
+
+def test_conditional_sampler_draws_from_each_row():
+    sampler = AliasSampler(np.array([[1.0, 0.0, 0.0], [0.0, 1.0, 3.0]]))
+    rows = np.repeat([0, 1], 100_000)
+
+    draws = sampler.sample(np.random.default_rng(2), rows=rows)
+
+    assert (draws[rows == 0] == 0).all()
+    assert abs((draws[rows == 1] == 2).mean() - 0.75) < 0.01
+
+@pytest.fixture(scope="module")
+def hub_model() -> ScheduleModel:
+    airports = pd.read_csv(AIRPORT_CSV).rename(columns={"IATA Code": "IATA"}).dropna(subset=["IATA"]).drop_duplicates("IATA")
+    airlines = pd.read_csv(AIRLINE_CSV).dropna(subset=["IATA"]).drop_duplicates("IATA")
+    return ScheduleModel(airports, airlines)
+
+def test_routes_never_depart_and_arrive_at_the_same_airport(hub_model):
+    departures, arrivals = hub_model.sample_routes(np.random.default_rng(3), 200_000)
+
+    assert not (departures == arrivals).any()
+
+def test_routes_follow_the_route_matrix(hub_model):
+    departures, _ = hub_model.sample_routes(np.random.default_rng(4), 400_000)
+
+    expected = hub_model.route_matrix.sum(axis=1)
+    observed = np.bincount(departures, minlength=len(expected)) / len(departures)
+    np.testing.assert_allclose(observed, expected, atol=0.005)
+    assert observed[0] > observed[-1]  # the busiest airport comes first in the CSV
+
+def test_dates_and_times_stay_in_range(hub_model):
+    rng = np.random.default_rng(5)
+
+    dates = hub_model.sample_dates(rng, "2023-01-01", "2023-03-31", 10_000)
+    minutes = hub_model.sample_departure_minutes(rng, 10_000)
+
+    assert dates.min() >= np.datetime64("2023-01-01") and dates.max() <= np.datetime64("2023-03-31")
+    assert (minutes % 5 == 0).all() and minutes.min() >= 0 and minutes.max() < 24 * 60
+
+def test_flight_numbers_are_unique_across_quarters():
+    flights = FlightDetailsGenerator(AIRLINE_CSV, AIRPORT_CSV, 2023, flights_per_quarter=20_000, seed=6, schedule="hub").generate()
+
+    assert flights["flight_number"].is_unique
+    assert (flights["flight_number"].str[:2] == flights["Airline_IATA"]).all()
+
+def test_an_airline_running_out_of_flight_numbers_raises():
+    generator = FlightDetailsGenerator(AIRLINE_CSV, AIRPORT_CSV, 2023, flights_per_quarter=10, seed=7)
+    generator.flight_number_digits = 1  # ten numbers per airline
+
+    generator._generate_flightnumbers(np.zeros(6, dtype=np.int64))
+
+    with pytest.raises(ValueError, match="needs 11 flight numbers but only 10 exist"):
+        generator._generate_flightnumbers(np.zeros(5, dtype=np.int64))
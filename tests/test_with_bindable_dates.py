@@ -0,0 +1,32 @@
+from datetime import date, time
+
+import pandas as pd
+import pytest
+from sqlalchemy import select
+
+from create_classes_for_tables import Flight_Details
+from read_data_into_tables import load_df_sql, with_bindable_dates
+
+def flights() -> pd.DataFrame:
+    return pd.DataFrame({
+        "flight_number": ["AA000001", "AA000002"],
+        "Departure_IATA": "JFK",
+        "Arrival_IATA": "JFK",
+        "Airline_IATA": "AA",
+        "flight_date": ["2023-01-05", "2023-01-06"],
+        "departure_time": ["08:15:00", None],
+    })
+
+def test_missing_times_become_none():
+    converted = with_bindable_dates(flights(), Flight_Details)
+
+    assert converted["flight_date"].tolist() == [date(2023, 1, 5), date(2023, 1, 6)]
+    assert converted["departure_time"].tolist() == [time(8, 15), None]
+
+@pytest.mark.parametrize("mode", ["insert", "merge"])
+def test_load_flights_with_a_missing_departure_time(reference_data, mode):
+    load_df_sql(flights(), Flight_Details, chunk_size=100, mode=mode)
+
+    stored = pd.read_sql(select(Flight_Details.departure_time).order_by(Flight_Details.flight_number), reference_data)
+    assert stored["departure_time"].tolist()[0] is not None
+    assert stored["departure_time"].isna().tolist() == [False, True]